@@ -0,0 +1,190 @@
+# archivo_emergencias.py
+
+import csv
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+# Formato de cada línea: usuario,situacion,latitud,longitud (cabecera opcional).
+# Los archivos históricos anteponen la marca de tiempo de la llamada: marca,usuario,...
+CAMPOS = ('usuario', 'situacion', 'latitud', 'longitud')
+EXTENSION_INDICE = '.idx'
+FORMATO_DESPLAZAMIENTO = '<Q'
+TAMANO_DESPLAZAMIENTO = struct.calcsize(FORMATO_DESPLAZAMIENTO)
+BLOQUE_INDICE = 65536   # Desplazamientos acumulados antes de escribir al índice
+
+
+def parsear_linea(linea):
+    """Convierte una línea del archivo en el dict de emergencia que usa la interfaz."""
+    campos = [campo.strip() for campo in next(csv.reader([linea.decode('utf-8', errors='replace')]), [])]
+    marca = None
+    if len(campos) >= 5:
+        marca, campos = campos[0], campos[1:5]
+    if len(campos) == 4:
+        usuario, situacion, lat, lon = campos
+        ubicacion = f"{lat}, {lon}"
+    elif len(campos) == 3:
+        usuario, situacion, ubicacion = campos
+    else:
+        return None
+    emergencia = {'usuario': usuario, 'situacion': situacion, 'ubicacion': ubicacion}
+    if marca is not None:
+        emergencia['marca'] = marca
+    return emergencia
+
+
+def es_cabecera(linea):
+    return bool({campo.strip().lower() for campo in linea.split(b',')[:2]} & {b'usuario', b'marca'})
+
+
+class ArchivoEmergencias:
+    """
+    Lectura perezosa de un archivo de llamadas de emergencia.
+    Abrirlo no lee ninguna línea: siguiente() avanza registro a registro y leer(n)
+    salta a la llamada n con un índice de desplazamientos en bytes guardado junto al
+    archivo (ruta + '.idx'), que se construye en una pasada la primera vez que se
+    necesita y se reutiliza mientras el archivo no cambie. Con usar_mmap=True las
+    lecturas se hacen sobre el archivo mapeado en memoria.
+    """
+
+    def __init__(self, ruta, usar_mmap=False, ruta_indice=None):
+        self.ruta = ruta
+        self.ruta_indice = ruta_indice or ruta + EXTENSION_INDICE
+        self.usar_mmap = usar_mmap
+        self.archivo = None
+        self.datos = None        # Archivo o mmap; ambos ofrecen seek/readline/tell
+        self.indice = None
+        self.inicio = 0          # Desplazamiento de la primera llamada (tras la cabecera)
+        self.posicion = 0        # Número de la próxima llamada que devuelve siguiente()
+
+    def abrir(self):
+        if self.datos is None:
+            self.archivo = open(self.ruta, 'rb')
+            self.datos = self.archivo
+            if self.usar_mmap and os.fstat(self.archivo.fileno()).st_size:
+                self.datos = mmap.mmap(self.archivo.fileno(), 0, access=mmap.ACCESS_READ)
+            self._saltar_cabecera()
+        return self.datos
+
+    def cerrar(self):
+        if self.indice:
+            self.indice.close()
+            self.indice = None
+        if self.datos is not None and self.datos is not self.archivo:
+            self.datos.close()
+        if self.archivo:
+            self.archivo.close()
+        self.archivo = self.datos = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def __iter__(self):
+        """Recorre todas las llamadas desde el principio sin cargarlas en memoria."""
+        self.abrir()
+        with open(self.ruta, 'rb') as archivo:   # Cursor propio: no altera siguiente()
+            archivo.seek(self.inicio)
+            for linea in archivo:
+                emergencia = parsear_linea(linea)
+                if emergencia:
+                    yield emergencia
+
+    def siguiente(self):
+        """Devuelve la próxima llamada o None al llegar al final del archivo."""
+        datos = self.abrir()
+        while True:
+            linea = datos.readline()
+            if not linea:
+                return None
+            emergencia = parsear_linea(linea)
+            if emergencia:
+                self.posicion += 1
+                return emergencia
+
+    def ir_a(self, n):
+        """Coloca la lectura secuencial en la llamada n (desde 0)."""
+        self.abrir().seek(self._desplazamiento(n))
+        self.posicion = n
+
+    def leer(self, n):
+        """Devuelve la llamada n sin alterar la lectura secuencial."""
+        datos = self.abrir()
+        actual = datos.tell()
+        try:
+            datos.seek(self._desplazamiento(n))
+            return parsear_linea(datos.readline())
+        finally:
+            datos.seek(actual)
+
+    def __len__(self):
+        return self._abrir_indice()[1]
+
+    def __bool__(self):
+        # Sin esto, `if archivo:` llamaría a __len__ y construiría el índice
+        return True
+
+    def _saltar_cabecera(self):
+        self.datos.seek(0)
+        primera = self.datos.readline()
+        if not es_cabecera(primera):
+            self.datos.seek(0)
+        self.inicio = self.datos.tell()
+
+    def _desplazamiento(self, n):
+        indice, total = self._abrir_indice()
+        if not 0 <= n < total:
+            raise IndexError(f"La llamada {n} no existe (hay {total}).")
+        indice.seek((n + 1) * TAMANO_DESPLAZAMIENTO)
+        return struct.unpack(FORMATO_DESPLAZAMIENTO, indice.read(TAMANO_DESPLAZAMIENTO))[0]
+
+    def _abrir_indice(self):
+        """Abre el índice en disco (construyéndolo si falta o está desactualizado)."""
+        if self.indice is None:
+            tamano = os.path.getsize(self.ruta)
+            if not self._indice_vigente(tamano):
+                self.construir_indice()
+            self.indice = open(self.ruta_indice, 'rb')
+        total = os.fstat(self.indice.fileno()).st_size // TAMANO_DESPLAZAMIENTO - 1
+        return self.indice, total
+
+    def _indice_vigente(self, tamano):
+        try:
+            if os.path.getmtime(self.ruta_indice) < os.path.getmtime(self.ruta):
+                return False
+            with open(self.ruta_indice, 'rb') as indice:
+                cabecera = indice.read(TAMANO_DESPLAZAMIENTO)
+        except OSError:
+            return False
+        return len(cabecera) == TAMANO_DESPLAZAMIENTO and struct.unpack(FORMATO_DESPLAZAMIENTO, cabecera)[0] == tamano
+
+    def construir_indice(self):
+        """
+        Recorre el archivo una vez y escribe el desplazamiento de cada llamada.
+        El primer valor del índice es el tamaño del archivo indexado.
+        """
+        with open(self.ruta, 'rb') as archivo, open(self.ruta_indice + '.tmp', 'wb') as salida:
+            salida.write(struct.pack(FORMATO_DESPLAZAMIENTO, os.fstat(archivo.fileno()).st_size))
+            primera = archivo.readline()
+            desplazamiento = archivo.tell() if es_cabecera(primera) else 0
+            archivo.seek(desplazamiento)
+            bloque = array('Q')
+            for linea in iter(archivo.readline, b''):
+                if linea.count(b',') >= 2:   # Chequeo barato equivalente a parsear_linea
+                    bloque.append(desplazamiento)
+                    if len(bloque) >= BLOQUE_INDICE:
+                        self._volcar(bloque, salida)
+                desplazamiento += len(linea)
+            self._volcar(bloque, salida)
+        os.replace(self.ruta_indice + '.tmp', self.ruta_indice)
+
+    @staticmethod
+    def _volcar(bloque, salida):
+        if sys.byteorder == 'big':
+            bloque.byteswap()
+        bloque.tofile(salida)
+        del bloque[:]
@@ -0,0 +1,85 @@
+# bus.py
+
+import logging
+import threading
+
+from programador import ColaNotificada
+
+# Tópicos que publican el dron y la máquina de estados (clave 'type' del mensaje)
+TOPICOS = ('estado_dron', 'evento', 'estado_maquina')
+# Tópicos de telemetría: si la cola de un suscriptor se llena, se descarta lo más antiguo
+DESCARTABLES = frozenset({'estado_dron'})
+CAPACIDAD_SUSCRIPCION = 256
+
+
+class Suscripcion(ColaNotificada):
+    """
+    Cola propia de un suscriptor del bus, limitada a `capacidad` mensajes.
+    Al llenarse se descarta la telemetría más antigua; los eventos nunca se pierden:
+    si no queda telemetría que descartar, la cola crece por encima del límite.
+    """
+
+    def __init__(self, topicos, capacidad=CAPACIDAD_SUSCRIPCION, aviso=None):
+        super().__init__(aviso)
+        self.topicos = frozenset(topicos)
+        self.capacidad = capacidad
+        self.descartados = 0
+        self.excedidos = 0
+
+    def _put(self, item):
+        # Queue.put llama a _put con el lock de la cola tomado: alta y descarte son atómicos
+        self.queue.append(item)
+        if len(self.queue) > self.capacidad:
+            self._descartar()
+
+    def _descartar(self):
+        """Quita la telemetría más antigua, que puede ser la recién llegada; si no hay, la cola crece."""
+        for i, mensaje in enumerate(self.queue):
+            if es_descartable(mensaje):
+                del self.queue[i]
+                self.unfinished_tasks -= 1   # Queue.put la cuenta al volver de _put
+                self.descartados += 1
+                return
+        self.excedidos += 1
+        if self.excedidos == 1:
+            logging.warning("Bus: suscriptor de %s por encima de su capacidad (%d).",
+                            sorted(self.topicos), self.capacidad)
+
+
+def es_descartable(mensaje):
+    return mensaje is not None and mensaje.get('type') in DESCARTABLES
+
+
+class Bus:
+    """
+    Publicación/suscripción en proceso entre el dron, la máquina de estados y la interfaz.
+    Cada suscriptor recibe una copia de cada mensaje de sus tópicos en su propia cola,
+    así ningún consumidor le quita mensajes a otro. Ofrece put() para usarse donde los
+    productores esperan una cola.
+    """
+
+    def __init__(self):
+        self.suscripciones = {topico: () for topico in TOPICOS}
+        self.lock = threading.Lock()
+
+    def suscribir(self, topicos, capacidad=CAPACIDAD_SUSCRIPCION, aviso=None):
+        """Devuelve una Suscripcion (cola) que recibe los mensajes de los tópicos indicados."""
+        suscripcion = Suscripcion(topicos, capacidad, aviso)
+        with self.lock:
+            for topico in suscripcion.topicos:
+                # Tuplas inmutables: publicar() las recorre sin tomar el lock
+                self.suscripciones[topico] = self.suscripciones.get(topico, ()) + (suscripcion,)
+        return suscripcion
+
+    def cancelar(self, suscripcion):
+        with self.lock:
+            for topico in suscripcion.topicos:
+                self.suscripciones[topico] = tuple(
+                    s for s in self.suscripciones.get(topico, ()) if s is not suscripcion
+                )
+
+    def publicar(self, mensaje):
+        for suscripcion in self.suscripciones.get(mensaje.get('type'), ()):
+            suscripcion.put(mensaje)
+
+    put = publicar
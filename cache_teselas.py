@@ -0,0 +1,220 @@
+# cache_teselas.py
+
+import logging
+import math
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+
+# Base de datos con el esquema de TkinterMapView (tablas server y tiles), de modo que
+# el mapa la lee directamente con database_path; se añade la columna ultimo_uso para LRU
+RUTA_CACHE = "teselas.db"
+SERVIDOR_TESELAS = "https://a.tile.openstreetmap.org/{z}/{x}/{y}.png"
+ZOOM_MAXIMO_SERVIDOR = 19
+MAX_TESELAS = 20000          # Teselas retenidas; al superarse se borran las menos usadas
+LOTE_USOS = 256             # Accesos anotados antes de volcarlos a disco
+AGENTE = "proyecto-dron/1.0 (cache de teselas)"
+TIMEOUT_DESCARGA = 10
+
+# Zona de servicio que se precarga alrededor de la base y de cada emergencia
+RADIO_SERVICIO = 0.03        # Grados alrededor de la base
+ZOOMS_SERVICIO = range(12, 16)
+RADIO_EMERGENCIA = 0.004
+ZOOMS_EMERGENCIA = range(15, 17)
+
+
+def posicion_tesela(lat, lon, zoom):
+    """Posición Web Mercator del punto en unidades de tesela (con decimales) del zoom."""
+    n = 2 ** zoom
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = (lon + 180.0) / 360.0 * n
+    y = (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n
+    return x, y
+
+
+def tesela(lat, lon, zoom):
+    """Coordenadas (x, y) de la tesela Web Mercator que contiene el punto."""
+    n = 2 ** zoom
+    x, y = posicion_tesela(lat, lon, zoom)
+    return min(max(int(x), 0), n - 1), min(max(int(y), 0), n - 1)
+
+
+def teselas_zona(lat, lon, radio, zooms):
+    """Teselas (zoom, x, y) que cubren el cuadrado de `radio` grados alrededor del punto."""
+    for zoom in zooms:
+        x0, y0 = tesela(lat + radio, lon - radio, zoom)
+        x1, y1 = tesela(lat - radio, lon + radio, zoom)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield zoom, x, y
+
+
+class CacheTeselas:
+    """
+    Almacén local de teselas en SQLite con desalojo LRU.
+    Los accesos del mapa se anotan en memoria con tocar() y se vuelcan en lote, así
+    la lectura de teselas no escribe en disco por cada una.
+    """
+
+    def __init__(self, ruta=RUTA_CACHE, servidor=SERVIDOR_TESELAS, capacidad=MAX_TESELAS):
+        self.ruta = ruta
+        self.servidor = servidor
+        self.capacidad = capacidad
+        self.lock = threading.Lock()
+        self.usos = set()
+        self.guardadas = 0       # Teselas traídas por el mapa; se desaloja cada LOTE_USOS
+        self.conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._crear_esquema()
+
+    def _crear_esquema(self):
+        # WAL: el mapa lee con su propia conexión mientras la precarga escribe
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        with self.lock, self.conexion:
+            self.conexion.execute(
+                "CREATE TABLE IF NOT EXISTS server (url VARCHAR(300) PRIMARY KEY NOT NULL, max_zoom INTEGER NOT NULL)"
+            )
+            self.conexion.execute(
+                "CREATE TABLE IF NOT EXISTS tiles (zoom INTEGER NOT NULL, x INTEGER NOT NULL, y INTEGER NOT NULL, "
+                "server VARCHAR(300) NOT NULL, tile_image BLOB NOT NULL, ultimo_uso REAL NOT NULL DEFAULT 0, "
+                "CONSTRAINT pk_tiles PRIMARY KEY (zoom, x, y, server))"
+            )
+            columnas = {fila[1] for fila in self.conexion.execute("PRAGMA table_info(tiles)")}
+            if 'ultimo_uso' not in columnas:   # Base creada por el cargador de TkinterMapView
+                self.conexion.execute("ALTER TABLE tiles ADD COLUMN ultimo_uso REAL NOT NULL DEFAULT 0")
+            self.conexion.execute("CREATE INDEX IF NOT EXISTS tiles_ultimo_uso ON tiles (ultimo_uso)")
+            self.conexion.execute("INSERT OR IGNORE INTO server (url, max_zoom) VALUES (?, ?)",
+                                  (self.servidor, ZOOM_MAXIMO_SERVIDOR))
+
+    def cerrar(self):
+        self.volcar_usos()
+        with self.lock:
+            self.conexion.close()
+
+    def __len__(self):
+        with self.lock:
+            return self.conexion.execute("SELECT COUNT(*) FROM tiles WHERE server = ?", (self.servidor,)).fetchone()[0]
+
+    def contiene(self, zoom, x, y):
+        with self.lock:
+            return self.conexion.execute(
+                "SELECT 1 FROM tiles WHERE zoom = ? AND x = ? AND y = ? AND server = ?",
+                (zoom, x, y, self.servidor)
+            ).fetchone() is not None
+
+    def faltantes(self, teselas):
+        """Las teselas (zoom, x, y) de la lista que no están en el almacén."""
+        return [t for t in dict.fromkeys(teselas) if not self.contiene(*t)]
+
+    def cubre(self, teselas):
+        return not self.faltantes(teselas)
+
+    def guardar(self, zoom, x, y, imagen):
+        with self.lock, self.conexion:
+            self.conexion.execute(
+                "INSERT OR REPLACE INTO tiles (zoom, x, y, server, tile_image, ultimo_uso) VALUES (?, ?, ?, ?, ?, ?)",
+                (zoom, x, y, self.servidor, sqlite3.Binary(imagen), time.time())
+            )
+
+    def tocar(self, zoom, x, y):
+        """Anota un acceso del mapa a la tesela; se vuelcan a disco cada LOTE_USOS."""
+        with self.lock:
+            self.usos.add((zoom, x, y))
+            lleno = len(self.usos) >= LOTE_USOS
+        if lleno:
+            self.volcar_usos()
+
+    def volcar_usos(self):
+        with self.lock:
+            usos, self.usos = self.usos, set()
+            if usos:
+                ahora = time.time()
+                with self.conexion:
+                    self.conexion.executemany(
+                        "UPDATE tiles SET ultimo_uso = ? WHERE zoom = ? AND x = ? AND y = ? AND server = ?",
+                        [(ahora, zoom, x, y, self.servidor) for zoom, x, y in usos]
+                    )
+
+    def desalojar(self):
+        """Borra las teselas usadas hace más tiempo hasta volver a la capacidad."""
+        with self.lock, self.conexion:
+            total = self.conexion.execute("SELECT COUNT(*) FROM tiles").fetchone()[0]
+            if total > self.capacidad:
+                self.conexion.execute(
+                    "DELETE FROM tiles WHERE rowid IN (SELECT rowid FROM tiles ORDER BY ultimo_uso LIMIT ?)",
+                    (total - self.capacidad,)
+                )
+
+    def descargar(self, zoom, x, y):
+        url = self.servidor.format(z=zoom, x=x, y=y)
+        solicitud = urllib.request.Request(url, headers={'User-Agent': AGENTE})
+        with urllib.request.urlopen(solicitud, timeout=TIMEOUT_DESCARGA) as respuesta:
+            return respuesta.read()
+
+    def traer(self, zoom, x, y):
+        """Descarga y guarda la tesela si falta; False si no hay red."""
+        if self.contiene(zoom, x, y):
+            return True
+        try:
+            self.guardar(zoom, x, y, self.descargar(zoom, x, y))
+        except (urllib.error.URLError, OSError):
+            return False
+        with self.lock:
+            self.guardadas += 1
+            desalojar = self.guardadas % LOTE_USOS == 0
+        if desalojar:
+            self.desalojar()
+        return True
+
+
+class Precarga:
+    """
+    Descarga en segundo plano las teselas que faltan en el almacén.
+    Se detiene al primer error de red (sin_red queda en True): sin conexión, el mapa
+    sigue con lo ya guardado. `teselas` puede ser una función que las calcule, así
+    el cálculo también corre en el hilo de la precarga. al_terminar(precarga) se
+    llama desde ese hilo.
+    """
+
+    def __init__(self, cache, teselas, al_terminar=None):
+        self.cache = cache
+        self.teselas = teselas
+        self.al_terminar = al_terminar
+        self.descargadas = 0
+        self.sin_red = False
+        self.activo = True
+        self.hilo = threading.Thread(target=self.ejecutar, name='precarga_teselas', daemon=True)
+
+    def iniciar(self):
+        self.hilo.start()
+        return self
+
+    def detener(self):
+        self.activo = False
+
+    def ejecutar(self):
+        teselas = self.teselas() if callable(self.teselas) else self.teselas
+        for zoom, x, y in self.cache.faltantes(teselas):
+            if not self.activo:
+                break
+            try:
+                self.cache.guardar(zoom, x, y, self.cache.descargar(zoom, x, y))
+            except (urllib.error.URLError, OSError) as error:
+                logging.warning("Precarga de teselas interrumpida: %s", error)
+                self.sin_red = True
+                break
+            self.descargadas += 1
+        self.cache.volcar_usos()
+        self.cache.desalojar()
+        logging.info("Precarga de teselas: %d descargadas.", self.descargadas)
+        if self.al_terminar:
+            self.al_terminar(self)
+
+
+def teselas_servicio(base, emergencias=()):
+    """Teselas de la zona de servicio alrededor de la base y de cada emergencia (lat, lon)."""
+    teselas = list(teselas_zona(*base, RADIO_SERVICIO, ZOOMS_SERVICIO))
+    for lat, lon in emergencias:
+        teselas.extend(teselas_zona(lat, lon, RADIO_EMERGENCIA, ZOOMS_EMERGENCIA))
+    return list(dict.fromkeys(teselas))
@@ -0,0 +1,222 @@
+# capa_marcadores.py
+
+import math
+
+from cache_teselas import posicion_tesela
+
+# Por debajo de este zoom las emergencias cercanas se agrupan en un solo marcador
+ZOOM_AGRUPAR = 14
+CELDA_AGRUPAR = 64           # Lado en píxeles de la celda de agrupación
+TAMANO_TESELA = 256
+MARGEN_VISTA = 0.25          # Fracción de la vista que se dibuja fuera de sus bordes
+
+
+class Punto:
+    """Punto de la capa; x, y es su posición en teselas de zoom 0, proyectada una sola vez."""
+    __slots__ = ('lat', 'lon', 'texto', 'agrupable', 'x', 'y')
+
+    def __init__(self, lat, lon, texto, agrupable):
+        self.texto = texto
+        self.agrupable = agrupable
+        self.situar(lat, lon)
+
+    def situar(self, lat, lon):
+        self.lat = lat
+        self.lon = lon
+        self.x, self.y = posicion_tesela(lat, lon, 0)
+
+
+class IndiceZoom:
+    """Claves de los puntos repartidas en cubetas de una tesela del zoom indicado."""
+
+    def __init__(self, zoom, puntos=()):
+        self.escala = 2 ** zoom
+        self.cubetas = {}            # (x, y) de la tesela -> {clave}
+        for clave, punto in puntos:
+            self.agregar(clave, punto)
+
+    def cubeta(self, punto):
+        return int(punto.x * self.escala), int(punto.y * self.escala)
+
+    def agregar(self, clave, punto):
+        self.cubetas.setdefault(self.cubeta(punto), set()).add(clave)
+
+    def quitar(self, clave, cubeta):
+        claves = self.cubetas.get(cubeta)
+        if claves:
+            claves.discard(clave)
+            if not claves:
+                del self.cubetas[cubeta]
+
+    def en_rango(self, limites):
+        """Claves de las cubetas que tocan los límites (x0, y0, x1, y1) en teselas."""
+        x0, y0, x1, y1 = limites
+        for x in range(math.floor(x0), math.floor(x1) + 1):
+            for y in range(math.floor(y0), math.floor(y1) + 1):
+                yield from self.cubetas.get((x, y), ())
+
+
+class CapaMarcadores:
+    """
+    Capa de marcadores sobre un TkinterMapView.
+    colocar(), mover() y quitar() solo anotan el cambio; actualizar(), llamado una vez
+    por cuadro, redibuja si hubo cambios o si la vista se movió. Solo se dibujan los
+    puntos dentro de la vista, las emergencias se agrupan por celdas a zoom bajo y los
+    marcadores del mapa se reutilizan en lugar de crearse y borrarse.
+
+    Cada punto se proyecta al colocarlo o moverlo, y por cada zoom visitado se mantiene
+    un índice de cubetas por tesela: recalcular la vista recorre solo las cubetas que
+    la tocan. Si lo único que cambió son puntos sueltos (los drones) y la vista es la
+    misma, solo se ajustan sus marcadores.
+    """
+
+    def __init__(self, mapa):
+        self.mapa = mapa
+        self.puntos = {}             # clave -> Punto
+        self.indices = {}            # zoom -> IndiceZoom, creado al visitar el zoom
+        self.marcadores = {}         # clave visible (punto o celda) -> marcador del mapa
+        self.textos = {}             # clave visible -> texto mostrado
+        self.visibles = {}           # Último resultado de calcular_visibles()
+        self.cambiados = set()       # Claves colocadas, movidas o quitadas desde el último cuadro
+        self.reagrupar = False       # Cambió un punto agrupable: hay que recalcular la vista
+        self.vista = None
+
+    def colocar(self, clave, lat, lon, texto, agrupable=True):
+        self.quitar(clave)
+        punto = self.puntos[clave] = Punto(lat, lon, texto, agrupable)
+        for indice in self.indices.values():
+            indice.agregar(clave, punto)
+        self._anotar(clave, punto)
+
+    def mover(self, clave, lat, lon):
+        punto = self.puntos.get(clave)
+        if punto and (punto.lat, punto.lon) != (lat, lon):
+            anteriores = [(indice, indice.cubeta(punto)) for indice in self.indices.values()]
+            punto.situar(lat, lon)
+            for indice, cubeta in anteriores:
+                if indice.cubeta(punto) != cubeta:
+                    indice.quitar(clave, cubeta)
+                    indice.agregar(clave, punto)
+            self._anotar(clave, punto)
+
+    def quitar(self, clave):
+        punto = self.puntos.pop(clave, None)
+        if punto:
+            for indice in self.indices.values():
+                indice.quitar(clave, indice.cubeta(punto))
+            self._anotar(clave, punto)
+
+    def _anotar(self, clave, punto):
+        self.cambiados.add(clave)
+        if punto.agrupable:
+            self.reagrupar = True
+
+    def __contains__(self, clave):
+        return clave in self.puntos
+
+    def __len__(self):
+        return len(self.puntos)
+
+    def vista_actual(self):
+        """(zoom, esquina superior izquierda, esquina inferior derecha) en unidades de tesela."""
+        superior = getattr(self.mapa, 'upper_left_tile_pos', None)
+        inferior = getattr(self.mapa, 'lower_right_tile_pos', None)
+        return round(self.mapa.zoom), tuple(superior or ()), tuple(inferior or ())
+
+    def actualizar(self):
+        vista = self.vista_actual()
+        if vista != self.vista or self.reagrupar:
+            self.visibles = self.calcular_visibles(*vista)
+            self.dibujar(self.visibles)
+        elif self.cambiados:
+            zoom, superior, inferior = vista
+            limites = limites_vista(superior, inferior)
+            for clave in self.cambiados:
+                self.visibles.pop(clave, None)
+                punto = self.puntos.get(clave)
+                if punto and dentro(punto, 2 ** zoom, limites):
+                    self.visibles[clave] = (punto.lat, punto.lon, punto.texto)
+            self.dibujar(self.visibles, self.cambiados)
+        self.vista = vista
+        self.cambiados = set()
+        self.reagrupar = False
+
+    def calcular_visibles(self, zoom, superior, inferior):
+        """Devuelve {clave visible: (lat, lon, texto)} de lo que cae dentro de la vista."""
+        limites = limites_vista(superior, inferior)
+        if limites:
+            indice = self.indices.get(zoom)
+            if indice is None:
+                indice = self.indices[zoom] = IndiceZoom(zoom, self.puntos.items())
+            claves = indice.en_rango(limites)
+        else:
+            claves = self.puntos
+        escala = 2 ** zoom
+        agrupar = zoom < ZOOM_AGRUPAR
+        visibles = {}
+        celdas = {}
+        for clave in claves:
+            punto = self.puntos[clave]
+            if not dentro(punto, escala, limites):
+                continue
+            if agrupar and punto.agrupable:
+                celda = ('celda', int(punto.x * escala * TAMANO_TESELA // CELDA_AGRUPAR),
+                         int(punto.y * escala * TAMANO_TESELA // CELDA_AGRUPAR))
+                celdas.setdefault(celda, []).append(punto)
+            else:
+                visibles[clave] = (punto.lat, punto.lon, punto.texto)
+        for celda, grupo in celdas.items():
+            if len(grupo) == 1:
+                visibles[celda] = (grupo[0].lat, grupo[0].lon, grupo[0].texto)
+            else:
+                lat = sum(p.lat for p in grupo) / len(grupo)
+                lon = sum(p.lon for p in grupo) / len(grupo)
+                visibles[celda] = (lat, lon, f"{len(grupo)} emergencias")
+        return visibles
+
+    def dibujar(self, visibles, claves=None):
+        """
+        Ajusta los marcadores del mapa a `visibles` reutilizando los existentes.
+        Con `claves` solo se revisan esas claves; el resto de marcadores no se toca.
+        """
+        if claves is None:
+            sobrantes = [clave for clave in self.marcadores if clave not in visibles]
+            revisar = visibles
+        else:
+            sobrantes = [clave for clave in claves if clave in self.marcadores and clave not in visibles]
+            revisar = {clave: visibles[clave] for clave in claves if clave in visibles}
+        libres = [self.marcadores.pop(clave) for clave in sobrantes]
+        for clave in sobrantes:
+            self.textos.pop(clave, None)
+        for clave, (lat, lon, texto) in revisar.items():
+            marcador = self.marcadores.get(clave)
+            if marcador is None and libres:
+                marcador = self.marcadores[clave] = libres.pop()
+            if marcador is None:
+                self.marcadores[clave] = self.mapa.set_marker(lat, lon, text=texto)
+                self.textos[clave] = texto
+                continue
+            if tuple(marcador.position) != (lat, lon):
+                marcador.set_position(lat, lon)
+            if self.textos.get(clave) != texto:
+                marcador.set_text(texto)
+                self.textos[clave] = texto
+        for marcador in libres:
+            marcador.delete()
+
+
+def limites_vista(superior, inferior):
+    """Límites (x0, y0, x1, y1) de la vista ampliada con MARGEN_VISTA, o None sin vista."""
+    if not (superior and inferior):
+        return None
+    margen_x = (inferior[0] - superior[0]) * MARGEN_VISTA
+    margen_y = (inferior[1] - superior[1]) * MARGEN_VISTA
+    return (superior[0] - margen_x, superior[1] - margen_y,
+            inferior[0] + margen_x, inferior[1] + margen_y)
+
+
+def dentro(punto, escala, limites):
+    if not limites:
+        return True
+    x, y = punto.x * escala, punto.y * escala
+    return limites[0] <= x <= limites[2] and limites[1] <= y <= limites[3]
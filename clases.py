@@ -1,36 +1,372 @@
 # clases.py
 
+import atexit
+import itertools
 import logging
-import threading
+import logging.handlers
+import struct
 import time
 import queue
+from collections import deque
+from enum import IntEnum
+from transiciones import EventoMaquina
+from programador import Despertador, Programador, Serie, conectar_colas
+from reloj import RELOJ_REAL, RelojReal, RelojVirtual
+from energia import ModeloEnergia
+from proyeccion import METROS_POR_UNIDAD, ORIGEN_SIMULACION, SIMULACION, Proyeccion
 
-# Configuración del log
-logging.basicConfig(
-    filename='registro_dron.log',
-    level=logging.INFO,
-    format='%(asctime)s:%(levelname)s:%(message)s'
-)
+FORMATO_LOG = '%(asctime)s:%(levelname)s:%(message)s'
+ARCHIVO_LOG = 'registro_dron.log'
+ARCHIVO_LOG_BINARIO = 'registro_dron.bin'
+
+# Número de eventos retenidos en memoria por RegistroEventos
+CAPACIDAD_REGISTRO = 10000
+
+# Intervalo de consulta del canal de telemetría en memoria compartida (segundos)
+PERIODO_TELEMETRIA = 0.1
+
+# Intervalo de atención de las colas cuando el dron corre sobre un Programador compartido
+PERIODO_SONDEO = 0.05
+
+# Maniobras del dron: la altitud cambia PASO_ALTITUD metros cada PASO_MANIOBRA segundos
+ALTITUD_CRUCERO = 100
+PASO_ALTITUD = 20
+PASO_MANIOBRA = 0.5
+DURACION_ASISTENCIA = 5
+
+# Periodo en segundos con que se descuenta la batería (ver energia.ModeloEnergia)
+PERIODO_BATERIA = 1
+
+# Diferencia entre el reloj de pared y el monotónico, para mostrar marcas de tiempo legibles
+EPOCA_MONOTONICA = time.time() - time.monotonic()
+
+class Origen(IntEnum):
+    SISTEMA = 0
+    DRON = 1
+    SIMULACION = 2
+    MAQUINA = 3
+    INTERFAZ = 4
+    LLAMADA = 5
+
+class CodigoEvento(IntEnum):
+    MENSAJE = 0              # Texto libre
+    POSICION = 1             # (lat, lon)
+    BATERIA = 2              # (porcentaje,)
+    ESTADO_DRON = 3          # Sin carga
+    DESPEGUE = 4             # (altitud en metros,)
+    ATERRIZAJE = 5           # (altitud en metros,)
+    TRANSICION = 6           # Texto: nombre del nuevo estado
+    INICIO_MISION = 7        # Texto: ubicación de la emergencia
+
+# Plantillas para renderizar los eventos estructurados solo cuando alguien los lee
+PLANTILLAS_EVENTO = {
+    CodigoEvento.POSICION: "Posición actualizada: ({0}, {1})",
+    CodigoEvento.BATERIA: "Batería actual: {0:g}%",
+    CodigoEvento.ESTADO_DRON: "Estado del dron actualizado.",
+    CodigoEvento.DESPEGUE: "Despegando... Altitud actual: {0:g} m.",
+    CodigoEvento.ATERRIZAJE: "Aterrizando... Altitud actual: {0:g} m.",
+    CodigoEvento.TRANSICION: "Transición de estado: {texto}",
+    CodigoEvento.INICIO_MISION: "Misión iniciada hacia {texto}.",
+}
+
+_marca_cacheada = (None, "")
+
+def formatear_marca_tiempo(tiempo_monotonico):
+    """Convierte un instante monotónico a 'AAAA-MM-DD HH:MM:SS' (cacheado por segundo)."""
+    global _marca_cacheada
+    segundo = int(tiempo_monotonico + EPOCA_MONOTONICA)
+    cacheado, texto = _marca_cacheada
+    if cacheado != segundo:
+        texto = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(segundo))
+        _marca_cacheada = (segundo, texto)
+    return texto
+
+class Evento:
+    """Registro compacto de un evento; el texto se genera solo al leerlo."""
+    __slots__ = ('tiempo', 'origen', 'codigo', 'valores', 'texto', 'mision')
+
+    def __init__(self, tiempo, origen, codigo, valores=(), texto=None, mision=0):
+        self.tiempo = tiempo        # Instante en el reloj del RegistroEventos (marco de time.monotonic())
+        self.origen = origen
+        self.codigo = codigo
+        self.valores = valores      # Carga numérica
+        self.texto = texto          # Texto libre o argumento textual de la plantilla
+        self.mision = mision        # Identificador de misión (0 fuera de misión)
+
+    def mensaje(self):
+        if self.codigo == CodigoEvento.MENSAJE:
+            return self.texto
+        return PLANTILLAS_EVENTO[self.codigo].format(*self.valores, texto=self.texto)
+
+    def __str__(self):
+        return f"[{formatear_marca_tiempo(self.tiempo)}] {self.mensaje()}"
+
+# Formato binario: longitud total (uint32), tiempo de pared (float64), origen (uint8),
+# código (uint8), número de valores (uint16), misión (uint32), valores float64 y texto UTF-8 restante.
+_CABECERA_BINARIA = struct.Struct('<IdBBHI')
+
+def codificar_evento(evento):
+    texto = evento.texto.encode('utf-8') if evento.texto else b''
+    n = len(evento.valores)
+    longitud = _CABECERA_BINARIA.size + 8 * n + len(texto)
+    return (
+        _CABECERA_BINARIA.pack(
+            longitud, evento.tiempo + EPOCA_MONOTONICA, evento.origen, evento.codigo, n, evento.mision
+        )
+        + struct.pack(f'<{n}d', *evento.valores)
+        + texto
+    )
+
+def leer_log_binario(ruta=ARCHIVO_LOG_BINARIO):
+    """
+    Recorre un log binario y produce los eventos; su tiempo se expresa en el reloj monotónico actual.
+    Un último registro incompleto (escritura interrumpida) se ignora.
+    """
+    with open(ruta, 'rb') as archivo:
+        while True:
+            cabecera = archivo.read(_CABECERA_BINARIA.size)
+            if len(cabecera) < _CABECERA_BINARIA.size:
+                return
+            longitud, tiempo, origen, codigo, n, mision = _CABECERA_BINARIA.unpack(cabecera)
+            cuerpo = archivo.read(longitud - _CABECERA_BINARIA.size)
+            if len(cuerpo) != longitud - _CABECERA_BINARIA.size or len(cuerpo) < 8 * n:
+                return
+            valores = struct.unpack_from(f'<{n}d', cuerpo)
+            texto = cuerpo[8 * n:].decode('utf-8') or None
+            yield Evento(tiempo - EPOCA_MONOTONICA, Origen(origen), CodigoEvento(codigo), valores, texto, mision)
+
+class ManejadorBinario(logging.Handler):
+    """Escribe en formato binario los registros de log que transportan un Evento."""
+    def __init__(self, ruta=ARCHIVO_LOG_BINARIO):
+        super().__init__()
+        self.archivo = open(ruta, 'ab')
+
+    def emit(self, record):
+        if record.args and isinstance(record.args[0], Evento):
+            self.archivo.write(codificar_evento(record.args[0]))
+
+    def flush(self):
+        self.archivo.flush()
+
+    def close(self):
+        self.archivo.close()
+        super().close()
+
+class ManejadorColaSinFormato(logging.handlers.QueueHandler):
+    """QueueHandler que entrega el registro intacto; el formateo ocurre en el hilo escritor."""
+    def prepare(self, record):
+        return record
+
+class EscritorLog(logging.handlers.QueueListener):
+    """Hilo escritor del log; recuerda si está en marcha y el manejador que lo alimenta."""
+    activo = False
+    entrada = None
+
+    def start(self):
+        super().start()
+        self.activo = True
+
+    def stop(self):
+        if self.activo:
+            self.activo = False
+            super().stop()
+
+# Hilo escritor en marcha, o None hasta que el programa llame a configurar_log()
+escritor_log = None
+
+def configurar_log(archivo=ARCHIVO_LOG, archivo_binario=ARCHIVO_LOG_BINARIO):
+    """
+    Configura el log para que la escritura en disco ocurra en un hilo de fondo.
+    Los productores solo encolan el registro; el EscritorLog lo formatea y escribe
+    tanto el log de texto como el binario. Lo llama el punto de entrada del programa,
+    no la importación del módulo.
+    """
+    global escritor_log
+    if escritor_log is not None and escritor_log.activo:
+        return escritor_log
+    cola_log = queue.SimpleQueue()
+    manejador_archivo = logging.FileHandler(archivo)
+    manejador_archivo.setFormatter(logging.Formatter(FORMATO_LOG))
+    escritor = EscritorLog(cola_log, manejador_archivo, ManejadorBinario(archivo_binario))
+    escritor.entrada = ManejadorColaSinFormato(cola_log)
+
+    raiz = logging.getLogger()
+    raiz.setLevel(logging.INFO)
+    raiz.addHandler(escritor.entrada)
+
+    escritor.start()
+    atexit.register(detener_log, escritor)  # Vaciar la cola pendiente al terminar
+    escritor_log = escritor
+    return escritor
+
+def agregar_manejador_log(manejador, escritor=None):
+    """Agrega un manejador al hilo escritor en marcha (p. ej. un índice de eventos)."""
+    escritor = escritor or escritor_log
+    if escritor is None:
+        raise RuntimeError("El log no está configurado: llame antes a configurar_log().")
+    escritor.handlers = escritor.handlers + (manejador,)
+
+def detener_log(escritor=None):
+    """Detiene el hilo escritor tras vaciar su cola y cierra los archivos de log."""
+    escritor = escritor or escritor_log
+    if escritor is None or not escritor.activo:
+        return  # Sin configurar o ya detenido
+    logging.getLogger().removeHandler(escritor.entrada)
+    escritor.stop()
+    for manejador in escritor.handlers:
+        manejador.close()
 
 class RegistroEventos:
-    def __init__(self):
-        self.eventos = []
-        self.lock = threading.Lock()  # Para manejar acceso concurrente
-    
-    def agregar_evento(self, mensaje):
-        with self.lock:
-            timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-            entrada = f"[{timestamp}] {mensaje}"
-            self.eventos.append(entrada)
-            logging.info(entrada)
+    """
+    Registro en memoria de los eventos del sistema.
+    Conserva solo los últimos `capacidad` eventos en un buffer circular; deque.append
+    es atómico, por lo que los productores no comparten ningún lock. Los eventos se
+    guardan como registros Evento y se convierten a texto solo al leerlos.
+    En una flota cada dron escribe a través de un RegistroDron, que lleva su propia
+    misión en curso.
+
+    Los eventos se fechan con `reloj`, el del programador que mueve al dron: con un
+    reloj escalado o virtual las duraciones son segundos simulados. El instante se
+    desplaza para coincidir con time.monotonic() al fijar el reloj, así las marcas
+    legibles parten de la hora real.
+    """
+    def __init__(self, capacidad=CAPACIDAD_REGISTRO, reloj=RELOJ_REAL):
+        self.eventos = deque(maxlen=capacidad)
+        self.mision_actual = 0      # Los eventos se etiquetan con la misión en curso
+        self.ultima_mision = 0
+        self.contador_misiones = itertools.count(1)
+        self.indice = None          # Índice de consultas opcional (ver indice_registro)
+        self.usar_reloj(reloj)
+
+    def usar_reloj(self, reloj):
+        """Fecha los eventos siguientes con `reloj`."""
+        self.desfase = 0.0 if type(reloj) is RelojReal else time.monotonic() - reloj()
+        self.reloj = reloj
+
+    def ahora(self):
+        return self.reloj() + self.desfase
+
+    def nueva_mision(self):
+        """Reserva el identificador de una misión nueva."""
+        self.ultima_mision = mision = next(self.contador_misiones)
+        return mision
+
+    def iniciar_mision(self, ubicacion=None):
+        """Abre una nueva misión; los eventos siguientes quedan asociados a ella."""
+        self.mision_actual = self.nueva_mision()
+        self.registrar(CodigoEvento.INICIO_MISION, texto=ubicacion)
+        return self.mision_actual
+
+    def finalizar_mision(self):
+        self.mision_actual = 0
+
+    def registrar(self, codigo, *valores, texto=None, origen=Origen.SISTEMA, mision=None):
+        """Agrega un evento estructurado con carga numérica."""
+        if mision is None:
+            mision = self.mision_actual
+        evento = Evento(self.ahora(), origen, codigo, valores, texto, mision)
+        self.eventos.append(evento)
+        logging.info("%s", evento)
+        return evento
+
+    def agregar_evento(self, mensaje, origen=Origen.SISTEMA, mision=None):
+        if mision is None:
+            mision = self.mision_actual
+        evento = Evento(self.ahora(), origen, CodigoEvento.MENSAJE, texto=str(mensaje), mision=mision)
+        self.eventos.append(evento)
+        logging.info("%s", evento)
+        return evento
+
+    def agregar_eventos(self, mensajes, origen=Origen.SISTEMA, mision=None):
+        """Agrega un lote de eventos de texto con una sola marca de tiempo."""
+        if mision is None:
+            mision = self.mision_actual
+        tiempo = self.ahora()
+        eventos = [
+            Evento(tiempo, origen, CodigoEvento.MENSAJE, texto=str(mensaje), mision=mision)
+            for mensaje in mensajes
+        ]
+        self.eventos.extend(eventos)
+        for evento in eventos:
+            logging.info("%s", evento)
+
+    def entradas(self):
+        """Devuelve los eventos retenidos como texto '[timestamp] mensaje'."""
+        return [str(evento) for evento in list(self.eventos)]
+
+class RegistroDron:
+    """
+    Vista de un RegistroEventos compartido para un dron de la flota y su máquina de
+    estados: escribe en el mismo buffer, pero con la misión en curso de ese dron.
+    """
+    def __init__(self, registro, dron_id):
+        self.registro = registro
+        self.dron_id = dron_id
+        self.mision_actual = 0
+
+    def iniciar_mision(self, ubicacion=None):
+        self.mision_actual = self.registro.nueva_mision()
+        self.registrar(CodigoEvento.INICIO_MISION, texto=ubicacion)
+        return self.mision_actual
+
+    def finalizar_mision(self):
+        self.mision_actual = 0
+
+    def registrar(self, codigo, *valores, texto=None, origen=Origen.SISTEMA):
+        return self.registro.registrar(codigo, *valores, texto=texto, origen=origen, mision=self.mision_actual)
+
+    def agregar_evento(self, mensaje, origen=Origen.SISTEMA):
+        return self.registro.agregar_evento(mensaje, origen, mision=self.mision_actual)
+
+    def agregar_eventos(self, mensajes, origen=Origen.SISTEMA):
+        self.registro.agregar_eventos(mensajes, origen, mision=self.mision_actual)
+
+    def entradas(self):
+        return self.registro.entradas()
+
+class Maniobra:
+    """
+    Secuencia programada del dron (despegue, aterrizaje, asistencia) que avanza paso a
+    paso en el programador. Cancelarla descarta el paso pendiente, así otro comando
+    puede interrumpirla sin esperar a que termine.
+    """
+    __slots__ = ('nombre', 'programador', 'tarea', 'cancelada')
+
+    def __init__(self, nombre, programador):
+        self.nombre = nombre
+        self.programador = programador
+        self.tarea = None
+        self.cancelada = False
+
+    def programar(self, segundos, funcion, *args):
+        """Programa el siguiente paso, salvo que la maniobra se haya cancelado."""
+        if not self.cancelada:
+            self.tarea = self.programador.programar(segundos, self._paso, funcion, args)
+
+    def _paso(self, funcion, args):
+        if not self.cancelada:
+            funcion(*args)
+
+    def cancelar(self):
+        self.cancelada = True
+        if self.tarea:
+            self.tarea.cancelar()
+
 
 class Drone:
-    def __init__(self, registro_eventos, queue_commands, queue_updates, queue_commands_simulacion, queue_updates_simulacion):
+    def __init__(self, registro_eventos, queue_commands, queue_updates, queue_commands_simulacion, queue_updates_simulacion,
+                 canal_telemetria=None, programador=None, dron_id=None, base=None,
+                 periodo_sondeo=PERIODO_SONDEO, reloj=None, modelo_energia=None):
+        self.dron_id = dron_id
+        # Todas las esperas y el consumo de batería siguen este reloj (real, escalado o virtual)
+        self.reloj = reloj or (programador.reloj if programador else RELOJ_REAL)
         self.registro_eventos = registro_eventos
         self.queue_commands = queue_commands            # Cola para recibir comandos de la interfaz y máquina de estados
         self.queue_updates = queue_updates              # Cola para enviar actualizaciones a la interfaz y máquina de estados
         self.queue_commands_simulacion = queue_commands_simulacion   # Cola para enviar comandos a la simulación
         self.queue_updates_simulacion = queue_updates_simulacion     # Cola para recibir actualizaciones de la simulación
+        self.canal_telemetria = canal_telemetria                     # Memoria compartida con la posición de la simulación
+        self.secuencia_telemetria = 0
 
         self.localizacion_emergencia = None
         self.bateria = 100      # Porcentaje de batería
@@ -38,60 +374,151 @@ class Drone:
         self.altitud = 0        # Altitud en metros
 
         # Coordenadas iniciales en el Hospital Universitario San Ignacio en Bogotá
-        self.home_lat = 4.627925
-        self.home_lon = -74.064692
-        self.posicion_actual = [self.home_lat, self.home_lon]
+        self.home_lat, self.home_lon = ORIGEN_SIMULACION
+        self.base = tuple(base) if base else (self.home_lat, self.home_lon)
+        self.posicion_actual = list(self.base)
+        # Plano en metros anclado en la base para el consumo y el alcance
+        self.proyeccion = Proyeccion(*self.base)
+
+        # El consumo se integra en el reloj del dron: (instante, altitud) del último descuento.
+        # La velocidad sobre el suelo (m/s) sale de las muestras de la simulación y de
+        # su instante simulado, no del momento en que llegan
+        self.modelo_energia = modelo_energia or ModeloEnergia()
+        self.muestra_energia = (self.reloj(), 0)
+        self.muestra_posicion = None        # (tiempo simulado, x, y en metros) de la última muestra
+        self.velocidad_suelo = (0.0, 0.0)
+
+        # Contadores del publicador de posiciones de la simulación (llegan con cada latido)
+        self.contadores_publicador = None
+
+        # Latencia del cambio de localización: desde el envío del comando hasta la
+        # primera muestra de posición con el rumbo corregido
+        self.t_cambio_localizacion = None
+        self.localizacion_anterior = None   # Ubicación a restaurar si se rechaza el cambio
+        self.tiempo_correccion = None       # Tiempo simulado de la corrección confirmada
+        self.latencia_correccion = None     # Segundos de la última corrección
 
         self.thread_activo = True
+        self.maniobra = None    # Maniobra en curso, o None
+
+        # Todo el trabajo del dron corre como tareas de un Programador; sin uno
+        # compartido se crea uno propio de un solo hilo. Con un RelojVirtual ese
+        # programador no tiene hilo: se conduce con programador_propio.simular().
+        # Las tareas pasan por una Serie: comandos, batería y maniobras nunca corren
+        # en paralelo entre sí
+        self.programador_propio = None
+        if programador is None:
+            programador = self.programador_propio = Programador(trabajadores=0, reloj=self.reloj)
+            if not isinstance(self.reloj, RelojVirtual):
+                programador.iniciar()
+        self.programador = programador = Serie(programador)
+        self.tareas = [programador.cada(PERIODO_BATERIA, self.paso_estado_drone)]
+        if canal_telemetria:
+            # La posición se consulta en la memoria compartida; la cola solo trae eventos
+            self.tareas.append(programador.cada(PERIODO_TELEMETRIA, self.leer_telemetria))
+        # Las colas notificadas despiertan atender_colas al recibir un mensaje; solo se
+        # sondea si alguna no puede avisar (y hay periodo de sondeo)
+        self.despertador = Despertador(programador, self.atender_colas)
+        if not conectar_colas(self.despertador, queue_commands, queue_updates_simulacion) and periodo_sondeo:
+            self.tareas.append(programador.cada(periodo_sondeo, self.atender_colas))
+
+    def detener(self):
+        """Cancela las tareas del dron y deja de atender sus colas."""
+        self.thread_activo = False
+        conectar_colas(None, self.queue_commands, self.queue_updates_simulacion)
+        self.cancelar_maniobra()
+        for tarea in self.tareas:
+            tarea.cancelar()
+        if self.programador_propio:
+            self.programador_propio.detener()
+
+    def iniciar_maniobra(self, nombre, segundos, funcion, *args):
+        """Interrumpe la maniobra en curso y programa el primer paso de una nueva."""
+        self.cancelar_maniobra()
+        self.maniobra = Maniobra(nombre, self.programador)
+        self.maniobra.programar(segundos, funcion, *args)
 
-        # Iniciar hilos para manejar comandos y actualizaciones
-        threading.Thread(target=self.escuchar_comandos_externos, daemon=True).start()
-        threading.Thread(target=self.recibir_actualizaciones_simulacion, daemon=True).start()
-        threading.Thread(target=self.actualizar_estado_drone, daemon=True).start()
+    def continuar_maniobra(self, segundos, funcion, *args):
+        if self.maniobra:
+            self.maniobra.programar(segundos, funcion, *args)
+
+    def terminar_maniobra(self):
+        self.maniobra = None
+
+    def cancelar_maniobra(self):
+        """Cancela la maniobra en curso, si la hay."""
+        maniobra, self.maniobra = self.maniobra, None
+        if maniobra:
+            maniobra.cancelar()
+            self.registro_eventos.agregar_evento(f"Maniobra de {maniobra.nombre} interrumpida.")
+            self.log_estado(f"Maniobra de {maniobra.nombre} interrumpida.")
 
     def simulation_to_coord(self, x, y):
-        lon = x / 10000 + self.home_lon
-        lat = y / 10000 + self.home_lat
-        return (lat, lon)
-
-    def escuchar_comandos_externos(self):
-        """Escucha comandos de la interfaz de usuario o máquina de estados."""
-        while self.thread_activo:
-            try:
-                comando = self.queue_commands.get(timeout=1)
+        return SIMULACION.a_geo(x, y)
+
+    def atender_colas(self):
+        """Atiende sin bloquear los comandos y actualizaciones pendientes."""
+        try:
+            while True:
+                comando = self.queue_commands.get_nowait()
                 if comando:
-                    tipo_comando = comando.get('tipo')
-                    self.registro_eventos.agregar_evento(f"Comando recibido: {tipo_comando}")
-                    if tipo_comando == 'recepcion_comando_arranque_vuelo':
-                        ubicacion = comando.get('ubicacion')
-                        self.recibir_comando_arranque_vuelo(ubicacion)
-                    elif tipo_comando == 'cambio_localizacion_emergencia':
-                        nueva_ubicacion = comando.get('nueva_ubicacion')
-                        self.cambiar_localizacion_emergencia(nueva_ubicacion)
-                    elif tipo_comando == 'despegar':
-                        self.despegar()
-                    elif tipo_comando == 'aterrizar':
-                        self.aterrizar()
-                    elif tipo_comando == 'iniciar_asistencia':
-                        self.iniciar_asistencia()
-                    elif tipo_comando == 'regresar_base':
-                        self.regresar_base()
-                    elif tipo_comando == 'vuelo_libre':
-                        activar = comando.get('activar', True)
-                        self.enviar_comando_simulacion({'tipo': 'vuelo_libre', 'activar': activar})
-                        estado = "activado" if activar else "desactivado"
-                        self.registro_eventos.agregar_evento(f"Vuelo libre {estado}.")
-                    # Manejar otros comandos según sea necesario
-            except queue.Empty:
-                continue  # No hay comandos, continuar esperando
+                    self.procesar_comando(comando)
+        except queue.Empty:
+            pass
+        try:
+            while True:
+                update = self.queue_updates_simulacion.get_nowait()
+                if update:
+                    self.procesar_actualizacion_simulacion(update)
+        except queue.Empty:
+            pass
+
+    def procesar_comando(self, comando):
+        """Ejecuta un comando de la interfaz de usuario o de la máquina de estados."""
+        tipo_comando = comando.get('tipo')
+        self.registro_eventos.agregar_evento(f"Comando recibido: {tipo_comando}")
+        if tipo_comando == 'recepcion_comando_arranque_vuelo':
+            ubicacion = comando.get('ubicacion')
+            self.recibir_comando_arranque_vuelo(ubicacion)
+        elif tipo_comando == 'cambio_localizacion_emergencia':
+            # Solo se aplica el que devuelve la máquina de estados, que lo valida según su
+            # estado; el de la interfaz se le reenvía como evento más abajo
+            if comando.get('origen') == 'maquina_estados':
+                self.cambiar_localizacion_emergencia(comando.get('nueva_ubicacion'))
+        elif tipo_comando == 'despegar':
+            self.despegar()
+        elif tipo_comando == 'aterrizar':
+            self.aterrizar()
+        elif tipo_comando == 'iniciar_asistencia':
+            self.iniciar_asistencia()
+        elif tipo_comando == 'regresar_base':
+            self.regresar_base()
+        elif tipo_comando == 'vuelo_libre':
+            activar = comando.get('activar', True)
+            self.enviar_comando_simulacion({'tipo': 'vuelo_libre', 'activar': activar})
+            estado = "activado" if activar else "desactivado"
+            self.registro_eventos.agregar_evento(f"Vuelo libre {estado}.")
+        # Manejar otros comandos según sea necesario
+
+        # Los eventos de la máquina de estados que llegan como comandos (interfaz de
+        # usuario o de eventos) se le reenvían; los que ella misma emite, no.
+        evento = EventoMaquina.desde_nombre(tipo_comando)
+        if evento is not None and comando.get('origen') != 'maquina_estados':
+            self.enviar_evento_maquina(evento, comando)
 
     def recibir_comando_arranque_vuelo(self, ubicacion):
         """Inicia el vuelo hacia la emergencia."""
         self.localizacion_emergencia = ubicacion
+        self.registro_eventos.iniciar_mision(ubicacion)
         self.registro_eventos.agregar_evento(f"Iniciando vuelo hacia la emergencia en {ubicacion}.")
         self.log_estado(f"Iniciando vuelo hacia la emergencia en {ubicacion}.")
+        self.advertir_alcance(ubicacion)
         self.velocidad = 60
         self.altitud = 100
+        # El consumo empieza con el vuelo
+        self.muestra_energia = (self.reloj(), self.altitud)
+        self.muestra_posicion = None
+        self.velocidad_suelo = (0.0, 0.0)
         # Enviar comando a la simulación para iniciar el vuelo con la ubicación de emergencia
         self.enviar_comando_simulacion({'tipo': 'recibir_comando_arranque', 'ubicacion': ubicacion})
         # Enviar actualización a la interfaz de usuario
@@ -102,46 +529,66 @@ class Drone:
         self.registro_eventos.agregar_evento("Iniciando secuencia de despegue.")
         self.log_estado("Secuencia de despegue iniciada.")
         # Simular aumento de altitud hasta alcanzar altitud de vuelo
-        for altura in range(0, 101, 20):
-            time.sleep(0.5)
-            self.altitud = altura
-            self.registro_eventos.agregar_evento(f"Despegando... Altitud actual: {self.altitud} m.")
-            self.enviar_actualizacion_ui()
+        self.iniciar_maniobra('despegue', PASO_MANIOBRA, self.paso_despegue, 0)
+
+    def paso_despegue(self, altura):
+        self.altitud = altura
+        self.consumir_energia()   # Cada escalón del ascenso suma su coste
+        self.registro_eventos.registrar(CodigoEvento.DESPEGUE, self.altitud, origen=Origen.DRON)
+        self.enviar_actualizacion_ui()
+        if altura < ALTITUD_CRUCERO:
+            self.continuar_maniobra(PASO_MANIOBRA, self.paso_despegue, altura + PASO_ALTITUD)
+            return
+        self.terminar_maniobra()
         self.registro_eventos.agregar_evento("Despegue completado.")
         self.log_estado("Despegue completado.")
         # Enviar evento de despegue completado
-        self.queue_updates.put({'type': 'evento', 'data': 'despegue_completado'})
+        self.enviar_evento_maquina(EventoMaquina.DESPEGUE_COMPLETADO)
 
     def aterrizar(self):
         """Simula el aterrizaje del dron."""
         self.registro_eventos.agregar_evento("Iniciando secuencia de aterrizaje.")
         self.log_estado("Secuencia de aterrizaje iniciada.")
-        # Simular descenso de altitud hasta alcanzar el suelo
-        for altura in range(self.altitud, -1, -20):
-            time.sleep(0.5)
-            self.altitud = altura
-            self.registro_eventos.agregar_evento(f"Aterrizando... Altitud actual: {self.altitud} m.")
+        # Simular descenso de altitud hasta alcanzar el suelo; interrumpe un despegue
+        self.iniciar_maniobra('aterrizaje', PASO_MANIOBRA, self.paso_aterrizaje, self.altitud)
+
+    def paso_aterrizaje(self, altura):
+        self.altitud = altura
+        self.registro_eventos.registrar(CodigoEvento.ATERRIZAJE, self.altitud, origen=Origen.DRON)
+        if altura - PASO_ALTITUD >= 0:
             self.enviar_actualizacion_ui()
+            self.continuar_maniobra(PASO_MANIOBRA, self.paso_aterrizaje, altura - PASO_ALTITUD)
+            return
+        self.terminar_maniobra()
+        self.consumir_energia()
+        self.velocidad = 0  # En tierra: deja de consumir batería
+        self.enviar_actualizacion_ui()
         self.registro_eventos.agregar_evento("Aterrizaje completado.")
         self.log_estado("Aterrizaje completado.")
         # Enviar evento de aterrizaje completado
-        self.queue_updates.put({'type': 'evento', 'data': 'aterrizaje_completado'})
+        self.enviar_evento_maquina(EventoMaquina.ATERRIZAJE_COMPLETADO)
 
     def iniciar_asistencia(self):
         """Simula la asistencia al paciente."""
         self.registro_eventos.agregar_evento("Iniciando asistencia al paciente con el DEA.")
         self.log_estado("Asistiendo al paciente.")
         # Simular tiempo de asistencia
-        time.sleep(5)
+        self.iniciar_maniobra('asistencia', DURACION_ASISTENCIA, self.completar_asistencia)
+
+    def completar_asistencia(self):
+        self.terminar_maniobra()
         self.registro_eventos.agregar_evento("Asistencia al paciente completada.")
         self.log_estado("Asistencia completada.")
         # Enviar evento de asistencia completada
-        self.queue_updates.put({'type': 'evento', 'data': 'asistencia_completada'})
+        self.enviar_evento_maquina(EventoMaquina.ASISTENCIA_COMPLETADA)
 
     def regresar_base(self):
         """Inicia el regreso del dron a la base."""
         self.registro_eventos.agregar_evento("Iniciando regreso a la base.")
         self.log_estado("Regresando a la base.")
+        # El regreso interrumpe una asistencia en curso; un despegue sigue hasta la altitud de crucero
+        if self.maniobra and self.maniobra.nombre == 'asistencia':
+            self.cancelar_maniobra()
         # Enviar comando a la simulación para regresar a la base
         self.enviar_comando_simulacion({'tipo': 'regresar_base'})
         # Actualizar estado
@@ -152,15 +599,56 @@ class Drone:
         """Actualiza la ubicación de la emergencia."""
         self.registro_eventos.agregar_evento(f"Cambio de localización de emergencia a {nueva_ubicacion}.")
         self.log_estado(f"Cambiando rumbo hacia nueva ubicación: {nueva_ubicacion}.")
+        # Se restaura si la simulación rechaza el cambio
+        self.localizacion_anterior = self.localizacion_emergencia
         self.localizacion_emergencia = nueva_ubicacion
+        self.advertir_alcance(nueva_ubicacion)
         # Enviar actualización a la interfaz de usuario
         self.enviar_actualizacion_ui()
-        # Enviar comando a la simulación si es necesario
+        # Enviar comando a la simulación; la latencia se mide desde aquí
+        self.t_cambio_localizacion = time.perf_counter()
+        self.tiempo_correccion = None
         self.enviar_comando_simulacion({
             'tipo': 'cambio_localizacion_emergencia',
             'nueva_ubicacion': nueva_ubicacion
         })
 
+    def rechazar_cambio_localizacion(self):
+        """Vuelve a la ubicación anterior cuando la simulación no aplica el cambio."""
+        if self.t_cambio_localizacion is None:
+            return
+        self.localizacion_emergencia = self.localizacion_anterior
+        self.t_cambio_localizacion = self.tiempo_correccion = None
+        self.registro_eventos.agregar_evento(f"Cambio de localización no aplicado; se mantiene {self.localizacion_emergencia}.")
+        self.log_estado(f"Cambio de localización rechazado por la simulación; se mantiene {self.localizacion_emergencia}.")
+        self.enviar_actualizacion_ui()
+
+    def advertir_alcance(self, ubicacion):
+        """Registra una advertencia si la batería no alcanza para la emergencia en 'lat, lon'."""
+        try:
+            lat, lon = map(float, ubicacion.split(','))
+        except (AttributeError, ValueError):
+            return   # La simulación informa la ubicación inválida
+        if not self.puede_atender(lat, lon):
+            self.registro_eventos.agregar_evento("Advertencia: la batería no alcanza para ir, asistir y volver con reserva.")
+            self.log_estado(f"Batería insuficiente para la emergencia en {ubicacion} con reserva.")
+
+    def confirmar_correccion(self, tiempo_muestra=None):
+        """
+        Mide la latencia del cambio de localización con la primera muestra posterior a
+        la corrección de la simulación. Las muestras de la cola llegan en orden con el
+        evento; las del canal compartido traen su tiempo simulado.
+        """
+        if self.t_cambio_localizacion is None or self.tiempo_correccion is None:
+            return
+        if tiempo_muestra is not None and tiempo_muestra <= self.tiempo_correccion:
+            return
+        self.latencia_correccion = time.perf_counter() - self.t_cambio_localizacion
+        self.t_cambio_localizacion = self.tiempo_correccion = None
+        mensaje = f"Rumbo corregido: primera muestra {self.latencia_correccion * 1000:.1f} ms después del comando."
+        self.registro_eventos.agregar_evento(mensaje)
+        self.log_estado(mensaje)
+
     def enviar_comando_simulacion(self, comando):
         """Envía un comando a la simulación a través de la cola."""
         if self.queue_commands_simulacion:
@@ -168,50 +656,110 @@ class Drone:
             self.log_estado(f"Comando enviado a la simulación: {comando}")
             self.registro_eventos.agregar_evento(f"Comando enviado a la simulación: {comando}")
 
-    def recibir_actualizaciones_simulacion(self):
-        """Recibe actualizaciones de la simulación."""
-        while self.thread_activo:
-            try:
-                update = self.queue_updates_simulacion.get(timeout=1)
-                if update:
-                    tipo_update = update.get('type')
-                    if tipo_update == 'posicion_actualizada':
-                        data = update.get('data')
-                        x_sim, y_sim = data['posicion']
-                        # Convertir coordenadas de simulación a coordenadas reales
-                        self.posicion_actual = self.simulation_to_coord(x_sim, y_sim)
-                        self.registro_eventos.agregar_evento(f"Posición actualizada: {self.posicion_actual}")
-                        # Enviar actualización a la interfaz de usuario
-                        self.enviar_actualizacion_ui()
-                    elif tipo_update == 'evento':
-                        mensaje = update.get('data')
-                        self.registro_eventos.agregar_evento(f"Evento de simulación: {mensaje}")
-                        self.log_estado(f"Evento recibido de la simulación: {mensaje}")
-                        # Enviar evento a la máquina de estados
-                        self.queue_updates.put({'type': 'evento', 'data': mensaje})
-            except queue.Empty:
-                continue  # No hay actualizaciones, continuar esperando
-
-    def actualizar_estado_drone(self):
-        """Actualiza periódicamente el estado del dron."""
-        while self.thread_activo:
-            time.sleep(1)
-            if self.velocidad > 0:
-                self.bateria -= 1
-                self.registro_eventos.agregar_evento(f"Batería actual: {self.bateria}%")
-                if self.bateria <= 0:
-                    self.bateria = 0
-                    self.velocidad = 0
-                    self.registro_eventos.agregar_evento("Batería agotada. Dron aterrizando de emergencia.")
-                    self.log_estado("Batería agotada. Aterrizaje de emergencia.")
-                    # Enviar comando a la simulación para detener el dron
-                    self.enviar_comando_simulacion({'tipo': 'detener_dron'})
-                    # Enviar evento de batería baja
-                    self.queue_updates.put({'type': 'evento', 'data': 'aviso_bateria_baja'})
-                # Enviar actualización de estado a la interfaz de usuario
-                self.enviar_actualizacion_ui()
+    def procesar_actualizacion_simulacion(self, update):
+        """Aplica una actualización recibida de la simulación."""
+        tipo_update = update.get('type')
+        if tipo_update == 'posicion_actualizada':
+            data = update.get('data')
+            x_sim, y_sim = data['posicion']
+            # Convertir coordenadas de simulación a coordenadas reales
+            self.posicion_actual = self.simulation_to_coord(x_sim, y_sim)
+            self.consumir_energia()
+            self.actualizar_velocidad(data.get('tiempo'))
+            if data.get('latido'):
+                # Los latidos solo confirman la posición; se registran los contadores
+                self.contadores_publicador = data.get('contadores')
             else:
-                time.sleep(1)  # Si el dron está en tierra, esperar un poco más para ahorrar recursos
+                self.registro_eventos.registrar(CodigoEvento.POSICION, *self.posicion_actual, origen=Origen.DRON)
+                self.confirmar_correccion()
+            # Enviar actualización a la interfaz de usuario
+            self.enviar_actualizacion_ui()
+        elif tipo_update == 'evento':
+            mensaje = update.get('data')
+            self.registro_eventos.agregar_evento(f"Evento de simulación: {mensaje}")
+            self.log_estado(f"Evento recibido de la simulación: {mensaje}")
+            if update.get('correccion') is not None and self.t_cambio_localizacion is not None:
+                self.tiempo_correccion = update['correccion']
+            if update.get('cambio_rechazado'):
+                self.rechazar_cambio_localizacion()
+            # Enviar evento a la máquina de estados con su código, si lo trae
+            evento = {'type': 'evento', 'data': mensaje}
+            if update.get('codigo') is not None:
+                evento['codigo'] = update['codigo']
+            self.queue_updates.put(evento)
+
+    def leer_telemetria(self):
+        """Lee la última muestra de la simulación desde la memoria compartida."""
+        secuencia, muestra = self.canal_telemetria.leer()
+        if secuencia == self.secuencia_telemetria:
+            return
+        self.secuencia_telemetria = secuencia
+        posicion = self.simulation_to_coord(muestra['x'], muestra['y'])
+        self.consumir_energia()
+        # La muestra trae la velocidad de la simulación en unidades por segundo
+        self.velocidad_suelo = (muestra['vx'] * METROS_POR_UNIDAD, muestra['vy'] * METROS_POR_UNIDAD)
+        if posicion != self.posicion_actual:
+            self.posicion_actual = posicion
+            self.registro_eventos.registrar(CodigoEvento.POSICION, *self.posicion_actual, origen=Origen.DRON)
+            self.confirmar_correccion(muestra['tiempo'])
+            # Enviar actualización a la interfaz de usuario
+            self.enviar_actualizacion_ui()
+
+    def consumir_energia(self):
+        """Descuenta la energía del vuelo desde el descuento anterior según el modelo de energía."""
+        ahora = self.reloj()
+        t, altitud = self.muestra_energia
+        self.muestra_energia = (ahora, self.altitud)
+        if self.velocidad <= 0:
+            return
+        dt = ahora - t
+        vx, vy = self.velocidad_suelo
+        gasto = self.modelo_energia.porcentaje_muestra(vx * dt, vy * dt, self.altitud - altitud, dt)
+        self.bateria = max(0, self.bateria - gasto)
+
+    def actualizar_velocidad(self, tiempo):
+        """Estima la velocidad sobre el suelo entre dos muestras de posición con su instante simulado."""
+        if tiempo is None:
+            return
+        x, y = self.proyeccion.a_plano(*self.posicion_actual)
+        anterior, self.muestra_posicion = self.muestra_posicion, (tiempo, x, y)
+        if anterior and tiempo > anterior[0]:
+            t0, x0, y0 = anterior
+            self.velocidad_suelo = ((x - x0) / (tiempo - t0), (y - y0) / (tiempo - t0))
+
+    def puede_atender(self, lat, lon):
+        """True si la batería alcanza para ir a (lat, lon), asistir y volver a la base con reserva."""
+        posicion = self.proyeccion.a_plano(*self.posicion_actual)
+        destino = self.proyeccion.a_plano(lat, lon)
+        return self.modelo_energia.factible(self.bateria, posicion, destino, (0.0, 0.0))
+
+    def paso_estado_drone(self):
+        """Descuenta la batería del vuelo transcurrido en el reloj del dron y notifica el estado."""
+        self.consumir_energia()
+        if self.velocidad <= 0:
+            return
+        self.registro_eventos.registrar(CodigoEvento.BATERIA, round(self.bateria, 1), origen=Origen.DRON)
+        if self.bateria <= 0:
+            self.bateria = 0
+            self.velocidad = 0
+            self.registro_eventos.agregar_evento("Batería agotada. Dron aterrizando de emergencia.")
+            self.log_estado("Batería agotada. Aterrizaje de emergencia.")
+            # Un aterrizaje en curso continúa; cualquier otra maniobra se aborta
+            if self.maniobra and self.maniobra.nombre != 'aterrizaje':
+                self.cancelar_maniobra()
+            # Enviar comando a la simulación para detener el dron
+            self.enviar_comando_simulacion({'tipo': 'detener_dron'})
+            # Enviar evento de batería baja
+            self.enviar_evento_maquina(EventoMaquina.AVISO_BATERIA_BAJA)
+        # Enviar actualización de estado a la interfaz de usuario
+        self.enviar_actualizacion_ui()
+
+    def enviar_evento_maquina(self, evento, datos=None):
+        """Envía un evento con código explícito a la máquina de estados."""
+        update = {'type': 'evento', 'data': evento.nombre, 'codigo': evento}
+        if datos:
+            update.update({clave: valor for clave, valor in datos.items() if clave not in update})
+        self.queue_updates.put(update)
 
     def enviar_actualizacion_ui(self):
         """Envía una actualización del estado actual del dron a la interfaz de usuario."""
@@ -219,13 +767,13 @@ class Drone:
             'type': 'estado_dron',
             'data': {
                 'estado': 'En vuelo' if self.velocidad > 0 else 'En tierra',
-                'bateria': self.bateria,
+                'bateria': round(self.bateria, 1),
                 'velocidad': self.velocidad,
                 'altitud': self.altitud,
                 'posicion_actual': self.posicion_actual
             }
         })
-        self.registro_eventos.agregar_evento("Estado del dron actualizado.")
+        self.registro_eventos.registrar(CodigoEvento.ESTADO_DRON, origen=Origen.DRON)
 
     def log_estado(self, mensaje):
         """Registra un mensaje en el log y en la consola."""
@@ -0,0 +1,139 @@
+# cola_emergencias.py
+
+import heapq
+import itertools
+import threading
+import time
+
+# Ventaja en segundos de espera que otorga cada tipo de situación (triaje).
+# Un paro cardíaco se adelanta a los demás casos; el envejecimiento hace que un caso
+# menos grave que lleva esperando más que la diferencia también termine atendiéndose.
+PRIORIDADES = {
+    'paro cardíaco': 0.0,
+    'accidente': 120.0,
+    'incendio': 120.0,
+}
+PRIORIDAD_POR_DEFECTO = 300.0
+
+
+def prioridad_situacion(situacion):
+    """Segundos de desventaja de una situación según el triaje (menor es más urgente)."""
+    return PRIORIDADES.get((situacion or '').strip().lower(), PRIORIDAD_POR_DEFECTO)
+
+
+class EntradaCola:
+    """Entrada del montículo; las entradas reemplazadas se marcan y se descartan al salir."""
+    __slots__ = ('emergencia', 'vigente')
+
+    def __init__(self, emergencia):
+        self.emergencia = emergencia
+        self.vigente = True
+
+
+class ColaEmergencias:
+    """
+    Cola de emergencias por prioridad con envejecimiento.
+    La clave de cada caso es su hora de llegada más la desventaja de su situación, de
+    modo que la espera acumulada compensa una prioridad menor sin recalcular claves.
+    Cambiar la situación o la ubicación de un caso inserta una entrada nueva e invalida
+    la anterior (O(log n)); un nuevo reporte en la misma ubicación se fusiona con el
+    caso existente conservando la llegada más antigua y la prioridad más alta. Los
+    casos sin ubicación no se fusionan: cada uno queda en la cola por separado.
+    """
+
+    def __init__(self, prioridad=prioridad_situacion, reloj=time.monotonic):
+        self.prioridad = prioridad
+        self.reloj = reloj
+        self.monticulo = []                  # (clave, orden, entrada)
+        self.orden = itertools.count()       # Desempate FIFO entre claves iguales
+        self.ids = itertools.count(1)
+        self.entradas = {}                   # id -> entrada vigente
+        self.por_ubicacion = {}              # ubicación -> id
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entradas)
+
+    def __bool__(self):
+        return bool(self.entradas)
+
+    def agregar(self, emergencia, llegada=None):
+        """
+        Encola una emergencia (dict con 'situacion' y 'ubicacion') y devuelve su id.
+        Se le añaden las claves 'id' y 'llegada'.
+        """
+        with self.lock:
+            ubicacion = emergencia.get('ubicacion')
+            existente = self.por_ubicacion.get(ubicacion) if ubicacion else None
+            if existente is not None:
+                anterior = self.entradas[existente].emergencia
+                if self.prioridad(emergencia.get('situacion')) < self.prioridad(anterior.get('situacion')):
+                    self._reemplazar(existente, dict(anterior, situacion=emergencia.get('situacion')))
+                return existente
+            emergencia.setdefault('id', next(self.ids))
+            emergencia.setdefault('llegada', self.reloj() if llegada is None else llegada)
+            self._insertar(emergencia)
+            return emergencia['id']
+
+    def actualizar(self, emergencia_id, **cambios):
+        """Cambia campos de un caso en cola (p. ej. situacion o ubicacion) y lo reordena."""
+        with self.lock:
+            entrada = self.entradas.get(emergencia_id)
+            if entrada is None:
+                return False
+            self._reemplazar(emergencia_id, dict(entrada.emergencia, **cambios))
+            return True
+
+    def retirar(self, emergencia_id):
+        """Quita un caso de la cola sin atenderlo."""
+        with self.lock:
+            entrada = self.entradas.pop(emergencia_id, None)
+            if entrada is None:
+                return None
+            self._desindexar(entrada)
+            return entrada.emergencia
+
+    def extraer(self):
+        """Devuelve la emergencia más urgente y la quita de la cola, o None si está vacía."""
+        with self.lock:
+            while self.monticulo:
+                entrada = heapq.heappop(self.monticulo)[2]
+                if entrada.vigente:
+                    del self.entradas[entrada.emergencia['id']]
+                    self._desindexar(entrada)
+                    return entrada.emergencia
+            return None
+
+    def devolver(self, emergencia):
+        """Reencola una emergencia extraída conservando su llegada original."""
+        with self.lock:
+            self._insertar(emergencia)
+
+    def ver(self):
+        """La emergencia más urgente sin quitarla de la cola."""
+        with self.lock:
+            while self.monticulo and not self.monticulo[0][2].vigente:
+                heapq.heappop(self.monticulo)
+            return self.monticulo[0][2].emergencia if self.monticulo else None
+
+    def _insertar(self, emergencia):
+        entrada = EntradaCola(emergencia)
+        clave = emergencia['llegada'] + self.prioridad(emergencia.get('situacion'))
+        heapq.heappush(self.monticulo, (clave, next(self.orden), entrada))
+        self.entradas[emergencia['id']] = entrada
+        if emergencia.get('ubicacion'):
+            self.por_ubicacion[emergencia['ubicacion']] = emergencia['id']
+
+    def _reemplazar(self, emergencia_id, emergencia):
+        self._desindexar(self.entradas[emergencia_id])
+        self._insertar(emergencia)
+        # Compactar cuando las entradas invalidadas dominan el montículo
+        if len(self.monticulo) > 2 * len(self.entradas) + 64:
+            self.monticulo = [item for item in self.monticulo if item[2].vigente]
+            heapq.heapify(self.monticulo)
+
+    def _desindexar(self, entrada):
+        entrada.vigente = False
+        ubicacion = entrada.emergencia.get('ubicacion')
+        if ubicacion and self.por_ubicacion.get(ubicacion) == entrada.emergencia['id']:
+            del self.por_ubicacion[ubicacion]
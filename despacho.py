@@ -0,0 +1,161 @@
+# despacho.py
+
+import math
+import threading
+
+from energia import TIEMPO_ATERRIZAJE, TIEMPO_DESPEGUE, VELOCIDAD_CRUCERO, ModeloEnergia
+from proyeccion import Proyeccion
+
+TAMANO_CELDA = 1000.0             # Lado de las celdas del índice espacial en metros
+
+# Segundos que tarda un dron en poder salir según el estado de su máquina de estados.
+# Los estados ausentes no están disponibles para un nuevo despacho.
+ESPERA_POR_ESTADO = {
+    'en_tierra': TIEMPO_DESPEGUE,
+    'aterrizando': TIEMPO_ATERRIZAJE + TIEMPO_DESPEGUE,
+}
+
+
+class EstadoDespacho:
+    """Última información conocida de un dron para decidir despachos."""
+    __slots__ = ('dron_id', 'x', 'y', 'base', 'bateria', 'estado', 'celda')
+
+    def __init__(self, dron_id, x, y, base, bateria, estado):
+        self.dron_id = dron_id
+        self.x = x
+        self.y = y
+        self.base = base          # (x, y) de la base a la que regresa
+        self.bateria = bateria
+        self.estado = estado
+        self.celda = None
+
+
+class IndiceEspacial:
+    """Rejilla uniforme sobre coordenadas planas en metros: celda -> conjunto de ids."""
+
+    def __init__(self, tamano_celda=TAMANO_CELDA):
+        self.tamano_celda = tamano_celda
+        self.celdas = {}
+
+    def celda(self, x, y):
+        return (math.floor(x / self.tamano_celda), math.floor(y / self.tamano_celda))
+
+    def mover(self, dron_id, celda_anterior, celda_nueva):
+        if celda_anterior == celda_nueva:
+            return
+        if celda_anterior is not None:
+            ocupantes = self.celdas[celda_anterior]
+            ocupantes.discard(dron_id)
+            if not ocupantes:
+                del self.celdas[celda_anterior]
+        self.celdas.setdefault(celda_nueva, set()).add(dron_id)
+
+    def anillo(self, centro, radio):
+        """Ids de los drones en las celdas a distancia de Chebyshev exacta `radio` del centro."""
+        cx, cy = centro
+        if radio == 0:
+            yield from self.celdas.get(centro, ())
+            return
+        for i in range(-radio, radio + 1):
+            for celda in ((cx + i, cy - radio), (cx + i, cy + radio)):
+                yield from self.celdas.get(celda, ())
+        for j in range(-radio + 1, radio):
+            for celda in ((cx - radio, cy + j), (cx + radio, cy + j)):
+                yield from self.celdas.get(celda, ())
+
+
+class Despachador:
+    """
+    Elige el dron con menor tiempo estimado de llegada a una emergencia.
+    Las posiciones se mantienen en un IndiceEspacial alimentado por la telemetría,
+    y la búsqueda recorre anillos de celdas alrededor de la emergencia hasta que
+    ningún dron más lejano pueda mejorar la mejor estimación encontrada. La batería
+    se comprueba con el modelo de energía (ModeloEnergia por defecto).
+    """
+
+    def __init__(self, origen, tamano_celda=TAMANO_CELDA, velocidad=VELOCIDAD_CRUCERO, energia=None):
+        self.proyeccion = Proyeccion(*origen)
+        self.indice = IndiceEspacial(tamano_celda)
+        self.velocidad = velocidad
+        self.energia = energia or ModeloEnergia(velocidad=velocidad)
+        self.drones = {}
+        self.lock = threading.Lock()   # Telemetría y despachos llegan desde hilos distintos
+
+    def a_plano(self, lat, lon):
+        """Proyección local a metros (este, norte) respecto del origen."""
+        return self.proyeccion.a_plano(lat, lon)
+
+    def registrar_dron(self, dron_id, base, bateria=100, estado='en_tierra', posicion=None):
+        """Da de alta un dron con su base (lat, lon) y, si se conoce, su posición actual."""
+        bx, by = self.a_plano(*base)
+        x, y = self.a_plano(*posicion) if posicion else (bx, by)
+        with self.lock:
+            dron = EstadoDespacho(dron_id, x, y, (bx, by), bateria, estado)
+            self.drones[dron_id] = dron
+            self._reubicar(dron)
+
+    def actualizar(self, dron_id, posicion=None, bateria=None, estado=None):
+        """Aplica una muestra de telemetría o un cambio de estado de un dron registrado."""
+        with self.lock:
+            dron = self.drones.get(dron_id)
+            if dron is None:
+                return
+            if posicion is not None:
+                dron.x, dron.y = self.a_plano(*posicion)
+                self._reubicar(dron)
+            if bateria is not None:
+                dron.bateria = bateria
+            if estado is not None:
+                dron.estado = estado
+
+    def procesar_actualizacion(self, update, dron_id=None):
+        """
+        Alimenta el despachador con un mensaje del flujo de la interfaz. El dron es el
+        de su 'dron_id', o `dron_id` si el mensaje no lo trae.
+        """
+        tipo = update.get('type')
+        dron_id = update.get('dron_id', dron_id)
+        if tipo == 'estado_dron':
+            data = update['data']
+            self.actualizar(dron_id, posicion=data['posicion_actual'], bateria=data['bateria'])
+        elif tipo == 'estado_maquina':
+            self.actualizar(dron_id, estado=update['data'])
+
+    def _reubicar(self, dron):
+        celda = self.indice.celda(dron.x, dron.y)
+        self.indice.mover(dron.dron_id, dron.celda, celda)
+        dron.celda = celda
+
+    def estimar(self, dron, x, y):
+        """Segundos estimados hasta llegar a (x, y), o None si el dron no puede atenderla."""
+        espera = ESPERA_POR_ESTADO.get(dron.estado)
+        if espera is None:
+            return None
+        if not self.energia.factible(dron.bateria, (dron.x, dron.y), (x, y), dron.base):
+            return None
+        return espera + math.hypot(x - dron.x, y - dron.y) / self.velocidad
+
+    def seleccionar(self, lat, lon):
+        """Devuelve (dron_id, segundos estimados) del mejor dron disponible, o (None, None)."""
+        x, y = self.a_plano(lat, lon)
+        espera_minima = min(ESPERA_POR_ESTADO.values())
+        with self.lock:
+            centro = self.indice.celda(x, y)
+            mejor, mejor_eta = None, None
+            vistos, radio = 0, 0
+            while vistos < len(self.drones):
+                # Ningún dron a partir de este anillo está más cerca que (radio - 1) celdas
+                cota = espera_minima + max(0, radio - 1) * self.indice.tamano_celda / self.velocidad
+                if mejor_eta is not None and cota >= mejor_eta:
+                    break
+                for dron_id in self.indice.anillo(centro, radio):
+                    vistos += 1
+                    eta = self.estimar(self.drones[dron_id], x, y)
+                    if eta is not None and (mejor_eta is None or eta < mejor_eta):
+                        mejor, mejor_eta = dron_id, eta
+                radio += 1
+            return mejor, mejor_eta
+
+    def reservar(self, dron_id):
+        """Marca el dron como asignado hasta que su máquina de estados informe el nuevo estado."""
+        self.actualizar(dron_id, estado='asignado')
@@ -0,0 +1,131 @@
+# energia.py
+
+import math
+
+GRAVEDAD = 9.81                   # m/s²
+
+# Modelo de energía del dron con el DEA a bordo
+CAPACIDAD_BATERIA = 222.0         # Wh (batería 6S de 10 Ah)
+MASA_DRON = 4.5                   # kg sin carga
+MASA_CARGA = 1.5                  # kg del DEA
+POTENCIA_SUSPENSION = 800.0       # W en vuelo estacionario con la masa de referencia (dron + DEA)
+POTENCIA_CRUCERO = 650.0          # W a la velocidad de crucero con la masa de referencia
+VELOCIDAD_CRUCERO = 60 / 3.6      # m/s respecto del aire (60 km/h, la velocidad de vuelo del Drone)
+EFICIENCIA_ASCENSO = 0.5          # Fracción de la energía eléctrica que se convierte en altura
+RESERVA_BATERIA = 20.0            # % que debe quedar al volver a la base
+ALTITUD_MISION = 100.0            # m de la altitud de crucero del Drone
+TIEMPO_DESPEGUE = 3.0             # s de la secuencia de despegue
+TIEMPO_ATERRIZAJE = 3.0           # s de la secuencia de aterrizaje
+TIEMPO_ASISTENCIA = 5.0           # s de asistencia en el lugar de la emergencia
+
+
+class ModeloEnergia:
+    """
+    Consumo de batería según la potencia del vuelo: estacionario frente a crucero,
+    coste del ascenso y viento constante. Las constantes derivadas se calculan al
+    construir el modelo, así porcentaje_muestra() (una muestra de telemetría) y
+    factible() (ida, asistencia y regreso con reserva) son fórmulas cerradas de unas
+    pocas operaciones, aptas para miles de consultas por segundo.
+    """
+
+    def __init__(self, capacidad=CAPACIDAD_BATERIA, masa=MASA_DRON, carga=MASA_CARGA,
+                 potencia_suspension=POTENCIA_SUSPENSION, potencia_crucero=POTENCIA_CRUCERO,
+                 velocidad=VELOCIDAD_CRUCERO, eficiencia_ascenso=EFICIENCIA_ASCENSO, viento=(0.0, 0.0),
+                 reserva=RESERVA_BATERIA, altitud=ALTITUD_MISION, tiempo_despegue=TIEMPO_DESPEGUE,
+                 tiempo_aterrizaje=TIEMPO_ATERRIZAJE, tiempo_asistencia=TIEMPO_ASISTENCIA):
+        self.velocidad = velocidad
+        self.viento = viento
+        self.reserva = reserva
+        self.masa = masa + carga
+        # La potencia inducida crece con la masa como (m / m_ref)^1.5
+        factor_masa = (self.masa / (MASA_DRON + MASA_CARGA)) ** 1.5
+        self.potencia_suspension = potencia_suspension * factor_masa
+        self.potencia_crucero = potencia_crucero * factor_masa
+        self.porcentaje_por_joule = 100.0 / (capacidad * 3600.0)
+        self.joules_por_metro_ascenso = self.masa * GRAVEDAD / eficiencia_ascenso
+        self.viento_cuadrado = viento[0] ** 2 + viento[1] ** 2
+        # Porcentaje por metro recorrido a velocidad de crucero (sin viento)
+        self.porcentaje_por_metro = self.potencia_crucero / velocidad * self.porcentaje_por_joule
+        # Porcentaje fijo de una misión: despegue con ascenso, asistencia y aterrizaje. En
+        # estacionario el dron vuela contra el viento, así que su potencia es la de esa velocidad
+        estacionario = tiempo_despegue + tiempo_asistencia + tiempo_aterrizaje
+        self.porcentaje_fijo = (self.potencia(math.sqrt(self.viento_cuadrado)) * estacionario
+                                + self.joules_por_metro_ascenso * altitud) * self.porcentaje_por_joule
+
+    def potencia(self, velocidad_aire):
+        """W consumidos a la velocidad respecto del aire indicada (m/s)."""
+        fraccion = velocidad_aire / self.velocidad
+        if fraccion <= 1.0:
+            return self.potencia_suspension + (self.potencia_crucero - self.potencia_suspension) * fraccion
+        # Por encima del crucero domina la resistencia parásita, que crece con v³
+        return self.potencia_crucero * fraccion ** 3
+
+    def porcentaje_muestra(self, dx, dy, dz, dt):
+        """% de batería de un intervalo de vuelo de dt segundos con desplazamiento (dx, dy, dz) en metros."""
+        energia = self.joules_por_metro_ascenso * dz if dz > 0 else 0.0
+        if dt > 0:
+            aire_x = dx / dt - self.viento[0]
+            aire_y = dy / dt - self.viento[1]
+            energia += self.potencia(math.hypot(aire_x, aire_y)) * dt
+        return energia * self.porcentaje_por_joule
+
+    def velocidad_suelo(self, ux, uy):
+        """m/s sobre el suelo volando a crucero en la dirección unitaria (ux, uy); 0 si el viento lo impide."""
+        a_favor = ux * self.viento[0] + uy * self.viento[1]
+        discriminante = self.velocidad ** 2 - self.viento_cuadrado + a_favor ** 2
+        if discriminante <= 0:
+            return 0.0
+        return max(0.0, a_favor + math.sqrt(discriminante))
+
+    def porcentaje_tramo(self, dx, dy):
+        """% de batería de un tramo recto a crucero de (dx, dy) metros."""
+        distancia = math.hypot(dx, dy)
+        if distancia == 0:
+            return 0.0
+        if not self.viento_cuadrado:
+            return distancia * self.porcentaje_por_metro
+        suelo = self.velocidad_suelo(dx / distancia, dy / distancia)
+        if suelo <= 0:
+            return math.inf
+        return self.potencia_crucero * distancia / suelo * self.porcentaje_por_joule
+
+    def porcentaje_mision(self, origen, destino, base):
+        """% de batería de ir de origen a destino, asistir y volver a la base; puntos (x, y) en metros."""
+        return (self.porcentaje_fijo
+                + self.porcentaje_tramo(destino[0] - origen[0], destino[1] - origen[1])
+                + self.porcentaje_tramo(base[0] - destino[0], base[1] - destino[1]))
+
+    def factible(self, bateria, origen, destino, base):
+        """True si con `bateria` % el dron completa la misión y vuelve con la reserva."""
+        return bateria - self.porcentaje_mision(origen, destino, base) >= self.reserva
+
+    def alcance(self, bateria):
+        """Radio en metros de una misión de ida y vuelta desde la base con `bateria` % y sin viento."""
+        disponible = bateria - self.reserva - self.porcentaje_fijo
+        return max(0.0, disponible / self.porcentaje_por_metro / 2)
+
+
+class ConsumoPlano:
+    """
+    Consumo constante de `consumo` % por segundo de vuelo, con la misma interfaz que
+    ModeloEnergia. Lo usa la repetición de llamadas para reproducir el modelo anterior.
+    """
+
+    def __init__(self, consumo, velocidad=VELOCIDAD_CRUCERO, reserva=RESERVA_BATERIA):
+        self.consumo = consumo
+        self.velocidad = velocidad
+        self.reserva = reserva
+
+    def porcentaje_muestra(self, dx, dy, dz, dt):
+        return self.consumo * dt
+
+    def porcentaje_mision(self, origen, destino, base):
+        ida = math.hypot(destino[0] - origen[0], destino[1] - origen[1]) / self.velocidad
+        regreso = math.hypot(base[0] - destino[0], base[1] - destino[1]) / self.velocidad
+        return (ida + regreso) * self.consumo
+
+    def factible(self, bateria, origen, destino, base):
+        return bateria - self.porcentaje_mision(origen, destino, base) >= self.reserva
+
+    def alcance(self, bateria):
+        return max(0.0, (bateria - self.reserva) / self.consumo * self.velocidad / 2)
@@ -0,0 +1,203 @@
+# flota.py
+
+import itertools
+import queue
+
+from clases import Drone, RegistroDron
+from maquina_estados import MaquinaEstados
+from planificacion_rutas import PlanificadorRutas
+from programador import ColaNotificada, Despertador, Programador
+from reloj import reloj_para_escala
+from simulacion import MotorSimulacion, PublicadorPosicion, coord_to_simulation, simulation_to_coord, DT
+
+try:
+    from motor_flota import MotorFlota
+except ImportError:   # Sin NumPy, cada dron avanza con su propio MotorSimulacion
+    MotorFlota = None
+
+
+class SalidaDron:
+    """
+    Salida de un dron de la flota: entrega cada mensaje a su máquina de estados y
+    una copia etiquetada con el id del dron al flujo único de la interfaz.
+    """
+
+    def __init__(self, dron_id, cola_maquina, cola_interfaz):
+        self.dron_id = dron_id
+        self.cola_maquina = cola_maquina
+        self.cola_interfaz = cola_interfaz
+
+    def put(self, mensaje):
+        self.cola_maquina.put(mensaje)
+        self.cola_interfaz.put(dict(mensaje, dron_id=self.dron_id))
+
+
+class EntradaDron:
+    """
+    Cola de la máquina de estados hacia su dron: los comandos llegan al dron y las
+    actualizaciones de estado ('type') se etiquetan y van a la interfaz.
+    """
+
+    def __init__(self, dron_id, cola_comandos, cola_interfaz):
+        self.dron_id = dron_id
+        self.cola_comandos = cola_comandos
+        self.cola_interfaz = cola_interfaz
+
+    def put(self, mensaje):
+        if 'type' in mensaje:
+            self.cola_interfaz.put(dict(mensaje, dron_id=self.dron_id))
+        else:
+            self.cola_comandos.put(mensaje)
+
+
+class UnidadFlota:
+    """Dron, máquina de estados y motor de simulación de un miembro de la flota."""
+
+    def __init__(self, dron_id, base, dron, maquina, motor, cola_comandos, cola_simulacion):
+        self.dron_id = dron_id
+        self.base = base
+        self.dron = dron
+        self.maquina = maquina
+        self.motor = motor
+        self.cola_comandos = cola_comandos          # Comandos hacia el dron
+        self.cola_simulacion = cola_simulacion      # Comandos del dron hacia su motor
+
+
+class GestorFlota:
+    """
+    Flota de drones DEA repartidos en varias bases.
+    Cada dron tiene su propia máquina de estados y un motor de simulación sin
+    interfaz gráfica, pero todos comparten un mismo Programador: el número de hilos
+    es constante sin importar el tamaño de la flota. Los comandos se enrutan por id
+    de dron y todas las actualizaciones se multiplexan en una sola cola de interfaz,
+    etiquetadas con 'dron_id'.
+
+    Motores, maniobras, batería y registro siguen el reloj del programador. Sin programador se
+    crea uno con el reloj de escala_tiempo; con escala None el reloj es virtual y la
+    flota se conduce con programador.simular() en lugar de iniciar().
+    """
+
+    def __init__(self, registro_eventos, bases, drones_por_base=1, programador=None,
+                 cola_interfaz=None, escala_tiempo=1.0, despachador=None):
+        self.registro_eventos = registro_eventos
+        self.despachador = despachador   # Si existe, se le registran los drones creados
+        self.programador = programador or Programador(reloj=reloj_para_escala(escala_tiempo))
+        self.registro_eventos.usar_reloj(self.programador.reloj)
+        self.cola_interfaz = cola_interfaz if cola_interfaz is not None else queue.Queue()
+        # Comandos con 'dron_id' desde la interfaz; se enrutan en cuanto llegan
+        self.cola_comandos = ColaNotificada(Despertador(self.programador, self.enrutar_comandos))
+        self.unidades = {}
+        self.contador = itertools.count(1)
+        # Con NumPy, la cinemática de toda la flota avanza en un solo paso vectorizado
+        self.motor_flota = MotorFlota(reloj=self.programador.reloj) if MotorFlota else None
+        # Un planificador compartido: todos los drones aprovechan su caché de rutas
+        self.planificador = PlanificadorRutas()
+
+        for base in bases:
+            for _ in range(drones_por_base):
+                self.agregar_dron(base)
+
+        # Un tick del programador avanza varios pasos fijos cuando se acelera el tiempo,
+        # de modo que los ticks siguen llegando a unos 60 por segundo real
+        escala = self.programador.reloj.escala
+        self.pasos_por_tick = max(1, round(escala)) if escala else 1
+        periodo_simulacion = DT * self.pasos_por_tick
+
+        self.tareas = [self.programador.cada(periodo_simulacion, self.paso_simulacion)]
+
+    def agregar_dron(self, base):
+        """Crea un dron en la base (lat, lon) indicada y devuelve su id."""
+        dron_id = f"DEA-{next(self.contador):03d}"
+        # El dron y la máquina de estados se despiertan con cada mensaje de sus colas
+        cola_comandos = ColaNotificada()
+        cola_eventos = ColaNotificada()
+        cola_simulacion = queue.Queue()   # El motor la vacía en cada paso
+        cola_actualizaciones_simulacion = ColaNotificada()
+
+        # Dron y máquina comparten una vista del registro con la misión de este dron
+        registro = RegistroDron(self.registro_eventos, dron_id)
+
+        # Las posiciones se publican al ritmo del reloj de la flota, no del de pared
+        publicador = PublicadorPosicion(cola_actualizaciones_simulacion, reloj=self.programador.reloj)
+        if self.motor_flota:
+            motor = self.motor_flota.agregar(cola_actualizaciones_simulacion, base=coord_to_simulation(*base),
+                                             publicador=publicador, planificador=self.planificador)
+        else:
+            motor = MotorSimulacion(cola_actualizaciones_simulacion, base=coord_to_simulation(*base),
+                                    publicador=publicador, planificador=self.planificador)
+        maquina = MaquinaEstados(
+            registro,
+            cola_eventos,
+            EntradaDron(dron_id, cola_comandos, self.cola_interfaz),
+            programador=self.programador
+        )
+        dron = Drone(
+            registro,
+            cola_comandos,
+            SalidaDron(dron_id, cola_eventos, self.cola_interfaz),
+            cola_simulacion,
+            cola_actualizaciones_simulacion,
+            programador=self.programador,
+            dron_id=dron_id,
+            base=base
+        )
+        self.unidades[dron_id] = UnidadFlota(dron_id, base, dron, maquina, motor, cola_comandos, cola_simulacion)
+        if self.despachador:
+            self.despachador.registrar_dron(dron_id, base)
+        return dron_id
+
+    def enviar_comando(self, dron_id, comando):
+        """Entrega un comando al dron indicado."""
+        self.unidades[dron_id].cola_comandos.put(comando)
+
+    def enrutar_comandos(self):
+        """Reparte los comandos de la cola común según su 'dron_id'."""
+        try:
+            while True:
+                comando = self.cola_comandos.get_nowait()
+                unidad = self.unidades.get(comando.get('dron_id'))
+                if unidad:
+                    unidad.cola_comandos.put(comando)
+                else:
+                    self.registro_eventos.agregar_evento(f"Comando para un dron desconocido: {comando}")
+        except queue.Empty:
+            pass
+
+    def paso_simulacion(self):
+        """Aplica los comandos pendientes y avanza los motores de todos los drones."""
+        for unidad in self.unidades.values():
+            try:
+                while True:
+                    unidad.motor.procesar_comando(unidad.cola_simulacion.get_nowait())
+            except queue.Empty:
+                pass
+            if not self.motor_flota:
+                for _ in range(self.pasos_por_tick):
+                    unidad.motor.paso()
+        if self.motor_flota:
+            for _ in range(self.pasos_por_tick):
+                self.motor_flota.paso()
+
+    def estados(self):
+        """Estado de la máquina de estados de cada dron."""
+        return {dron_id: unidad.maquina.estado_actual for dron_id, unidad in self.unidades.items()}
+
+    def posiciones(self):
+        """(lat, lon) de la simulación de cada dron; con MotorFlota se convierten en lote."""
+        if self.motor_flota:
+            lats, lons = self.motor_flota.coordenadas()
+            return {dron_id: (float(lats[unidad.motor.indice]), float(lons[unidad.motor.indice]))
+                    for dron_id, unidad in self.unidades.items()}
+        return {dron_id: simulation_to_coord(*unidad.motor.posicion[:2]) for dron_id, unidad in self.unidades.items()}
+
+    def iniciar(self):
+        self.programador.iniciar()
+        return self
+
+    def detener(self):
+        for tarea in self.tareas:
+            tarea.cancelar()
+        for unidad in self.unidades.values():
+            unidad.dron.detener()
+            unidad.maquina.detener()
+        self.programador.detener()
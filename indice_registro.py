@@ -0,0 +1,228 @@
+# indice_registro.py
+
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+from clases import CodigoEvento, Evento, Origen, EPOCA_MONOTONICA, agregar_manejador_log
+
+
+class SerieTemporal:
+    """Lista de eventos ordenada por tiempo, con búsqueda de rangos por bisección."""
+
+    def __init__(self):
+        self.tiempos = []
+        self.eventos = []
+
+    def agregar(self, evento):
+        if not self.tiempos or evento.tiempo >= self.tiempos[-1]:
+            self.tiempos.append(evento.tiempo)
+            self.eventos.append(evento)
+        else:
+            # Llegada fuera de orden entre hilos: insertar en su lugar (casi siempre al final)
+            posicion = bisect_right(self.tiempos, evento.tiempo)
+            self.tiempos.insert(posicion, evento.tiempo)
+            self.eventos.insert(posicion, evento)
+
+    def rango(self, desde=None, hasta=None):
+        inicio = 0 if desde is None else bisect_left(self.tiempos, desde)
+        fin = len(self.tiempos) if hasta is None else bisect_right(self.tiempos, hasta)
+        return self.eventos[inicio:fin]
+
+    def __len__(self):
+        return len(self.eventos)
+
+
+class IndiceRegistro:
+    """
+    Índices incrementales sobre los eventos de RegistroEventos para análisis posterior.
+    Mantiene series ordenadas por tiempo globales, por código de evento, por misión y
+    por (misión, código), de modo que las consultas por rango y las duraciones por
+    estado se resuelven con bisección sin recorrer todo el log.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()  # Protege las series frente a consultas concurrentes
+        self.todos = SerieTemporal()
+        self.por_codigo = defaultdict(SerieTemporal)
+        self.por_mision = defaultdict(SerieTemporal)
+        self.por_mision_codigo = defaultdict(SerieTemporal)
+
+    def agregar(self, evento):
+        with self.lock:
+            self.todos.agregar(evento)
+            self.por_codigo[evento.codigo].agregar(evento)
+            if evento.mision:
+                self.por_mision[evento.mision].agregar(evento)
+                self.por_mision_codigo[(evento.mision, evento.codigo)].agregar(evento)
+
+    def misiones(self):
+        with self.lock:
+            return sorted(self.por_mision)
+
+    def consultar(self, desde=None, hasta=None, codigo=None, mision=None, origen=None):
+        """Eventos entre desde y hasta (instantes de RegistroEventos.ahora()) que cumplen los filtros."""
+        with self.lock:
+            if mision is not None and codigo is not None:
+                serie = self.por_mision_codigo.get((mision, codigo))
+            elif mision is not None:
+                serie = self.por_mision.get(mision)
+            elif codigo is not None:
+                serie = self.por_codigo.get(codigo)
+            else:
+                serie = self.todos
+            eventos = serie.rango(desde, hasta) if serie else []
+        if origen is not None:
+            eventos = [evento for evento in eventos if evento.origen == origen]
+        return eventos
+
+    def intervalo_mision(self, mision):
+        """Devuelve (inicio, fin) de la misión o None si no existe."""
+        with self.lock:
+            serie = self.por_mision.get(mision)
+            if not serie:
+                return None
+            return serie.tiempos[0], serie.tiempos[-1]
+
+    def duraciones_por_estado(self, mision, hasta=None):
+        """
+        Segundos pasados en cada estado durante la misión. El último estado se
+        cuenta hasta `hasta` o, si no se indica, hasta el último evento de la misión.
+        """
+        intervalo = self.intervalo_mision(mision)
+        if intervalo is None:
+            return {}
+        fin = intervalo[1] if hasta is None else hasta
+        transiciones = self.consultar(hasta=fin, codigo=CodigoEvento.TRANSICION, mision=mision)
+        duraciones = defaultdict(float)
+        for actual, siguiente in zip(transiciones, transiciones[1:] + [None]):
+            termino = siguiente.tiempo if siguiente else fin
+            duraciones[actual.texto] += max(0.0, termino - actual.tiempo)
+        return dict(duraciones)
+
+    def duracion_en_estado(self, estado, mision):
+        return self.duraciones_por_estado(mision).get(estado, 0.0)
+
+
+class ManejadorIndice(logging.Handler):
+    """Alimenta un IndiceRegistro desde el hilo escritor del log, fuera del camino de los productores."""
+
+    def __init__(self, indice):
+        super().__init__()
+        self.indice = indice
+
+    def emit(self, record):
+        if record.args and isinstance(record.args[0], Evento):
+            self.indice.agregar(record.args[0])
+
+
+def indexar_registro_en_vivo(indice=None):
+    """Crea (o reutiliza) un índice y lo conecta al log para indexar cada evento escrito."""
+    indice = indice or IndiceRegistro()
+    agregar_manejador_log(ManejadorIndice(indice))
+    return indice
+
+
+# Importación de logs de texto existentes ------------------------------------------
+
+_LINEA_LOG = re.compile(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),(\d{3}):(\w+):(.*)$')
+_MARCA_INTERNA = re.compile(r'^\[\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\] ')
+_NUMERO = r'(-?\d+(?:\.\d+)?)'
+
+# Patrones de mensajes conocidos: (expresión, código, constructor de (valores, texto))
+_PATRONES = [
+    (re.compile(r'^Transici.n de estado: (\w+)'), CodigoEvento.TRANSICION, lambda m: ((), m.group(1))),
+    # Formato del log generado por la máquina de estados anterior
+    (re.compile(r'^Finished processing state (\w+) enter callbacks'), CodigoEvento.TRANSICION,
+     lambda m: ((), m.group(1))),
+    (re.compile(rf'^Posici.n actualizada: [(\[]{_NUMERO}, {_NUMERO}[)\]]'), CodigoEvento.POSICION,
+     lambda m: ((float(m.group(1)), float(m.group(2))), None)),
+    (re.compile(rf'^Bater.a actual: {_NUMERO}%'), CodigoEvento.BATERIA, lambda m: ((float(m.group(1)),), None)),
+    (re.compile(r'^Estado del dron actualizado\.'), CodigoEvento.ESTADO_DRON, lambda m: ((), None)),
+    (re.compile(rf'^Despegando\.\.\. Altitud actual: {_NUMERO} m'), CodigoEvento.DESPEGUE,
+     lambda m: ((float(m.group(1)),), None)),
+    (re.compile(rf'^Aterrizando\.\.\. Altitud actual: {_NUMERO} m'), CodigoEvento.ATERRIZAJE,
+     lambda m: ((float(m.group(1)),), None)),
+]
+
+# Mensajes que abren una misión en logs de texto. El mensaje de RegistroEventos.iniciar_mision
+# siempre abre una misión nueva; los demás solo si no hay una misión en curso.
+_MISION_EXPLICITA = re.compile(r'^Misi.n iniciada hacia (.+)\.$')
+_INICIO_MISION = re.compile(
+    r'^(Iniciando vuelo hacia la emergencia en (?P<ubicacion>.+)\.'
+    r'|Enviando comando de arranque al drone'
+    r'|Recepci.n de comando de arranque)'
+)
+_FIN_MISION = ('en_tierra', 'en_espera')
+# Los logs antiguos no siempre registran la vuelta al reposo: una misión se cierra si
+# el dron vuelve a salir del reposo (otra misión) o tras una pausa sin eventos
+_SALIDA_REPOSO = re.compile(r'^Finished processing state (en_tierra|en_espera) exit callbacks')
+PAUSA_MAXIMA_MISION = 600.0   # Segundos sin eventos tras los que una misión se da por cerrada
+
+
+def _decodificar(linea):
+    # Los logs antiguos se escribieron con la codificación local (a veces latin-1)
+    try:
+        return linea.decode('utf-8')
+    except UnicodeDecodeError:
+        return linea.decode('latin-1')
+
+
+def interpretar_mensaje(mensaje):
+    """Convierte el texto de una línea de log en (código, valores, texto)."""
+    for patron, codigo, construir in _PATRONES:
+        coincidencia = patron.match(mensaje)
+        if coincidencia:
+            valores, texto = construir(coincidencia)
+            return codigo, valores, texto
+    return CodigoEvento.MENSAJE, (), mensaje
+
+
+def importar_log_texto(ruta='registro_dron.log', indice=None, pausa_maxima=PAUSA_MAXIMA_MISION):
+    """
+    Indexa un log de texto existente (p. ej. registro_dron.log) sin cargarlo completo
+    en memoria. Devuelve el índice con los eventos reconstruidos; los instantes se
+    expresan en la misma escala monotónica que los eventos en vivo. Una misión abierta
+    se cierra al volver al reposo, al empezar otra o tras `pausa_maxima` segundos sin eventos.
+    """
+    indice = indice or IndiceRegistro()
+    mision = 0
+    ultima_mision = 0
+    ultimo_instante = None
+    salio_de_reposo = False   # La misión abierta ya despegó
+    with open(ruta, 'rb') as archivo:
+        for linea in archivo:
+            coincidencia = _LINEA_LOG.match(_decodificar(linea).rstrip('\r\n'))
+            if not coincidencia:
+                continue  # Líneas de continuación (tracebacks, etc.)
+            fecha, milisegundos, _nivel, mensaje = coincidencia.groups()
+            instante = time.mktime(time.strptime(fecha, "%Y-%m-%d %H:%M:%S")) + int(milisegundos) / 1000
+            mensaje = _MARCA_INTERNA.sub('', mensaje)
+            if mision and instante - ultimo_instante > pausa_maxima:
+                mision = 0
+            ultimo_instante = instante
+
+            codigo, valores, texto = interpretar_mensaje(mensaje)
+            explicita = _MISION_EXPLICITA.match(mensaje)
+            implicita = None if explicita or mision else _INICIO_MISION.match(mensaje)
+            salida = _SALIDA_REPOSO.match(mensaje)
+            nueva_salida = salida and mision and salio_de_reposo
+            if explicita or implicita or nueva_salida:
+                ultima_mision += 1
+                mision = ultima_mision
+                salio_de_reposo = False
+                codigo, valores = CodigoEvento.INICIO_MISION, ()
+                if explicita:
+                    texto = explicita.group(1)
+                else:
+                    texto = (implicita and implicita.group('ubicacion')) or mensaje
+            if salida:
+                salio_de_reposo = True
+            indice.agregar(Evento(instante - EPOCA_MONOTONICA, Origen.SISTEMA, codigo, valores, texto, mision))
+
+            if codigo == CodigoEvento.TRANSICION and texto in _FIN_MISION:
+                mision = 0
+    return indice
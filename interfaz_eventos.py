@@ -1,15 +1,20 @@
 # interfaz_eventos.py
 
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import messagebox, simpledialog
 
 class InterfazEventos(tk.Toplevel):
-    def __init__(self, queue_to_drone, registro_eventos):
+    def __init__(self, queue_to_drone, registro_eventos, emergencias=None, al_reubicar=None):
         super().__init__()
         self.title("Centro de Control de Operaciones - Dron DEA")
         self.geometry("600x800")
         self.queue_to_drone = queue_to_drone
         self.registro_eventos = registro_eventos
+        # Cola de emergencias de la interfaz de usuario: un cambio de localización de un
+        # caso que aún no se despachó se aplica en la cola; al_reubicar(id, ubicacion)
+        # mueve su marcador
+        self.emergencias = emergencias
+        self.al_reubicar = al_reubicar
 
         # Lista de eventos posibles de la máquina de estados
         self.eventos = [
@@ -110,7 +115,32 @@ class InterfazEventos(tk.Toplevel):
         comando = {
             'tipo': evento
         }
+        if evento == 'cambio_localizacion_emergencia':
+            ubicacion = simpledialog.askstring("Cambio de localización", "Nueva ubicación (lat, lon):", parent=self)
+            if not ubicacion:
+                return
+            caso = None
+            if self.emergencias:
+                caso = simpledialog.askinteger(
+                    "Cambio de localización", "Caso en cola (vacío para el dron en vuelo):", parent=self
+                )
+            if self.reubicar_en_cola(caso, ubicacion):
+                mensaje = f"Emergencia {caso} en cola reubicada en {ubicacion}."
+                self.registro_eventos.agregar_evento(mensaje)
+                messagebox.showinfo("Emergencia Reubicada", mensaje)
+                return
+            comando['nueva_ubicacion'] = ubicacion
         self.queue_to_drone.put(comando)
         mensaje = f"Evento '{evento}' enviado al dron."
         self.registro_eventos.agregar_evento(mensaje)
         messagebox.showinfo("Evento Enviado", mensaje)
+
+    def reubicar_en_cola(self, emergencia_id, ubicacion):
+        """Cambia la ubicación del caso si sigue en cola; False si ya se despachó."""
+        if emergencia_id is None or self.emergencias is None:
+            return False
+        if not self.emergencias.actualizar(emergencia_id, ubicacion=ubicacion):
+            return False
+        if self.al_reubicar:
+            self.al_reubicar(emergencia_id, ubicacion)
+        return True
@@ -1,17 +1,32 @@
 # interfaz_usuario.py
 
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox
 from tkintermapview import TkinterMapView
-import csv
+import itertools
+import logging
 import os
 import threading
-import queue
 from datetime import datetime
 from clases import Drone, RegistroEventos
+from cola_emergencias import ColaEmergencias
+from archivo_emergencias import ArchivoEmergencias
+from vista_registro import VistaRegistro
+from capa_marcadores import CapaMarcadores
+from cache_teselas import CacheTeselas, Precarga, teselas_servicio, teselas_zona, RADIO_SERVICIO
+
+# Posición y zoom iniciales del mapa (Hospital Universitario San Ignacio)
+POSICION_INICIAL = (4.627925, -74.064692)
+ZOOM_INICIAL = 15
+
+# Llamadas del archivo cuyas teselas se precargan (las primeras que llegarán)
+EMERGENCIAS_PRECARGA = 500
+
+# Milisegundos entre cuadros de la interfaz: las actualizaciones se aplican una vez por cuadro
+PERIODO_CUADRO = 33
 
 class InterfazUsuario(tk.Tk):
-    def __init__(self, queue_to_drone, queue_from_drone, registro_eventos):
+    def __init__(self, queue_to_drone, queue_from_drone, registro_eventos, despachador=None):
         super().__init__()
         self.title("Centro de Control de Operaciones - Dron DEA")
         self.geometry("1400x900")
@@ -23,6 +38,9 @@ class InterfazUsuario(tk.Tk):
         # Referencia al registro de eventos
         self.registro_eventos = registro_eventos
 
+        # Despachador de flota opcional: elige el dron más rápido para cada emergencia
+        self.despachador = despachador
+
         # Variables de la interfaz
         self.selected_location = tk.StringVar()
         self.drone_status = tk.StringVar(value=(
@@ -34,15 +52,19 @@ class InterfazUsuario(tk.Tk):
             "  Posición: (4.627925, -74.064692)"
         ))
         self.estado_maquina = tk.StringVar(value="Estado de la Máquina de Estados: en_tierra")
-        self.emergencias_registradas = []
+        self.emergencias_registradas = ColaEmergencias()  # Por triaje, con envejecimiento
 
-        # Variables para manejar los casos de emergencia
-        self.casos_emergencia = []
-        self.indice_caso_actual = 0
+        # Variables para manejar los casos de emergencia (se leen a medida que llegan llamadas)
+        self.casos_emergencia = None
         self.cargar_emergencias_desde_archivo()
 
-        # Creamos un Lock para manejar el acceso a la interfaz desde hilos
+        # Actualizaciones recibidas por el hilo de la cola, pendientes de aplicar en el
+        # siguiente cuadro. Solo el hilo de Tk toca los widgets; el lock protege el búfer.
         self.lock = threading.Lock()
+        self.estado_dron_pendiente = None
+        self.estado_maquina_pendiente = None
+        self.registro_pendiente = []
+        self.posiciones_pendientes = {}   # Marcador de cada dron -> última posición
 
         # Crear las secciones de la interfaz
         self.crear_seccion_superior()
@@ -55,7 +77,7 @@ class InterfazUsuario(tk.Tk):
         self.actualizaciones_thread.start()
 
         # Iniciar el ciclo principal de la interfaz
-        self.after(1000, self.actualizar_interfaz)
+        self.after(PERIODO_CUADRO, self.actualizar_interfaz)
 
     def crear_seccion_superior(self):
         self.frame_superior = tk.Frame(self, bg="darkblue", height=50)
@@ -135,14 +157,51 @@ class InterfazUsuario(tk.Tk):
         self.frame_central = tk.Frame(self, bg="white")
         self.frame_central.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-        # Mapa interactivo
-        self.map_widget = TkinterMapView(self.frame_central, width=800, height=600)
+        # Mapa interactivo leído del almacén local de teselas. Si la vista inicial ya
+        # está guardada, el arranque no espera a la red; lo que falta de la zona de
+        # servicio se descarga en segundo plano.
+        self.cache_teselas = CacheTeselas()
+        self.map_widget = MapaCacheado(self.frame_central, cache=self.cache_teselas, width=800, height=600,
+                                       database_path=self.cache_teselas.ruta)
         self.map_widget.pack(fill=tk.BOTH, expand=True)
-        self.map_widget.set_position(4.627925, -74.064692)  # Coordenadas iniciales
-        self.map_widget.set_zoom(15)
+        self.map_widget.set_position(*POSICION_INICIAL)  # Coordenadas iniciales
+        self.map_widget.set_zoom(ZOOM_INICIAL)
+        # La lista de teselas se calcula en el hilo de la precarga, no al arrancar
+        self.precarga_teselas = Precarga(
+            self.cache_teselas,
+            lambda: teselas_servicio(POSICION_INICIAL, self.coordenadas_emergencias()),
+            al_terminar=self.precarga_terminada
+        ).iniciar()
+
+        # Marcadores de drones y emergencias, redibujados como mucho una vez por cuadro
+        self.capa_marcadores = CapaMarcadores(self.map_widget)
+        self.capa_marcadores.colocar("Dron", *POSICION_INICIAL, "Dron", agrupable=False)
+
+    def coordenadas_emergencias(self):
+        """(lat, lon) de las primeras llamadas del archivo de emergencias, para precargar sus teselas."""
+        if self.casos_emergencia is None:
+            return []
+        # Un lector propio: la precarga no comparte cursor con recibir_llamada
+        archivo = ArchivoEmergencias(self.casos_emergencia.ruta)
+        coordenadas = []
+        for emergencia in itertools.islice(archivo, EMERGENCIAS_PRECARGA):
+            try:
+                lat, lon = map(float, emergencia['ubicacion'].split(","))
+            except ValueError:
+                continue
+            coordenadas.append((lat, lon))
+        archivo.cerrar()
+        return coordenadas
+
+    def precarga_terminada(self, precarga):
+        # Sin red y con la zona inicial guardada, el mapa deja de intentar descargas.
+        # Se llama desde el hilo de la precarga: el cambio del mapa se hace en el de Tk.
+        if precarga.sin_red and self.cache_teselas.cubre(teselas_zona(*POSICION_INICIAL, RADIO_SERVICIO, [ZOOM_INICIAL])):
+            self.after(0, self.usar_solo_teselas_guardadas)
 
-        # Marcador del dron
-        self.drone_marker = self.map_widget.set_marker(4.627925, -74.064692, text="Dron")
+    def usar_solo_teselas_guardadas(self):
+        self.map_widget.use_database_only = True
+        logging.info("Mapa sin conexión: se muestran solo las teselas guardadas.")
 
     def crear_seccion_derecha(self):
         self.frame_derecho = tk.Frame(self, width=300, bg="lightgrey")
@@ -158,19 +217,19 @@ class InterfazUsuario(tk.Tk):
         )
         self.lbl_registro.pack(pady=10)
 
-        self.txt_registro = scrolledtext.ScrolledText(
+        # Solo se dibujan las filas visibles de las últimas líneas retenidas
+        self.vista_registro = VistaRegistro(
             self.frame_derecho,
             width=40,
             height=30,
             font=("Helvetica", 10),
         )
-        self.txt_registro.pack(pady=10)
+        self.vista_registro.pack(pady=10, fill=tk.BOTH, expand=True)
 
     def recibir_llamada(self):
-        if self.indice_caso_actual < len(self.casos_emergencia):
-            emergencia = self.casos_emergencia[self.indice_caso_actual]
-            self.indice_caso_actual += 1
-            self.emergencias_registradas.append(emergencia)
+        emergencia = self.casos_emergencia.siguiente() if self.casos_emergencia is not None else None
+        if emergencia:
+            emergencia_id = self.emergencias_registradas.agregar(emergencia)
             registro = (
                 f"LLAMADA: {emergencia['usuario']} reporta una emergencia de tipo "
                 f"'{emergencia['situacion']}' en {emergencia['ubicacion']}."
@@ -178,90 +237,154 @@ class InterfazUsuario(tk.Tk):
             self.agregar_a_registro(registro, origen="LLAMADA")
             self.registro_eventos.agregar_evento(registro)
             # Agregar marcador en el mapa
-            try:
-                lat, lon = map(float, emergencia['ubicacion'].split(","))
-                self.map_widget.set_marker(lat, lon, text="Emergencia")
-            except ValueError:
-                messagebox.showerror("Error", "La ubicación debe estar en formato 'latitud, longitud'.")
+            self.marcar_emergencia(emergencia_id, emergencia['ubicacion'])
         else:
             messagebox.showinfo("Información", "No hay más emergencias en la cola.")
 
+    def marcar_emergencia(self, emergencia_id, ubicacion):
+        """Coloca, mueve o mantiene (si el caso se fusionó) el marcador de una emergencia en cola."""
+        try:
+            lat, lon = map(float, ubicacion.split(","))
+        except ValueError:
+            messagebox.showerror("Error", "La ubicación debe estar en formato 'latitud, longitud'.")
+            return
+        self.capa_marcadores.colocar(('emergencia', emergencia_id), lat, lon, f"Emergencia {emergencia_id}")
+
     def enviar_dron(self):
         if self.emergencias_registradas:
-            emergencia = self.emergencias_registradas.pop(0)
+            emergencia = self.emergencias_registradas.extraer()
             ubicacion = emergencia['ubicacion']
-            registro = f"Dron enviado a la emergencia en {ubicacion}."
-            self.agregar_a_registro(registro, origen="DRON")
-            self.registro_eventos.agregar_evento(registro)
             # Enviar comando al dron
             comando = {
                 'tipo': 'recepcion_comando_arranque_vuelo',
                 'ubicacion': ubicacion
             }
+            if self.despachador:
+                try:
+                    lat, lon = map(float, ubicacion.split(","))
+                except ValueError:
+                    # El caso vuelve a la cola: corregible con un cambio de localización
+                    self.emergencias_registradas.devolver(emergencia)
+                    messagebox.showerror("Error", "La ubicación debe estar en formato 'latitud, longitud'.")
+                    return
+                dron_id, eta = self.despachador.seleccionar(lat, lon)
+                if dron_id is None:
+                    self.emergencias_registradas.devolver(emergencia)
+                    messagebox.showwarning("Advertencia", "No hay drones disponibles para esta emergencia.")
+                    return
+                self.despachador.reservar(dron_id)
+                comando['dron_id'] = dron_id
+                registro = f"Dron {dron_id} enviado a la emergencia en {ubicacion} (llegada estimada en {eta:.0f} s)."
+            else:
+                registro = f"Dron enviado a la emergencia en {ubicacion}."
+            self.agregar_a_registro(registro, origen="DRON")
+            self.registro_eventos.agregar_evento(registro)
             self.queue_to_drone.put(comando)
+            # El caso sale de la cola: su marcador deja de mostrarse
+            self.capa_marcadores.quitar(('emergencia', emergencia['id']))
         else:
             messagebox.showwarning("Advertencia", "No hay emergencias registradas para enviar el dron.")
 
     def mostrar_formulario_emergencia(self):
         FormularioEmergencia(self)
 
-    def agregar_a_registro(self, mensaje, origen="SISTEMA"):
+    def formatear_registro(self, mensaje, origen="SISTEMA"):
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        entrada = f"[{timestamp}] [{origen}] {mensaje}\n"
-        self.txt_registro.insert(tk.END, entrada)
-        self.txt_registro.see(tk.END)
+        return f"[{timestamp}] [{origen}] {mensaje}"
+
+    def agregar_a_registro(self, mensaje, origen="SISTEMA"):
+        entrada = self.formatear_registro(mensaje, origen)
+        self.vista_registro.agregar(entrada, origen)
         # Registrar en RegistroEventos
         self.registro_eventos.agregar_evento(entrada)
 
-    def actualizar_posicion_mapa(self, posicion):
+    def actualizar_posicion_mapa(self, dron, posicion):
         lat, lon = posicion
-        if self.drone_marker:
-            self.drone_marker.set_position(lat, lon)
+        if dron in self.capa_marcadores:
+            self.capa_marcadores.mover(dron, lat, lon)
         else:
-            self.drone_marker = self.map_widget.set_marker(lat, lon, text="Dron")
+            self.capa_marcadores.colocar(dron, lat, lon, dron, agrupable=False)
 
     def recibir_actualizaciones(self):
-        """Hilo para recibir actualizaciones del dron y de la máquina de estados."""
+        """
+        Hilo para recibir actualizaciones del dron y de la máquina de estados.
+        Bloquea en la cola sin timeout y termina al recibir None. No toca los widgets:
+        deja la última versión de cada estado y las líneas del registro en el búfer.
+        """
         while True:
-            try:
-                update = self.queue_from_drone.get(timeout=1)  # Esperar hasta 1 segundo
-                if update:
-                    if update.get('type') == 'estado_dron':
-                        # Actualizar estado interno
-                        estado = update.get('data')
-                        # Construir el texto con toda la información
-                        estado_texto = (
-                            "Estado del Dron:\n"
-                            f"  Estado Actual: {estado['estado']}\n"
-                            f"  Batería: {estado['bateria']}%\n"
-                            f"  Velocidad: {estado['velocidad']} km/h\n"
-                            f"  Altitud: {estado['altitud']} m\n"
-                            f"  Posición: {estado['posicion_actual']}"
-                        )
-                        with self.lock:
-                            self.drone_status.set(estado_texto)
-                        # Actualizar marcador en el mapa
-                        self.actualizar_posicion_mapa(estado['posicion_actual'])
-                    elif update.get('type') == 'estado_maquina':
-                        estado_maquina = update.get('data')
-                        with self.lock:
-                            self.estado_maquina.set(f"Estado de la Máquina de Estados: {estado_maquina}")
-                    elif update.get('type') == 'evento':
-                        mensaje = update.get('data')
-                        self.agregar_a_registro(mensaje, origen="DRON")
-                        self.registro_eventos.agregar_evento(mensaje)
-            except queue.Empty:
-                continue  # No hay actualizaciones, continuar esperando
+            update = self.queue_from_drone.get()
+            if update is None:
+                return
+            if self.despachador:
+                # El dron único de main.py publica sin 'dron_id'
+                self.despachador.procesar_actualizacion(update, dron_id="Dron")
+            tipo = update.get('type')
+            if tipo == 'estado_dron':
+                estado = update.get('data')
+                with self.lock:
+                    self.estado_dron_pendiente = estado
+                    self.posiciones_pendientes[update.get('dron_id', "Dron")] = estado['posicion_actual']
+            elif tipo == 'estado_maquina':
+                with self.lock:
+                    self.estado_maquina_pendiente = update.get('data')
+            elif tipo == 'evento':
+                mensaje = update.get('data')
+                entrada = self.formatear_registro(mensaje, origen="DRON")
+                with self.lock:
+                    self.registro_pendiente.append((entrada, "DRON"))
+                self.registro_eventos.agregar_eventos([entrada, mensaje])
 
     def actualizar_interfaz(self):
-        # Actualizar interfaz si es necesario
-        self.after(1000, self.actualizar_interfaz)
+        """Aplica en un solo paso lo recibido desde el cuadro anterior."""
+        with self.lock:
+            estado = self.estado_dron_pendiente
+            estado_maquina = self.estado_maquina_pendiente
+            lineas = self.registro_pendiente
+            posiciones = self.posiciones_pendientes
+            self.estado_dron_pendiente = self.estado_maquina_pendiente = None
+            self.registro_pendiente = []
+            self.posiciones_pendientes = {}
+        if estado:
+            # Construir el texto con toda la información
+            self.drone_status.set(
+                "Estado del Dron:\n"
+                f"  Estado Actual: {estado['estado']}\n"
+                f"  Batería: {estado['bateria']}%\n"
+                f"  Velocidad: {estado['velocidad']} km/h\n"
+                f"  Altitud: {estado['altitud']} m\n"
+                f"  Posición: {estado['posicion_actual']}"
+            )
+        # Mover los marcadores de los drones y redibujar la capa una sola vez
+        for dron, posicion in posiciones.items():
+            self.actualizar_posicion_mapa(dron, posicion)
+        self.capa_marcadores.actualizar()
+        if estado_maquina:
+            self.estado_maquina.set(f"Estado de la Máquina de Estados: {estado_maquina}")
+        if lineas:
+            self.vista_registro.agregar_lineas(lineas)
+        self.after(PERIODO_CUADRO, self.actualizar_interfaz)
 
     def cargar_emergencias_desde_archivo(self):
         if os.path.exists("emergencias.txt"):
-            with open("emergencias.txt", "r") as archivo:
-                reader = csv.DictReader(archivo)
-                self.casos_emergencia = list(reader)
+            self.casos_emergencia = ArchivoEmergencias("emergencias.txt")
+
+class MapaCacheado(TkinterMapView):
+    """
+    TkinterMapView que anota en el almacén cada tesela que pide, para el desalojo LRU.
+    Las que faltan se descargan a través del almacén y se leen de él, así todo lo que
+    se ve con conexión queda disponible sin ella.
+    """
+
+    def __init__(self, *args, cache=None, **kwargs):
+        self.cache = cache
+        super().__init__(*args, **kwargs)
+
+    def request_image(self, zoom, x, y, db_cursor=None):
+        if self.cache:
+            self.cache.tocar(zoom, x, y)
+            if db_cursor is not None and not self.use_database_only and not self.cache.traer(zoom, x, y):
+                return self.empty_tile_image   # Sin red; se reintenta en la próxima petición
+        return super().request_image(zoom, x, y, db_cursor=db_cursor)
 
 class FormularioEmergencia(tk.Toplevel):
     def __init__(self, parent):
@@ -308,7 +431,7 @@ class FormularioEmergencia(tk.Toplevel):
             'situacion': situacion,
             'ubicacion': ubicacion
         }
-        self.parent.emergencias_registradas.append(emergencia)
+        emergencia_id = self.parent.emergencias_registradas.agregar(emergencia)
         registro = (
             f"{usuario} reportó una emergencia de tipo '{situacion}' en {ubicacion}."
         )
@@ -317,8 +440,4 @@ class FormularioEmergencia(tk.Toplevel):
         self.destroy()
 
         # Agregar marcador de la emergencia en el mapa
-        try:
-            lat, lon = map(float, ubicacion.split(","))
-            self.parent.map_widget.set_marker(lat, lon, text="Emergencia")
-        except ValueError:
-            messagebox.showerror("Error", "La ubicación debe estar en formato 'latitud, longitud'.")
+        self.parent.marcar_emergencia(emergencia_id, ubicacion)
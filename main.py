@@ -1,63 +1,104 @@
 # main.py
 
-import threading
 import multiprocessing
-import queue
-from clases import Drone, RegistroEventos
+from clases import Drone, RegistroEventos, configurar_log
 from interfaz_usuario import InterfazUsuario
 from interfaz_eventos import InterfazEventos
 from simulacion import iniciar_simulacion
 from maquina_estados import MaquinaEstados  # Importar la máquina de estados
+from telemetria import CanalTelemetria
+from indice_registro import indexar_registro_en_vivo
+from bus import Bus
+from despacho import Despachador
+from proyeccion import ORIGEN_SIMULACION
+from programador import ColaNotificada, Programador, PuenteCola
+from reloj import reloj_para_escala
+
+# Segundos simulados por segundo real para el dron y la simulación (1 = tiempo real)
+ESCALA_TIEMPO = 1.0
 
 def main():
+    # Log de texto y binario escritos por un hilo de fondo
+    configurar_log()
+
+    # Un solo hilo programador atiende al dron y a la máquina de estados; cada
+    # mensaje en sus colas los despierta, sin esperas con timeout
+    programador = Programador(trabajadores=0, reloj=reloj_para_escala(ESCALA_TIEMPO)).iniciar()
+
     # Crear colas para comunicación
-    queue_to_drone = queue.Queue()
-    queue_from_drone = queue.Queue()
+    queue_to_drone = ColaNotificada()
+    # El dron y la máquina de estados publican en el bus; cada consumidor tiene su cola
+    bus = Bus()
+    eventos_maquina = bus.suscribir(['evento'])
+    actualizaciones_interfaz = bus.suscribir(['estado_dron', 'evento', 'estado_maquina'])
     queue_to_simulacion = multiprocessing.Queue()
-    queue_from_simulacion = multiprocessing.Queue()
+    queue_from_simulacion = multiprocessing.Queue()   # Solo eventos discretos
+    # La cola entre procesos no puede avisar: un puente la traslada a una cola notificada
+    eventos_simulacion = ColaNotificada()
+    puente_simulacion = PuenteCola(queue_from_simulacion, eventos_simulacion)
 
-    # Crear instancia del registro de eventos
-    registro_eventos = RegistroEventos()
+    # Memoria compartida para la posición del dron publicada por la simulación
+    canal_telemetria = CanalTelemetria.crear()
+
+    # Crear instancia del registro de eventos, fechado con el reloj del programador
+    registro_eventos = RegistroEventos(reloj=programador.reloj)
+    # Indexar los eventos a medida que se escriben para análisis posterior de misiones
+    registro_eventos.indice = indexar_registro_en_vivo()
 
     # Crear instancia de la máquina de estados
     maquina_estados = MaquinaEstados(
         registro_eventos,
-        queue_from_drone,
-        queue_to_drone
+        eventos_maquina,
+        queue_to_drone,
+        programador=programador,
+        bus=bus
     )
 
     # Crear instancia del dron
     drone = Drone(
         registro_eventos,
         queue_to_drone,
-        queue_from_drone,
+        bus,
         queue_to_simulacion,    # Cola para enviar comandos a la simulación
-        queue_from_simulacion   # Cola para recibir actualizaciones de la simulación
+        eventos_simulacion,     # Cola para recibir actualizaciones de la simulación
+        canal_telemetria,       # Telemetría de posición sin serialización
+        programador=programador
     )
 
-    # Iniciar hilo para recibir actualizaciones del dron en la máquina de estados
-    threading.Thread(target=maquina_estados.recibir_actualizaciones_dron, daemon=True).start()
-
     # Iniciar la simulación en un proceso separado
     proceso_simulacion = multiprocessing.Process(
         target=iniciar_simulacion,
-        args=(queue_to_simulacion, queue_from_simulacion)
+        args=(queue_to_simulacion, queue_from_simulacion),
+        kwargs={'nombre_telemetria': canal_telemetria.nombre, 'escala_tiempo': ESCALA_TIEMPO}
     )
     proceso_simulacion.start()
 
     # Crear e iniciar la interfaz de usuario
-    app = InterfazUsuario(queue_to_drone, queue_from_drone, registro_eventos)
+    # El despachador sigue la telemetría del dron y estima su llegada a cada emergencia
+    despachador = Despachador(ORIGEN_SIMULACION)
+    despachador.registrar_dron("Dron", ORIGEN_SIMULACION)
+    app = InterfazUsuario(queue_to_drone, actualizaciones_interfaz, registro_eventos, despachador=despachador)
 
     # Crear e iniciar la interfaz de eventos
-    interfaz_eventos = InterfazEventos(queue_to_drone, registro_eventos)
+    # Los cambios de localización de casos aún en cola se aplican en la cola de la interfaz
+    interfaz_eventos = InterfazEventos(queue_to_drone, registro_eventos,
+                                       emergencias=app.emergencias_registradas,
+                                       al_reubicar=app.marcar_emergencia)
     interfaz_eventos.protocol("WM_DELETE_WINDOW", interfaz_eventos.destroy)
 
     try:
         app.mainloop()
     finally:
-        # Al cerrar la interfaz, terminamos el proceso de simulación
+        # Al cerrar la interfaz se detienen dron, máquina y programador, los hilos
+        # bloqueados en colas reciben None para terminar y se cierra la simulación
+        drone.detener()
+        maquina_estados.detener()
+        programador.detener()
+        puente_simulacion.detener()
+        actualizaciones_interfaz.put(None)
         proceso_simulacion.terminate()
         proceso_simulacion.join()
+        canal_telemetria.cerrar()
 
 if __name__ == "__main__":
     main()
@@ -1,119 +1,216 @@
 # maquina_estados.py
 
-import threading
 import queue
 import time
 import logging
+from clases import CodigoEvento, Origen, PERIODO_SONDEO
+from programador import Despertador, Programador, Serie, conectar_colas
+from transiciones import (
+    Estado, EventoMaquina, TablaTransiciones, ESTADOS_POR_NOMBRE, MENSAJES_EVENTO
+)
+
+# Estados en los que el dron está en el aire
+ESTADOS_EN_VUELO = [
+    Estado.DESPEGANDO,
+    Estado.EN_RUTA,
+    Estado.EN_EMERGENCIA,
+    Estado.REGRESANDO_BASE,
+]
+
+def comando(tipo, mensaje=None):
+    """Acción que envía un comando al dron y, opcionalmente, registra un mensaje."""
+    def accion(maquina, datos):
+        if mensaje:
+            maquina.registro_eventos.agregar_evento(mensaje, origen=Origen.MAQUINA)
+        maquina.enviar_comando_dron({'tipo': tipo})
+    return accion
+
+def registrar(mensaje):
+    """Acción que solo registra un mensaje."""
+    def accion(maquina, datos):
+        maquina.registro_eventos.agregar_evento(mensaje, origen=Origen.MAQUINA)
+    return accion
+
+def cambiar_localizacion(maquina, datos):
+    nueva_ubicacion = (datos or {}).get('nueva_ubicacion')
+    if not nueva_ubicacion:
+        maquina.registro_eventos.agregar_evento("Cambio de localización sin ubicación; ignorado.", origen=Origen.MAQUINA)
+        return
+    maquina.enviar_comando_dron({'tipo': 'cambio_localizacion_emergencia', 'nueva_ubicacion': nueva_ubicacion})
+    maquina.registro_eventos.agregar_evento(f"Cambiando localización de la emergencia a {nueva_ubicacion}.",
+                                            origen=Origen.MAQUINA)
+
+def construir_tabla():
+    """Declara las transiciones de la máquina de estados del dron."""
+    E, Ev = Estado, EventoMaquina
+    tabla = TablaTransiciones()
+
+    tabla.agregar(E.EN_TIERRA, Ev.RECEPCION_COMANDO_ARRANQUE_VUELO, E.DESPEGANDO, comando('despegar'))
+    tabla.agregar([e for e in Estado if e not in (E.EN_TIERRA, E.EN_DEA)], Ev.RECEPCION_COMANDO_ARRANQUE_VUELO,
+                  accion=registrar("Comando de arranque ignorado. Dron no está en tierra."))
+    tabla.agregar(E.EN_DEA, Ev.RECEPCION_COMANDO_ARRANQUE_VUELO,
+                  accion=registrar("No se puede iniciar vuelo. Dron en estado DEA."))
+    tabla.agregar(E.DESPEGANDO, Ev.DESPEGUE_COMPLETADO, E.EN_RUTA,
+                  registrar("Dron en ruta hacia la emergencia."))
+    tabla.agregar([E.EN_RUTA, E.EN_EMERGENCIA], Ev.CAMBIO_LOCALIZACION_EMERGENCIA, accion=cambiar_localizacion)
+    tabla.agregar(E.EN_RUTA, Ev.LLEGADA_DESTINO, E.EN_EMERGENCIA,
+                  comando('iniciar_asistencia', "Dron llegó al destino y está en emergencia."))
+    tabla.agregar(E.EN_EMERGENCIA, Ev.DETECCION_SIGNOS_VITALES_PACIENTE, E.EN_DEA,
+                  registrar("Signos vitales detectados. Preparando DEA."))
+    tabla.agregar(E.EN_DEA, Ev.RECEPCION_COMANDO_DESCARGA_ELECTRICA,
+                  accion=registrar("Descarga eléctrica administrada."))
+    tabla.agregar(E.EN_DEA, Ev.ASISTENCIA_COMPLETADA, E.REGRESANDO_BASE, comando('regresar_base'))
+    tabla.agregar(None, Ev.AVISO_BATERIA_BAJA, E.EN_MANTENIMIENTO,
+                  registrar("Batería baja. Dron en mantenimiento."))
+    tabla.agregar(None, Ev.FALLA_MOTOR_DETECTADA, E.EN_MANTENIMIENTO,
+                  registrar("Falla en motor detectada. Dron en mantenimiento."))
+    tabla.agregar(E.EN_MANTENIMIENTO, Ev.MOTOR_RECUPERADO, E.EN_TIERRA,
+                  registrar("Motor recuperado. Dron listo."))
+    tabla.agregar(E.REGRESANDO_BASE, Ev.REGRESO_BASE, E.ATERRIZANDO, comando('aterrizar'))
+    tabla.agregar(E.ATERRIZANDO, Ev.ATERRIZAJE_COMPLETADO, E.EN_TIERRA,
+                  registrar("Dron aterrizó y está en tierra."))
+
+    # Eventos ofrecidos por InterfazEventos
+    tabla.agregar(ESTADOS_EN_VUELO, Ev.ATERRIZAJE_FORZOSO, E.ATERRIZANDO,
+                  comando('aterrizar', "Aterrizaje forzoso solicitado."))
+    tabla.agregar([E.EN_RUTA, E.EN_EMERGENCIA, E.EN_DEA], Ev.REGRESAR_BASE, E.REGRESANDO_BASE,
+                  comando('regresar_base', "Regreso a la base solicitado."))
+    tabla.agregar(ESTADOS_EN_VUELO, Ev.DETENER_OPERACIONES, E.ATERRIZANDO,
+                  comando('aterrizar', "Operaciones detenidas. Dron aterrizando."))
+    tabla.agregar([E.EN_TIERRA, E.EN_MANTENIMIENTO], Ev.RESETEAR_PARAMETROS,
+                  accion=registrar("Parámetros del dron reseteados."))
+    tabla.agregar(ESTADOS_EN_VUELO, Ev.REANUDAR_NAVEGACION,
+                  accion=registrar("Navegación reanudada."))
+    tabla.agregar(ESTADOS_EN_VUELO, Ev.DETECCION_OBSTACULO_FIJO,
+                  accion=registrar("Obstáculo fijo detectado en la ruta."))
+    tabla.agregar(ESTADOS_EN_VUELO, Ev.DETECCION_OBSTACULO_MOVIL,
+                  accion=registrar("Obstáculo móvil detectado en la ruta."))
+    tabla.agregar(ESTADOS_EN_VUELO, Ev.PERDIDA_SENAL_GPS,
+                  accion=registrar("Pérdida de señal GPS. Navegación degradada."))
+    tabla.agregar(ESTADOS_EN_VUELO, Ev.DETECCION_ALTA_TURBULENCIA,
+                  accion=registrar("Alta turbulencia detectada."))
+    tabla.agregar([E.EN_EMERGENCIA, E.ATERRIZANDO], Ev.DETECCION_LUGAR_OCUPADO_ATERRIZAR,
+                  accion=registrar("Lugar de aterrizaje ocupado. Buscando alternativa."))
+    tabla.agregar([E.EN_EMERGENCIA, E.ATERRIZANDO], Ev.OCUPACION_LUGAR_ATERRIZAJE,
+                  accion=registrar("Lugar de aterrizaje ocupado. Buscando alternativa."))
+    tabla.agregar([E.EN_EMERGENCIA, E.ATERRIZANDO], Ev.DETECCION_LUGAR_LIBRE_ATERRIZAJE,
+                  accion=registrar("Lugar de aterrizaje libre."))
+
+    # Los avisos del dron llegan también fuera de los estados en que cambian algo (p. ej.
+    # un aterrizaje_completado repetido); como en la cadena if/elif original, se ignoran
+    # sin registrar "Evento no manejado"
+    tabla.ignorar([
+        Ev.DESPEGUE_COMPLETADO, Ev.CAMBIO_LOCALIZACION_EMERGENCIA, Ev.LLEGADA_DESTINO,
+        Ev.DETECCION_SIGNOS_VITALES_PACIENTE, Ev.RECEPCION_COMANDO_DESCARGA_ELECTRICA,
+        Ev.ASISTENCIA_COMPLETADA, Ev.MOTOR_RECUPERADO, Ev.REGRESO_BASE, Ev.ATERRIZAJE_COMPLETADO,
+    ])
+    return tabla
 
 class MaquinaEstados:
-    def __init__(self, registro_eventos, queue_from_drone, queue_to_drone):
+    def __init__(self, registro_eventos, queue_from_drone, queue_to_drone, tabla=None, programador=None,
+                 periodo_sondeo=PERIODO_SONDEO, bus=None):
         self.registro_eventos = registro_eventos
         self.queue_from_drone = queue_from_drone  # Cola para recibir actualizaciones del dron
         self.queue_to_drone = queue_to_drone      # Cola para enviar comandos al dron
+        # Los cambios de estado se publican en el bus; sin él viajan por queue_to_drone
+        # (la flota los separa de los comandos por su clave 'type')
+        self.salida_estado = bus if bus is not None else queue_to_drone
 
         # Definir los estados posibles
-        self.estados = [
-            'en_tierra',
-            'despegando',
-            'en_ruta',
-            'en_emergencia',
-            'asistiendo_paciente',
-            'regresando_base',
-            'aterrizando',
-            'en_mantenimiento',
-            'en_dea'
-        ]
+        self.estados = [estado.nombre for estado in Estado]
+
+        # Tabla de transiciones precompilada (estado, evento) -> Transicion
+        self.tabla = tabla or construir_tabla()
+        self.tabla.compilar()
 
         # Estado inicial
-        self.estado_actual = 'en_tierra'
+        self.codigo_estado = Estado.EN_TIERRA
 
         # Eventos
         self.eventos = queue.Queue()
 
-        # Iniciar hilo para procesar eventos
-        threading.Thread(target=self.procesar_eventos, daemon=True).start()
+        # Las actualizaciones del dron se atienden como tareas de un Programador (uno
+        # propio de un solo hilo si no se comparte). Con una cola notificada cada
+        # mensaje despierta atender_colas; si no, se sondea cada periodo_sondeo. Una
+        # Serie impide que dos transiciones de la misma máquina corran a la vez.
+        self.programador_propio = None
+        if programador is None:
+            programador = self.programador_propio = Programador(trabajadores=0)
+            programador.iniciar()
+        self.programador = programador = Serie(programador)
+        self.tarea = None
+        self.despertador = Despertador(programador, self.atender_colas)
+        if not conectar_colas(self.despertador, queue_from_drone) and periodo_sondeo:
+            self.tarea = programador.cada(periodo_sondeo, self.atender_colas)
+
+    def detener(self):
+        """Deja de atender la cola del dron y cancela el sondeo, si lo hay."""
+        conectar_colas(None, self.queue_from_drone)
+        if self.tarea:
+            self.tarea.cancelar()
+        if self.programador_propio:
+            self.programador_propio.detener()
+
+    @property
+    def estado_actual(self):
+        return self.codigo_estado.nombre
+
+    def atender_colas(self):
+        """Procesa sin bloquear las actualizaciones del dron y los eventos pendientes."""
+        try:
+            while True:
+                update = self.queue_from_drone.get_nowait()
+                if update:
+                    self.procesar_actualizacion_dron(update)
+        except queue.Empty:
+            pass
+        try:
+            while True:
+                evento, datos = self.eventos.get_nowait()
+                self.gestionar_evento(evento, datos)
+        except queue.Empty:
+            pass
 
-    def procesar_eventos(self):
-        while True:
-            try:
-                evento = self.eventos.get(timeout=1)
-                self.gestionar_evento(evento)
-            except queue.Empty:
-                continue  # No hay eventos, continuar esperando
+    def gestionar_evento(self, evento, datos=None):
+        """Despacha un evento (código EventoMaquina o su nombre) con una búsqueda en la tabla."""
+        if not isinstance(evento, EventoMaquina):
+            codigo = EventoMaquina.desde_nombre(evento)
+            if codigo is None:
+                self.registro_eventos.agregar_evento(f"Evento no manejado en el estado actual: {evento}")
+                return
+            evento = codigo
 
-    def gestionar_evento(self, evento):
         # Loggear el evento recibido
-        self.registro_eventos.agregar_evento(f"Evento recibido: {evento}")
-        logging.info(f"MaquinaEstados: Evento recibido: {evento}")
+        self.registro_eventos.agregar_evento(f"Evento recibido: {evento.nombre}", origen=Origen.MAQUINA)
+        logging.info("MaquinaEstados: Evento recibido: %s", evento.nombre)
+
+        transicion = self.tabla.buscar(self.codigo_estado, evento)
+        if transicion is None or (transicion.guarda and not transicion.guarda(self, datos)):
+            self.registro_eventos.agregar_evento(f"Evento no manejado en el estado actual: {evento.nombre}")
+            return
 
         # Guardar el estado anterior
-        estado_anterior = self.estado_actual
-
-        # Implementar la lógica de la máquina de estados
-        if evento == 'recepcion_comando_arranque_vuelo':
-            if self.estado_actual == 'en_tierra':
-                self.cambiar_estado('despegando')
-                self.enviar_comando_dron({'tipo': 'despegar'})
-            elif self.estado_actual == 'en_dea':
-                self.registro_eventos.agregar_evento("No se puede iniciar vuelo. Dron en estado DEA.")
-            else:
-                self.registro_eventos.agregar_evento("Comando de arranque ignorado. Dron no está en tierra.")
-        elif evento == 'despegue_completado':
-            if self.estado_actual == 'despegando':
-                self.cambiar_estado('en_ruta')
-                self.registro_eventos.agregar_evento("Dron en ruta hacia la emergencia.")
-        elif evento == 'cambio_localizacion_emergencia':
-            if self.estado_actual in ['en_ruta', 'en_emergencia']:
-                self.enviar_comando_dron({'tipo': 'cambio_localizacion_emergencia'})
-                self.registro_eventos.agregar_evento("Cambiando localización de la emergencia.")
-        elif evento == 'llegada_destino':
-            if self.estado_actual == 'en_ruta':
-                self.cambiar_estado('en_emergencia')
-                self.registro_eventos.agregar_evento("Dron llegó al destino y está en emergencia.")
-                self.enviar_comando_dron({'tipo': 'iniciar_asistencia'})
-        elif evento == 'deteccion_signos_vitales_paciente':
-            if self.estado_actual == 'en_emergencia':
-                self.cambiar_estado('en_dea')
-                self.registro_eventos.agregar_evento("Signos vitales detectados. Preparando DEA.")
-        elif evento == 'recepcion_comando_descarga_electrica':
-            if self.estado_actual == 'en_dea':
-                self.registro_eventos.agregar_evento("Descarga eléctrica administrada.")
-        elif evento == 'asistencia_completada':
-            if self.estado_actual == 'en_dea':
-                self.cambiar_estado('regresando_base')
-                self.enviar_comando_dron({'tipo': 'regresar_base'})
-        elif evento == 'aviso_bateria_baja':
-            self.cambiar_estado('en_mantenimiento')
-            self.registro_eventos.agregar_evento("Batería baja. Dron en mantenimiento.")
-        elif evento == 'falla_motor_detectada':
-            self.cambiar_estado('en_mantenimiento')
-            self.registro_eventos.agregar_evento("Falla en motor detectada. Dron en mantenimiento.")
-        elif evento == 'motor_recuperado':
-            if self.estado_actual == 'en_mantenimiento':
-                self.cambiar_estado('en_tierra')
-                self.registro_eventos.agregar_evento("Motor recuperado. Dron listo.")
-        elif evento == 'regreso_base':
-            if self.estado_actual == 'regresando_base':
-                self.cambiar_estado('aterrizando')
-                self.enviar_comando_dron({'tipo': 'aterrizar'})
-        elif evento == 'aterrizaje_completado':
-            if self.estado_actual == 'aterrizando':
-                self.cambiar_estado('en_tierra')
-                self.registro_eventos.agregar_evento("Dron aterrizó y está en tierra.")
-        else:
-            self.registro_eventos.agregar_evento(f"Evento no manejado en el estado actual: {evento}")
+        estado_anterior = self.codigo_estado
+        if transicion.destino is not None:
+            self.cambiar_estado(transicion.destino)
+        if transicion.accion:
+            transicion.accion(self, datos)
 
         # Actualizar estado del dron
-        if estado_anterior != self.estado_actual:
+        if estado_anterior != self.codigo_estado:
             self.enviar_actualizacion_estado()
 
     def cambiar_estado(self, nuevo_estado):
+        if not isinstance(nuevo_estado, Estado):
+            nuevo_estado = ESTADOS_POR_NOMBRE[nuevo_estado]
         # Llamar al método on_exit del estado actual
         self.on_exit(self.estado_actual)
-        self.estado_actual = nuevo_estado
+        self.codigo_estado = nuevo_estado
         # Llamar al método on_enter del nuevo estado
         self.on_enter(self.estado_actual)
-        self.registro_eventos.agregar_evento(f"Transición de estado: {self.estado_actual}")
+        self.registro_eventos.registrar(CodigoEvento.TRANSICION, texto=self.estado_actual, origen=Origen.MAQUINA)
+        if self.codigo_estado == Estado.EN_TIERRA:
+            self.registro_eventos.finalizar_mision()
 
     def on_enter(self, estado):
         # Acciones al entrar a un estado
@@ -127,51 +224,33 @@ class MaquinaEstados:
 
     def enviar_comando_dron(self, comando):
         """Envía un comando al dron a través de la cola."""
+        # Marcar el origen para que el dron no reenvíe el comando como evento
+        comando['origen'] = 'maquina_estados'
         self.queue_to_drone.put(comando)
         logging.info(f"MaquinaEstados: Comando enviado al dron: {comando}")
         self.registro_eventos.agregar_evento(f"Comando enviado al dron: {comando}")
 
-    def recibir_actualizaciones_dron(self):
-        """Recibe actualizaciones del dron y genera eventos según sea necesario."""
-        while True:
-            try:
-                update = self.queue_from_drone.get(timeout=1)
-                if update:
-                    tipo_update = update.get('type')
-                    if tipo_update == 'evento':
-                        mensaje = update.get('data')
-                        # Mapear el mensaje a un evento
-                        evento = self.mapear_mensaje_a_evento(mensaje)
-                        if evento:
-                            self.registro_eventos.agregar_evento(f"Evento mapeado: {evento}")
-                            self.eventos.put(evento)
-            except queue.Empty:
-                continue  # No hay actualizaciones, continuar esperando
-
-    def mapear_mensaje_a_evento(self, mensaje):
-        """Mapea un mensaje recibido a un evento de la máquina de estados."""
-        if "Dron despegando hacia" in mensaje:
-            return 'despegue_completado'
-        elif "Dron llegó al destino" in mensaje:
-            return 'llegada_destino'
-        elif "Dron asistiendo con el DEA." in mensaje:
-            return 'deteccion_signos_vitales_paciente'
-        elif "Descarga eléctrica administrada" in mensaje:
-            return 'recepcion_comando_descarga_electrica'
-        elif "Asistencia completada" in mensaje:
-            return 'asistencia_completada'
-        elif "Dron regresó a la base" in mensaje:
-            return 'regreso_base'
-        elif "Dron aterrizó" in mensaje:
-            return 'aterrizaje_completado'
-        elif "Batería baja" in mensaje:
-            return 'aviso_bateria_baja'
-        elif "Falla en motor detectada" in mensaje:
-            return 'falla_motor_detectada'
-        elif "Motor recuperado" in mensaje:
-            return 'motor_recuperado'
-        # Agregar más mapeos según los mensajes que se envían desde el dron
-        return None
+    def procesar_actualizacion_dron(self, update):
+        tipo_update = update.get('type')
+        if tipo_update == 'evento':
+            # Mapear el mensaje a un evento
+            evento = self.mapear_mensaje_a_evento(update.get('data'), update.get('codigo'))
+            if evento is not None:
+                self.registro_eventos.agregar_evento(f"Evento mapeado: {evento.nombre}")
+                self.eventos.put((evento, update))
+
+    def mapear_mensaje_a_evento(self, mensaje, codigo=None):
+        """
+        Devuelve el evento de la máquina de estados correspondiente a un mensaje.
+        Los productores envían el código explícito; los mensajes sin código se
+        resuelven por coincidencia exacta con el nombre del evento o un texto conocido.
+        """
+        if codigo is not None:
+            return EventoMaquina(codigo)
+        evento = EventoMaquina.desde_nombre(mensaje)
+        if evento is None:
+            evento = MENSAJES_EVENTO.get(mensaje)
+        return evento
 
     def enviar_actualizacion_estado(self):
         """Envía una actualización del estado actual a la interfaz de usuario o registro."""
@@ -179,7 +258,7 @@ class MaquinaEstados:
         self.registro_eventos.agregar_evento(mensaje)
         logging.info(f"MaquinaEstados: {mensaje}")
         # Enviar actualización a la interfaz de usuario
-        self.queue_to_drone.put({
+        self.salida_estado.put({
             'type': 'estado_maquina',
             'data': self.estado_actual
         })
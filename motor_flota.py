@@ -0,0 +1,210 @@
+# motor_flota.py
+
+import time
+
+import numpy as np
+
+from proyeccion import SIMULACION
+from simulacion import (
+    MotorSimulacion, DT, POSICION_BASE, VELOCIDAD_CRUCERO, TOLERANCIA_LLEGADA, TASA_MAXIMA_POSICION
+)
+
+CAPACIDAD_INICIAL = 16
+
+
+class MotorDron(MotorSimulacion):
+    """
+    Motor de un dron cuyo estado cinemático vive en las matrices de un MotorFlota.
+    Hereda el protocolo de comandos y eventos de MotorSimulacion; posicion, objetivo,
+    animacion_en_progreso, detener_dron, vuelo_libre y asistencia_restante leen y
+    escriben la fila `indice` de la flota, que es quien los avanza en cada paso.
+    """
+
+    def __init__(self, flota, indice, queue_updates, base=POSICION_BASE, **opciones):
+        self.flota = flota
+        self.indice = indice
+        super().__init__(queue_updates, dt=flota.dt, base=base, **opciones)
+
+    @property
+    def posicion(self):
+        return tuple(self.flota.posiciones[self.indice].tolist())
+
+    @posicion.setter
+    def posicion(self, valor):
+        self.flota.posiciones[self.indice] = valor
+
+    @property
+    def objetivo(self):
+        return tuple(self.flota.objetivos[self.indice].tolist()) if self.flota.con_objetivo[self.indice] else None
+
+    @objetivo.setter
+    def objetivo(self, valor):
+        self.flota.con_objetivo[self.indice] = valor is not None
+        if valor is not None:
+            self.flota.objetivos[self.indice] = valor
+
+    @property
+    def animacion_en_progreso(self):
+        return bool(self.flota.en_movimiento[self.indice])
+
+    @animacion_en_progreso.setter
+    def animacion_en_progreso(self, valor):
+        self.flota.en_movimiento[self.indice] = valor
+
+    @property
+    def detener_dron(self):
+        return bool(self.flota.detenidos[self.indice])
+
+    @detener_dron.setter
+    def detener_dron(self, valor):
+        self.flota.detenidos[self.indice] = valor
+
+    @property
+    def vuelo_libre(self):
+        return bool(self.flota.libres[self.indice])
+
+    @vuelo_libre.setter
+    def vuelo_libre(self, valor):
+        self.flota.libres[self.indice] = valor
+
+    @property
+    def tiempo(self):
+        return self.flota.tiempo
+
+    @tiempo.setter
+    def tiempo(self, valor):
+        pass   # El tiempo lo lleva la flota
+
+    @property
+    def asistencia_restante(self):
+        return float(self.flota.asistencia[self.indice])
+
+    @asistencia_restante.setter
+    def asistencia_restante(self, valor):
+        self.flota.asistencia[self.indice] = valor
+
+    def suscribir(self, observador):
+        super().suscribir(observador)
+        if self not in self.flota.observados:
+            self.flota.observados.append(self)
+
+    def paso(self):
+        raise RuntimeError("Los motores de una flota se avanzan juntos con MotorFlota.paso().")
+
+
+class MotorFlota:
+    """
+    Cinemática de todos los drones de una flota en matrices de NumPy.
+    Un paso avanza a la vez a todos los drones en movimiento y descuenta todas las
+    asistencias con operaciones vectorizadas; solo los drones que llegan a su destino
+    o terminan la asistencia (eventos poco frecuentes) pasan por código por dron.
+    Las posiciones se ofrecen a los publicadores una vez por intervalo de publicación
+    (la tasa máxima de PublicadorPosicion), no en cada paso. El intervalo se mide en
+    el reloj de la flota, el mismo que el de sus publicadores.
+    """
+
+    def __init__(self, dt=DT, velocidad=VELOCIDAD_CRUCERO, tasa_publicacion=TASA_MAXIMA_POSICION,
+                 reloj=time.monotonic):
+        self.dt = dt
+        self.velocidad = velocidad
+        escala = getattr(reloj, 'escala', None) or 1.0
+        self.intervalo_publicacion = escala / tasa_publicacion if tasa_publicacion else 0.0
+        self.reloj = reloj
+        self.t_publicacion = None
+        self.tiempo = 0.0
+        self.motores = []
+        self.observados = []       # Motores con renderizadores u otros observadores
+        self.con_telemetria = []   # Motores que escriben en un canal de telemetría
+        self.posiciones = np.zeros((CAPACIDAD_INICIAL, 3))
+        self.objetivos = np.zeros((CAPACIDAD_INICIAL, 3))
+        self.con_objetivo = np.zeros(CAPACIDAD_INICIAL, dtype=bool)
+        self.en_movimiento = np.zeros(CAPACIDAD_INICIAL, dtype=bool)
+        self.detenidos = np.zeros(CAPACIDAD_INICIAL, dtype=bool)
+        self.libres = np.zeros(CAPACIDAD_INICIAL, dtype=bool)
+        self.asistencia = np.zeros(CAPACIDAD_INICIAL)
+
+    def __len__(self):
+        return len(self.motores)
+
+    def agregar(self, queue_updates, base=POSICION_BASE, **opciones):
+        """Crea el MotorDron de un nuevo dron de la flota y lo devuelve."""
+        indice = len(self.motores)
+        if indice == len(self.posiciones):
+            self._crecer()
+        motor = MotorDron(self, indice, queue_updates, base=base, **opciones)
+        self.motores.append(motor)
+        if motor.telemetria is not None:
+            self.con_telemetria.append(motor)
+        return motor
+
+    def coordenadas(self):
+        """Arrays (lat, lon) de todos los drones de la flota, convertidos en un solo lote."""
+        posiciones = self.posiciones[:len(self.motores)]
+        return SIMULACION.a_geo_lote(posiciones[:, 0], posiciones[:, 1])
+
+    def _crecer(self):
+        for nombre in ('posiciones', 'objetivos', 'con_objetivo', 'en_movimiento', 'detenidos', 'libres', 'asistencia'):
+            matriz = getattr(self, nombre)
+            ampliada = np.zeros((len(matriz) * 2,) + matriz.shape[1:], dtype=matriz.dtype)
+            ampliada[:len(matriz)] = matriz
+            setattr(self, nombre, ampliada)
+
+    def paso(self):
+        """Avanza un paso dt todos los drones de la flota."""
+        n = len(self.motores)
+        if not n:
+            return
+        self.tiempo += self.dt
+        posiciones = self.posiciones[:n]
+        anteriores = posiciones.copy()
+        activos = ~self.detenidos[:n]
+        libres = self.libres[:n] & activos
+        activos &= ~libres
+
+        # Asistencias: descontar dt y detectar las que terminan
+        asistencia = self.asistencia[:n]
+        asistiendo = activos & (asistencia > 0)
+        asistencia[asistiendo] -= self.dt
+        terminadas = np.flatnonzero(asistiendo & (asistencia <= 0))
+
+        # Vuelo: avanzar VELOCIDAD_CRUCERO * dt hacia el objetivo o marcar la llegada
+        volando = activos & ~asistiendo & self.en_movimiento[:n] & self.con_objetivo[:n]
+        delta = self.objetivos[:n] - posiciones
+        distancia = np.sqrt(np.einsum('ij,ij->i', delta, delta))
+        avanzan = volando & (distancia > TOLERANCIA_LLEGADA)
+        llegadas = np.flatnonzero(volando & ~avanzan)
+        factor = np.zeros(n)
+        np.divide(self.velocidad * self.dt, distancia, out=factor, where=avanzan)
+        posiciones += delta * factor[:, None]
+
+        # Los eventos de llegada vacían antes la posición pendiente, como en MotorSimulacion
+        for i in terminadas:
+            self.motores[i].terminar_asistencia()
+        for i in llegadas:
+            self.motores[i].enviar_posicion()
+            self.motores[i].llegar()
+        for i in np.flatnonzero(libres):
+            self.motores[i]._avanzar()
+
+        ahora = self.reloj()
+        publicar = self.t_publicacion is None or ahora - self.t_publicacion >= self.intervalo_publicacion
+        if publicar:
+            self.t_publicacion = ahora
+        # Se ofrece la posición salvo a los drones detenidos, asistiendo o que acaban de
+        # llegar; el vuelo libre ya la ofreció
+        ofrecen = activos & ~asistiendo
+        ofrecen[llegadas] = False
+        if self.con_telemetria:
+            velocidades = (posiciones - anteriores) / self.dt
+            for motor in self.con_telemetria:
+                motor.telemetria.escribir(self.tiempo, motor.posicion, tuple(velocidades[motor.indice].tolist()))
+        if publicar:
+            for i, motor in enumerate(self.motores):
+                if motor.telemetria is not None:
+                    continue
+                if ofrecen[i]:
+                    motor.enviar_posicion()
+                else:
+                    motor.publicador.publicar_si_corresponde()
+        for motor in self.observados:
+            motor.notificar('paso')
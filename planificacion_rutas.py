@@ -0,0 +1,266 @@
+# planificacion_rutas.py
+
+import heapq
+import math
+import threading
+from collections import OrderedDict
+
+from proyeccion import SIMULACION
+
+# Las rutas se planifican en coordenadas de simulación (x, y); una unidad son 1e-4 grados
+MARGEN_SEGURIDAD = 3.0        # Unidades que se ensanchan los obstáculos (unos 33 m)
+ALTITUD_VUELO = 100.0         # m; los edificios más bajos que esto no son obstáculo
+LADOS_CIRCULO = 12            # Lados del polígono que aproxima una zona circular
+CELDA_CACHE = 5.0             # Lado de la celda que agrupa orígenes y destinos en la caché
+CAPACIDAD_CACHE = 512         # Rutas retenidas; se descartan las menos usadas
+TOLERANCIA = 1e-7             # Un segmento que solo roza un borde no lo atraviesa
+
+# Zonas del área de servicio en Bogotá (coordenadas aproximadas).
+# 'exclusion': prohibido volar; un destino dentro no se atiende.
+# 'edificio': obstáculo si su altura supera la altitud de vuelo; se ignora si el
+# origen o el destino están en él (despegue o aterrizaje en la azotea).
+ZONAS_BOGOTA = [
+    {'nombre': 'Aeropuerto El Dorado y CATAM', 'tipo': 'exclusion', 'centro': (4.7016, -74.1469), 'radio': 0.03},
+    {'nombre': 'Aeropuerto de Guaymaral', 'tipo': 'exclusion', 'centro': (4.8126, -74.0649), 'radio': 0.015},
+    {'nombre': 'Casa de Nariño', 'tipo': 'exclusion', 'centro': (4.5967, -74.0775), 'radio': 0.003},
+    {'nombre': 'Torre Colpatria', 'tipo': 'edificio', 'altura': 196,
+     'vertices': [(4.6106, -74.0703), (4.6106, -74.0697), (4.6112, -74.0697), (4.6112, -74.0703)]},
+    {'nombre': 'BD Bacatá', 'tipo': 'edificio', 'altura': 216,
+     'vertices': [(4.6142, -74.0708), (4.6142, -74.0702), (4.6148, -74.0702), (4.6148, -74.0708)]},
+    {'nombre': 'Torre Atrio', 'tipo': 'edificio', 'altura': 268,
+     'vertices': [(4.6152, -74.0689), (4.6152, -74.0682), (4.6158, -74.0682), (4.6158, -74.0689)]},
+]
+
+
+def envolvente_convexa(puntos):
+    """Envolvente convexa en sentido antihorario (cadena monótona)."""
+    puntos = sorted(set(puntos))
+    if len(puntos) < 3:
+        return puntos
+
+    def cruz(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    inferior, superior = [], []
+    for p in puntos:
+        while len(inferior) >= 2 and cruz(inferior[-2], inferior[-1], p) <= 0:
+            inferior.pop()
+        inferior.append(p)
+    for p in reversed(puntos):
+        while len(superior) >= 2 and cruz(superior[-2], superior[-1], p) <= 0:
+            superior.pop()
+        superior.append(p)
+    return inferior[:-1] + superior[:-1]
+
+
+class Obstaculo:
+    """
+    Polígono convexo (antihorario) ensanchado por el margen de seguridad.
+    Guarda las normales exteriores unitarias de sus lados y su caja envolvente
+    para descartar rápido los segmentos lejanos.
+    """
+    __slots__ = ('nombre', 'tipo', 'vertices', 'normales', 'caja')
+
+    def __init__(self, nombre, tipo, vertices, margen=MARGEN_SEGURIDAD):
+        self.nombre = nombre
+        self.tipo = tipo
+        vertices = envolvente_convexa(vertices)
+        normales = [self._normal(vertices[i], vertices[(i + 1) % len(vertices)]) for i in range(len(vertices))]
+        if margen:
+            # Cada vértice se desplaza por la bisectriz hasta el cruce de los lados desplazados
+            ensanchados = []
+            for i, (x, y) in enumerate(vertices):
+                n1, n2 = normales[i - 1], normales[i]
+                factor = margen / (1 + n1[0] * n2[0] + n1[1] * n2[1])
+                ensanchados.append((x + (n1[0] + n2[0]) * factor, y + (n1[1] + n2[1]) * factor))
+            vertices = ensanchados
+        self.vertices = vertices
+        self.normales = normales
+        xs = [v[0] for v in vertices]
+        ys = [v[1] for v in vertices]
+        self.caja = (min(xs), min(ys), max(xs), max(ys))
+
+    @staticmethod
+    def _normal(a, b):
+        dx, dy = b[0] - a[0], b[1] - a[1]
+        largo = math.hypot(dx, dy)
+        return dy / largo, -dx / largo
+
+    def contiene(self, p):
+        """True si el punto está estrictamente dentro."""
+        for (ax, ay), (nx, ny) in zip(self.vertices, self.normales):
+            if nx * (p[0] - ax) + ny * (p[1] - ay) >= -TOLERANCIA:
+                return False
+        return True
+
+    def corta(self, p, q):
+        """True si el segmento pq pasa por el interior (recorte de Cyrus-Beck)."""
+        caja = self.caja
+        if max(p[0], q[0]) <= caja[0] or min(p[0], q[0]) >= caja[2] or \
+                max(p[1], q[1]) <= caja[1] or min(p[1], q[1]) >= caja[3]:
+            return False
+        dx, dy = q[0] - p[0], q[1] - p[1]
+        t0, t1 = 0.0, 1.0
+        for (ax, ay), (nx, ny) in zip(self.vertices, self.normales):
+            numerador = nx * (p[0] - ax) + ny * (p[1] - ay) + TOLERANCIA
+            denominador = nx * dx + ny * dy
+            if denominador == 0:
+                if numerador >= 0:
+                    return False
+                continue
+            t = -numerador / denominador
+            if denominador < 0:
+                t0 = max(t0, t)
+            else:
+                t1 = min(t1, t)
+            if t1 - t0 <= TOLERANCIA:
+                return False
+        return True
+
+
+def poligono_zona(zona):
+    """Vértices (x, y) de simulación de una zona dada por 'vertices' o por 'centro' y 'radio' en grados."""
+    if 'vertices' in zona:
+        lats, lons = zip(*zona['vertices'])
+    else:
+        lat, lon = zona['centro']
+        angulos = [2 * math.pi * i / LADOS_CIRCULO for i in range(LADOS_CIRCULO)]
+        lats = [lat + zona['radio'] * math.sin(a) for a in angulos]
+        lons = [lon + zona['radio'] * math.cos(a) for a in angulos]
+    xs, ys = SIMULACION.a_plano_lote(lats, lons)
+    return [(float(x), float(y)) for x, y in zip(xs, ys)]
+
+
+class PlanificadorRutas:
+    """
+    Rutas que esquivan edificios y zonas de exclusión en coordenadas de simulación.
+    Al construirse precalcula el grafo de visibilidad entre los vértices de los
+    obstáculos ensanchados; una consulta solo conecta origen y destino a ese grafo
+    y lo recorre con A*, lo que da la ruta más corta con giros en cualquier ángulo.
+    Las rutas se guardan en una caché LRU por celdas de origen y destino, porque las
+    emergencias se concentran por barrios. replanificar() da la ruta nueva cuando el
+    destino cambia en vuelo.
+    """
+
+    def __init__(self, zonas=ZONAS_BOGOTA, margen=MARGEN_SEGURIDAD,
+                 altitud_vuelo=ALTITUD_VUELO, capacidad_cache=CAPACIDAD_CACHE):
+        self.obstaculos = [
+            Obstaculo(zona['nombre'], zona['tipo'], poligono_zona(zona), margen)
+            for zona in zonas
+            if zona['tipo'] == 'exclusion' or zona.get('altura', 0) >= altitud_vuelo
+        ]
+        self.capacidad_cache = capacidad_cache
+        self.cache = OrderedDict()   # (celda origen, celda destino) -> puntos intermedios
+        self.lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.replanificaciones = 0
+
+        # Nodos del grafo: vértices ensanchados que no caen dentro de otro obstáculo
+        self.nodos = [
+            v for obstaculo in self.obstaculos for v in obstaculo.vertices
+            if not any(otro.contiene(v) for otro in self.obstaculos)
+        ]
+        self.vecinos = [[] for _ in self.nodos]
+        for i, a in enumerate(self.nodos):
+            for j in range(i + 1, len(self.nodos)):
+                b = self.nodos[j]
+                if self.libre(a, b):
+                    distancia = math.dist(a, b)
+                    self.vecinos[i].append((j, distancia))
+                    self.vecinos[j].append((i, distancia))
+
+    def contadores(self):
+        return {'aciertos': self.aciertos, 'fallos': self.fallos, 'replanificaciones': self.replanificaciones,
+                'rutas': len(self.cache)}
+
+    def libre(self, p, q, ignorados=()):
+        return not any(o.corta(p, q) for o in self.obstaculos if o not in ignorados)
+
+    def obstaculos_en(self, p):
+        return [o for o in self.obstaculos if o.contiene(p)]
+
+    def ruta(self, origen, destino):
+        """
+        Puntos (x, y) desde origen hasta destino, ambos incluidos, o None si el destino
+        está en una zona de exclusión o no hay paso. Acepta puntos (x, y) o (x, y, z).
+        """
+        origen, destino = tuple(origen[:2]), tuple(destino[:2])
+        en_destino = self.obstaculos_en(destino)
+        if any(o.tipo == 'exclusion' for o in en_destino):
+            return None
+        # El obstáculo del que se sale o en el que se aterriza no bloquea la ruta
+        ignorados = en_destino + self.obstaculos_en(origen)
+        if self.libre(origen, destino, ignorados):
+            return [origen, destino]
+
+        clave = (self._celda(origen), self._celda(destino))
+        with self.lock:
+            intermedios = self.cache.get(clave)
+            if intermedios is not None:
+                self.cache.move_to_end(clave)
+        if intermedios is not None and self._valida(origen, intermedios, destino, ignorados):
+            self.aciertos += 1
+            return [origen, *intermedios, destino]
+
+        self.fallos += 1
+        puntos = self._buscar(origen, destino, ignorados)
+        if puntos is not None:
+            self._guardar(clave, puntos)
+        return puntos
+
+    def replanificar(self, posicion, destino):
+        """
+        Ruta desde la posición en vuelo hasta un destino nuevo. Es una consulta completa
+        de ruta(), caché incluida: con el grafo de visibilidad precalculado, conectar la
+        posición y el destino y recorrerlo cuesta poco, y el destino nuevo casi siempre
+        cae en el barrio del anterior, cuya ruta suele estar en la caché.
+        """
+        self.replanificaciones += 1
+        return self.ruta(posicion, destino)
+
+    def _guardar(self, clave, puntos):
+        with self.lock:
+            self.cache[clave] = puntos[1:-1]
+            self.cache.move_to_end(clave)
+            if len(self.cache) > self.capacidad_cache:
+                self.cache.popitem(last=False)
+
+    def _celda(self, p):
+        return (math.floor(p[0] / CELDA_CACHE), math.floor(p[1] / CELDA_CACHE))
+
+    def _valida(self, origen, intermedios, destino, ignorados):
+        """Una ruta de la caché sirve si sus extremos nuevos ven el primer y el último punto."""
+        return self.libre(origen, intermedios[0], ignorados) and self.libre(intermedios[-1], destino, ignorados)
+
+    def _buscar(self, origen, destino, ignorados):
+        """A* sobre el grafo de visibilidad con origen y destino como nodos extra."""
+        inicio, fin = len(self.nodos), len(self.nodos) + 1
+        puntos = self.nodos + [origen, destino]
+        desde_origen = [(i, math.dist(origen, v)) for i, v in enumerate(self.nodos) if self.libre(origen, v, ignorados)]
+        hacia_destino = {i: math.dist(v, destino) for i, v in enumerate(self.nodos) if self.libre(v, destino, ignorados)}
+
+        costo = {inicio: 0.0}
+        previo = {}
+        abiertos = [(math.dist(origen, destino), inicio)]
+        cerrados = set()
+        while abiertos:
+            _, actual = heapq.heappop(abiertos)
+            if actual == fin:
+                camino = [fin]
+                while camino[-1] != inicio:
+                    camino.append(previo[camino[-1]])
+                return [puntos[i] for i in reversed(camino)]
+            if actual in cerrados:
+                continue
+            cerrados.add(actual)
+            vecinos = desde_origen if actual == inicio else self.vecinos[actual]
+            if actual in hacia_destino:
+                vecinos = vecinos + [(fin, hacia_destino[actual])]
+            for vecino, distancia in vecinos:
+                nuevo = costo[actual] + distancia
+                if nuevo < costo.get(vecino, math.inf):
+                    costo[vecino] = nuevo
+                    previo[vecino] = actual
+                    heapq.heappush(abiertos, (nuevo + math.dist(puntos[vecino], destino), vecino))
+        return None
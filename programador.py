@@ -0,0 +1,294 @@
+# programador.py
+
+import heapq
+import itertools
+import logging
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from reloj import RELOJ_REAL, RelojVirtual
+
+# Hilos de trabajo por defecto del programador compartido
+TRABAJADORES = 4
+
+
+class Tarea:
+    """Trabajo programado; periodo distinto de None indica una tarea periódica."""
+    __slots__ = ('vencimiento', 'periodo', 'funcion', 'args', 'cancelada')
+
+    def __init__(self, vencimiento, periodo, funcion, args):
+        self.vencimiento = vencimiento
+        self.periodo = periodo
+        self.funcion = funcion
+        self.args = args
+        self.cancelada = False
+
+    def cancelar(self):
+        self.cancelada = True
+
+
+class Programador:
+    """
+    Programador de tareas compartido por muchos componentes.
+    Un hilo mantiene un montículo de tareas ordenadas por vencimiento y las entrega a
+    un grupo fijo de hilos de trabajo, de modo que el número de hilos no depende de
+    cuántos drones o máquinas de estados se registren. Una tarea periódica no se
+    solapa consigo misma: se vuelve a programar cuando termina su ejecución.
+
+    Los vencimientos se expresan en el reloj indicado (ver reloj.py). Con un reloj
+    escalado las esperas reales se acortan en proporción; un RelojVirtual no tiene
+    hilo propio y se conduce con simular().
+    """
+
+    def __init__(self, trabajadores=TRABAJADORES, reloj=RELOJ_REAL):
+        self.reloj = reloj
+        self.trabajadores = trabajadores
+        self.tareas = []                     # Montículo de (vencimiento, orden, tarea)
+        self.orden = itertools.count()       # Desempate estable entre tareas con igual vencimiento
+        self.condicion = threading.Condition()
+        self.activo = False
+        self.hilo = None
+        self.ejecutor = None
+
+    def programar(self, retraso, funcion, *args):
+        """Ejecuta funcion(*args) una vez tras `retraso` segundos."""
+        return self._agregar(Tarea(self.reloj() + retraso, None, funcion, args))
+
+    def cada(self, periodo, funcion, *args):
+        """Ejecuta funcion(*args) cada `periodo` segundos."""
+        return self._agregar(Tarea(self.reloj() + periodo, periodo, funcion, args))
+
+    def _agregar(self, tarea):
+        with self.condicion:
+            heapq.heappush(self.tareas, (tarea.vencimiento, next(self.orden), tarea))
+            self.condicion.notify()
+        return tarea
+
+    def iniciar(self):
+        """Arranca el hilo del programador y los hilos de trabajo."""
+        if self.activo:
+            return self
+        if isinstance(self.reloj, RelojVirtual):
+            raise ValueError("Un programador con reloj virtual se conduce con simular().")
+        self.activo = True
+        if self.trabajadores:
+            self.ejecutor = ThreadPoolExecutor(max_workers=self.trabajadores, thread_name_prefix='programador')
+        self.hilo = threading.Thread(target=self._bucle, name='programador', daemon=True)
+        self.hilo.start()
+        return self
+
+    def detener(self):
+        with self.condicion:
+            self.activo = False
+            self.condicion.notify()
+        if self.hilo and self.hilo is not threading.current_thread():
+            self.hilo.join()
+        if self.ejecutor:
+            self.ejecutor.shutdown(wait=True)
+
+    def proximo_vencimiento(self):
+        with self.condicion:
+            self._descartar_canceladas()
+            return self.tareas[0][0] if self.tareas else None
+
+    def ejecutar_pendientes(self, ahora=None):
+        """
+        Ejecuta en el hilo llamador todas las tareas vencidas hasta `ahora`. Permite
+        conducir el programador desde un bucle externo (p. ej. con un reloj virtual).
+        Devuelve el número de tareas ejecutadas.
+        """
+        ejecutadas = 0
+        while True:
+            tarea = self._extraer_vencida(self.reloj() if ahora is None else ahora)
+            if tarea is None:
+                return ejecutadas
+            self._ejecutar(tarea)
+            ejecutadas += 1
+
+    def simular(self, hasta=None, terminado=None):
+        """
+        Simulación de eventos discretos sobre un RelojVirtual: adelanta el reloj al
+        siguiente vencimiento y ejecuta lo pendiente, hasta el instante `hasta`, hasta
+        que terminado() sea verdadero o hasta que no queden tareas.
+        """
+        while not (terminado and terminado()):
+            proximo = self.proximo_vencimiento()
+            if proximo is None or (hasta is not None and proximo > hasta):
+                break
+            self.reloj.avanzar_hasta(proximo)
+            self.ejecutar_pendientes()
+        if hasta is not None and not (terminado and terminado()):
+            self.reloj.avanzar_hasta(hasta)
+
+    def _descartar_canceladas(self):
+        while self.tareas and self.tareas[0][2].cancelada:
+            heapq.heappop(self.tareas)
+
+    def _extraer_vencida(self, ahora):
+        with self.condicion:
+            self._descartar_canceladas()
+            if self.tareas and self.tareas[0][0] <= ahora:
+                return heapq.heappop(self.tareas)[2]
+            return None
+
+    def _ejecutar(self, tarea):
+        try:
+            tarea.funcion(*tarea.args)
+        except Exception:
+            logging.exception("Programador: error en la tarea %s", getattr(tarea.funcion, '__qualname__', tarea.funcion))
+        finally:
+            if tarea.periodo is not None and not tarea.cancelada:
+                tarea.vencimiento = max(tarea.vencimiento + tarea.periodo, self.reloj())
+                self._agregar(tarea)
+
+    def _bucle(self):
+        while True:
+            with self.condicion:
+                if not self.activo:
+                    return
+                self._descartar_canceladas()
+                espera = self.tareas[0][0] - self.reloj() if self.tareas else None
+                if espera is None or espera > 0:
+                    self.condicion.wait(None if espera is None else self.reloj.segundos_reales(espera))
+                    continue
+                tarea = heapq.heappop(self.tareas)[2]
+            if self.ejecutor:
+                self.ejecutor.submit(self._ejecutar, tarea)
+            else:
+                self._ejecutar(tarea)
+
+
+class Serie:
+    """
+    Vista de un Programador cuyas tareas se ejecutan de una en una y en orden de
+    llegada, aunque el programador tenga varios hilos de trabajo. Un dron o una
+    máquina de estados programa todo su trabajo en su propia Serie, así nunca corre
+    en paralelo consigo mismo. Si llega una tarea mientras otra de la serie está en
+    curso, se encola y la ejecuta ese mismo hilo al terminar: ningún trabajador
+    queda bloqueado esperando.
+    """
+
+    def __init__(self, programador):
+        self.programador = programador
+        self.reloj = programador.reloj
+        self.pendientes = deque()
+        self.ejecutando = False
+        self.lock = threading.Lock()
+
+    def programar(self, retraso, funcion, *args):
+        return self.programador.programar(retraso, self.ejecutar, funcion, args)
+
+    def cada(self, periodo, funcion, *args):
+        return self.programador.cada(periodo, self.ejecutar, funcion, args)
+
+    def ejecutar(self, funcion, args=()):
+        """Ejecuta funcion(*args) en el hilo llamador, o la encola si la serie está ocupada."""
+        with self.lock:
+            self.pendientes.append((funcion, args))
+            if self.ejecutando:
+                return
+            self.ejecutando = True
+        while True:
+            with self.lock:
+                if not self.pendientes:
+                    self.ejecutando = False
+                    return
+                funcion, args = self.pendientes.popleft()
+            try:
+                funcion(*args)
+            except Exception:
+                logging.exception("Programador: error en la tarea %s", getattr(funcion, '__qualname__', funcion))
+
+
+class Despertador:
+    """
+    Programa funcion(*args) en cuanto se le avisa, agrupando en una sola ejecución
+    los avisos que llegan antes de que la anterior haya empezado. Nunca se ejecuta
+    en paralelo consigo mismo: un aviso durante la ejecución programa otra al terminar.
+    """
+
+    def __init__(self, programador, funcion, *args):
+        self.programador = programador
+        self.funcion = funcion
+        self.args = args
+        self.pendiente = False     # Ejecución programada que aún no ha empezado
+        self.ejecutando = False
+        self.repetir = False       # Aviso recibido durante la ejecución en curso
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            if self.ejecutando:
+                self.repetir = True
+                return
+            if self.pendiente:
+                return
+            self.pendiente = True
+        self.programador.programar(0, self._ejecutar)
+
+    def _ejecutar(self):
+        with self.lock:
+            self.pendiente = False
+            self.ejecutando = True
+        try:
+            self.funcion(*self.args)
+        finally:
+            with self.lock:
+                self.ejecutando = False
+                repetir, self.repetir = self.repetir, False
+            if repetir:
+                self()
+
+
+class ColaNotificada(queue.Queue):
+    """Cola que llama a `aviso()` tras cada put, para atenderla sin sondeo."""
+
+    def __init__(self, aviso=None, maxsize=0):
+        super().__init__(maxsize)
+        self.aviso = aviso
+
+    def put(self, item, block=True, timeout=None):
+        super().put(item, block, timeout)
+        if self.aviso:
+            self.aviso()
+
+
+def conectar_colas(aviso, *colas):
+    """
+    Hace que cada ColaNotificada llame a `aviso` al recibir un mensaje.
+    Devuelve False si alguna cola no puede avisar y hay que sondearla.
+    """
+    todas = True
+    for cola in colas:
+        if isinstance(cola, ColaNotificada):
+            cola.aviso = aviso
+        elif cola is not None:
+            todas = False
+    return todas
+
+
+class PuenteCola:
+    """
+    Traslada a una ColaNotificada los mensajes de una cola que no puede avisar, como
+    una multiprocessing.Queue alimentada por otro proceso. Su hilo bloquea en get()
+    sin timeout y termina al recibir None, que es lo que envía detener().
+    """
+
+    def __init__(self, origen, destino):
+        self.origen = origen
+        self.destino = destino
+        self.hilo = threading.Thread(target=self._trasladar, name='puente_cola', daemon=True)
+        self.hilo.start()
+
+    def _trasladar(self):
+        while True:
+            mensaje = self.origen.get()
+            if mensaje is None:
+                return
+            self.destino.put(mensaje)
+
+    def detener(self):
+        self.origen.put(None)
+        self.hilo.join()
@@ -0,0 +1,69 @@
+# proyeccion.py
+
+import math
+
+try:
+    import numpy as np
+except ImportError:   # Sin NumPy, las conversiones en lote devuelven listas
+    np = None
+
+# Elipsoide WGS84
+SEMIEJE_MAYOR = 6378137.0             # metros
+EXCENTRICIDAD2 = 6.69437999014e-3     # Excentricidad al cuadrado
+
+# Origen del espacio de simulación: Hospital Universitario San Ignacio en Bogotá
+ORIGEN_SIMULACION = (4.627925, -74.064692)
+
+
+def radios_curvatura(lat):
+    """(meridiano, primer vertical) en metros del elipsoide a la latitud dada en grados."""
+    seno = math.sin(math.radians(lat))
+    w = math.sqrt(1 - EXCENTRICIDAD2 * seno * seno)
+    return SEMIEJE_MAYOR * (1 - EXCENTRICIDAD2) / w ** 3, SEMIEJE_MAYOR / w
+
+
+class Proyeccion:
+    """
+    Proyección local este-norte (ENU horizontal) anclada en (lat0, lon0).
+    Usa los radios de curvatura del elipsoide en el ancla, de modo que las distancias
+    son métricas en todas las direcciones; a la escala de una ciudad el error frente
+    a la geodésica es inferior al 0.1 %. Las coordenadas planas se expresan en
+    unidades de `unidad` metros. Los métodos _lote convierten arrays enteros.
+    """
+
+    def __init__(self, lat0, lon0, unidad=1.0):
+        self.lat0 = lat0
+        self.lon0 = lon0
+        self.unidad = unidad
+        meridiano, primer_vertical = radios_curvatura(lat0)
+        # Unidades planas por grado de latitud y de longitud
+        self.por_grado_lat = math.radians(meridiano) / unidad
+        self.por_grado_lon = math.radians(primer_vertical * math.cos(math.radians(lat0))) / unidad
+
+    def a_plano(self, lat, lon):
+        return (lon - self.lon0) * self.por_grado_lon, (lat - self.lat0) * self.por_grado_lat
+
+    def a_geo(self, x, y):
+        return self.lat0 + y / self.por_grado_lat, self.lon0 + x / self.por_grado_lon
+
+    def a_plano_lote(self, lats, lons):
+        """Arrays (x, y) de arrays o secuencias de latitudes y longitudes."""
+        if np is None:
+            return ([(lon - self.lon0) * self.por_grado_lon for lon in lons],
+                    [(lat - self.lat0) * self.por_grado_lat for lat in lats])
+        return ((np.asarray(lons, dtype=float) - self.lon0) * self.por_grado_lon,
+                (np.asarray(lats, dtype=float) - self.lat0) * self.por_grado_lat)
+
+    def a_geo_lote(self, xs, ys):
+        """Arrays (lat, lon) de arrays o secuencias de coordenadas planas."""
+        if np is None:
+            return ([self.lat0 + y / self.por_grado_lat for y in ys],
+                    [self.lon0 + x / self.por_grado_lon for x in xs])
+        return (self.lat0 + np.asarray(ys, dtype=float) / self.por_grado_lat,
+                self.lon0 + np.asarray(xs, dtype=float) / self.por_grado_lon)
+
+
+# Espacio de simulación: una unidad son 1e-4 grados de latitud en el origen (unos 11 m),
+# la escala de la antigua conversión lineal, pero con la misma escala en ambos ejes
+METROS_POR_UNIDAD = math.radians(1e-4) * radios_curvatura(ORIGEN_SIMULACION[0])[0]
+SIMULACION = Proyeccion(*ORIGEN_SIMULACION, unidad=METROS_POR_UNIDAD)
@@ -0,0 +1,77 @@
+# reloj.py
+
+import time
+
+
+class RelojReal:
+    """Tiempo monotónico del sistema, en segundos."""
+
+    escala = 1.0
+
+    def __call__(self):
+        return time.monotonic()
+
+    def segundos_reales(self, segundos):
+        """Segundos de pared que equivalen a `segundos` de este reloj."""
+        return segundos / self.escala
+
+    def dormir(self, segundos):
+        if segundos > 0:
+            time.sleep(self.segundos_reales(segundos))
+
+
+class RelojEscalado(RelojReal):
+    """
+    Reloj que avanza `escala` segundos por cada segundo real (100 equivale a 100x).
+    Parte de 0 al crearse; como se basa en time.monotonic, copias del mismo reloj en
+    otros procesos marcan lo mismo.
+    """
+
+    def __init__(self, escala=1.0):
+        if escala <= 0:
+            raise ValueError("La escala de tiempo debe ser positiva.")
+        self.escala = escala
+        self.origen = time.monotonic()
+
+    def __call__(self):
+        return (time.monotonic() - self.origen) * self.escala
+
+
+class RelojVirtual:
+    """
+    Reloj de simulación de eventos discretos.
+    Solo avanza cuando se le indica; al usarlo como reloj de un Programador que se
+    conduce con simular() o ejecutar_pendientes(), las esperas no consumen tiempo
+    real y el orden de los eventos es el mismo que con un reloj real.
+    """
+
+    escala = None   # Sin relación con el tiempo real
+
+    def __init__(self, inicio=0.0):
+        self.tiempo = inicio
+
+    def __call__(self):
+        return self.tiempo
+
+    def segundos_reales(self, segundos):
+        return 0.0
+
+    def dormir(self, segundos):
+        """Dormir en tiempo virtual es avanzar el reloj (uso de un solo hilo)."""
+        self.avanzar_hasta(self.tiempo + segundos)
+
+    def avanzar_hasta(self, instante):
+        if instante > self.tiempo:
+            self.tiempo = instante
+
+
+def reloj_para_escala(escala_tiempo):
+    """Reloj real (1), escalado (otro número) o virtual (None: tan rápido como sea posible)."""
+    if escala_tiempo is None:
+        return RelojVirtual()
+    if escala_tiempo == 1:
+        return RelojReal()
+    return RelojEscalado(escala_tiempo)
+
+
+RELOJ_REAL = RelojReal()
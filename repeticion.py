@@ -0,0 +1,414 @@
+# repeticion.py
+
+import argparse
+import contextlib
+import logging
+import math
+import os
+import time
+from datetime import datetime
+
+from archivo_emergencias import ArchivoEmergencias
+from clases import Drone, RegistroDron, RegistroEventos, configurar_log
+from cola_emergencias import ColaEmergencias
+from despacho import Despachador, EstadoDespacho
+from energia import ConsumoPlano
+from flota import EntradaDron, SalidaDron
+from maquina_estados import MaquinaEstados
+from programador import ColaNotificada, Despertador, Programador
+from reloj import RelojVirtual
+from simulacion import DURACION_ASISTENCIA
+from transiciones import EventoMaquina
+
+BASE_POR_DEFECTO = (4.627925, -74.064692)   # Hospital Universitario San Ignacio
+INTERVALO_SIN_MARCA = 60.0   # Segundos entre llamadas cuando el archivo no trae marcas de tiempo
+CONSUMO_REPETICION = 0.05    # % de batería por segundo de vuelo (unos 33 minutos de autonomía)
+ESTADOS_LIBRES = ('en_tierra', 'en_mantenimiento')   # Estados sin vuelo en curso
+
+
+def segundos_marca(marca):
+    """
+    Segundos de una marca de tiempo: número, fecha-hora ISO u hora 'HH:MM[:SS]'
+    (las horas pueden pasar de 23 en archivos de varios días). ValueError si no es válida.
+    """
+    try:
+        return float(marca)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(marca).timestamp()
+    except ValueError:
+        pass
+    partes = marca.split(':')
+    if not 2 <= len(partes) <= 3:
+        raise ValueError(f"Marca de tiempo no válida: {marca!r}")
+    return sum(float(parte) * factor for parte, factor in zip(partes, (3600, 60, 1)))
+
+
+def percentil(ordenados, p):
+    """Percentil p (0-100) por rango más cercano de una lista ordenada."""
+    if not ordenados:
+        return None
+    return ordenados[min(len(ordenados) - 1, max(0, math.ceil(p / 100 * len(ordenados)) - 1))]
+
+
+class ModeloVuelo:
+    """
+    Sustituto de MotorSimulacion por eventos discretos.
+    En lugar de integrar la trayectoria cada DT programa directamente la llegada, la
+    asistencia y el regreso en el reloj del programador, y emite los mismos eventos
+    que el motor hacia la cola de actualizaciones del dron.
+    """
+
+    def __init__(self, dron_id, base, despachador, programador, cola_comandos, cola_actualizaciones, al_llegar):
+        self.dron_id = dron_id
+        self.despachador = despachador
+        self.programador = programador
+        self.cola_comandos = cola_comandos
+        self.cola_actualizaciones = cola_actualizaciones
+        self.al_llegar = al_llegar
+        self.base = despachador.a_plano(*base)
+        self.origen = self.destino = self.base
+        self.salida = 0.0
+        self.duracion = 0.0
+        self.tarea = None
+
+    def atender(self):
+        while not self.cola_comandos.empty():
+            self.procesar_comando(self.cola_comandos.get_nowait())
+
+    def procesar_comando(self, comando):
+        tipo = comando.get('tipo')
+        if tipo == 'recibir_comando_arranque':
+            ubicacion = comando.get('ubicacion')
+            try:
+                destino = self.despachador.a_plano(*map(float, ubicacion.split(',')))
+            except (AttributeError, ValueError):
+                self.emitir("Error en la ubicación proporcionada.")
+                return
+            self.volar(destino, regreso=False)
+            self.emitir(f"Dron despegando hacia {ubicacion}", EventoMaquina.DESPEGUE_COMPLETADO)
+        elif tipo == 'cambio_localizacion_emergencia' and comando.get('nueva_ubicacion'):
+            try:
+                destino = self.despachador.a_plano(*map(float, comando['nueva_ubicacion'].split(',')))
+            except ValueError:
+                self.emitir("Error en la nueva ubicación proporcionada.", cambio_rechazado=True)
+                return
+            self.volar(destino, regreso=False)
+        elif tipo == 'detener_dron':
+            self.origen = self.destino = self.posicion()
+            if self.tarea:
+                self.tarea.cancelar()
+
+    def posicion(self):
+        """Posición interpolada sobre el tramo en curso."""
+        if self.duracion <= 0:
+            return self.destino
+        avance = min(1.0, (self.programador.reloj() - self.salida) / self.duracion)
+        return tuple(o + (d - o) * avance for o, d in zip(self.origen, self.destino))
+
+    def volar(self, destino, regreso):
+        if self.tarea:
+            self.tarea.cancelar()
+        self.origen = self.posicion()
+        self.destino = destino
+        self.salida = self.programador.reloj()
+        self.duracion = math.dist(self.origen, destino) / self.despachador.velocidad
+        self.tarea = self.programador.programar(self.duracion, self.llegar, regreso)
+
+    def llegar(self, regreso):
+        self.origen = self.destino
+        self.duracion = 0.0
+        self.emitir("Dron llegó al destino", EventoMaquina.LLEGADA_DESTINO)
+        if regreso:
+            self.emitir("Dron regresó a la base y está en espera.", EventoMaquina.REGRESO_BASE)
+            return
+        self.al_llegar(self.dron_id)
+        self.emitir("Dron asistiendo con el DEA.", EventoMaquina.DETECCION_SIGNOS_VITALES_PACIENTE)
+        self.tarea = self.programador.programar(DURACION_ASISTENCIA, self.completar_asistencia)
+
+    def completar_asistencia(self):
+        self.emitir("Asistencia completada, dron regresando a base.", EventoMaquina.ASISTENCIA_COMPLETADA)
+        self.volar(self.base, regreso=True)
+
+    def emitir(self, mensaje, codigo=None, **datos):
+        update = {'type': 'evento', 'data': mensaje, **datos}
+        if codigo is not None:
+            update['codigo'] = codigo
+        self.cola_actualizaciones.put(update)
+
+
+class UnidadRepeticion:
+    """Dron, máquina de estados y modelo de vuelo de la repetición, con su misión en curso."""
+
+    def __init__(self, dron_id, dron, maquina, modelo, cola_comandos):
+        self.dron_id = dron_id
+        self.dron = dron
+        self.maquina = maquina
+        self.modelo = modelo
+        self.cola_comandos = cola_comandos
+        self.estado = 'en_tierra'
+        self.emergencia = None
+        self.comando_pendiente = None    # Despachado mientras aterrizaba
+        self.ocupado_desde = None
+
+
+class Repeticion:
+    """
+    Reproduce un archivo de llamadas a través de Drone y MaquinaEstados sin interfaz.
+    Todo corre sobre un Programador conducido por un RelojVirtual: el reloj salta al
+    siguiente vencimiento, de modo que las maniobras y los vuelos no consumen tiempo
+    real. Las colas avisan al programador al recibir mensajes, sin sondeo. Las
+    llamadas se priorizan con ColaEmergencias y se asignan con el Despachador.
+    """
+
+    def __init__(self, archivo, bases=(BASE_POR_DEFECTO,), drones_por_base=1, consumo=CONSUMO_REPETICION,
+                 intervalo=INTERVALO_SIN_MARCA, horizonte=None, registro_eventos=None):
+        self.archivo = archivo if isinstance(archivo, ArchivoEmergencias) else ArchivoEmergencias(archivo)
+        self.intervalo = intervalo
+        self.horizonte = horizonte
+        # Consumo constante por segundo: las métricas de la repetición no dependen del
+        # modelo de energía del dron
+        self.energia = ConsumoPlano(consumo)
+        self.reloj = RelojVirtual()
+        self.programador = Programador(trabajadores=0, reloj=self.reloj)
+        self.registro_eventos = registro_eventos or RegistroEventos()
+        self.registro_eventos.usar_reloj(self.reloj)
+        self.despachador = Despachador(bases[0], energia=self.energia)
+        self.cola = ColaEmergencias(reloj=self.reloj)
+        self.cola_interfaz = ColaNotificada(Despertador(self.programador, self.atender_interfaz))
+        self.bases = [self.despachador.a_plano(*base) for base in bases]
+        self.unidades = {}
+        self.en_vuelo = set()
+
+        # Métricas
+        self.llamadas = 0
+        self.fusionadas = 0
+        self.misiones = 0
+        self.fuera_de_alcance = 0
+        self.invalidas = 0           # Marca de tiempo o ubicación ilegible
+        self.tiempos_respuesta = []
+        self.tiempo_ocupado = 0.0
+        self.primera_marca = None
+        self.llamadas_agotadas = False
+
+        for base in bases:
+            for _ in range(drones_por_base):
+                self.agregar_dron(base)
+
+    def agregar_dron(self, base):
+        dron_id = f"DEA-{len(self.unidades) + 1:03d}"
+        cola_comandos = ColaNotificada()
+        cola_eventos = ColaNotificada()
+        cola_simulacion = ColaNotificada()
+        cola_actualizaciones_simulacion = ColaNotificada()
+        registro = RegistroDron(self.registro_eventos, dron_id)
+
+        maquina = MaquinaEstados(
+            registro,
+            cola_eventos,
+            EntradaDron(dron_id, cola_comandos, self.cola_interfaz),
+            programador=self.programador
+        )
+        dron = Drone(
+            registro,
+            cola_comandos,
+            SalidaDron(dron_id, cola_eventos, self.cola_interfaz),
+            cola_simulacion,
+            cola_actualizaciones_simulacion,
+            programador=self.programador,
+            dron_id=dron_id,
+            base=base,
+            modelo_energia=self.energia
+        )
+        modelo = ModeloVuelo(dron_id, base, self.despachador, self.programador,
+                             cola_simulacion, cola_actualizaciones_simulacion, self.registrar_llegada)
+
+        # El dron y la máquina de estados se conectan solos a sus colas notificadas
+        cola_simulacion.aviso = Despertador(self.programador, modelo.atender)
+
+        self.unidades[dron_id] = UnidadRepeticion(dron_id, dron, maquina, modelo, cola_comandos)
+        self.despachador.registrar_dron(dron_id, base)
+        return dron_id
+
+    # Llamadas
+
+    def programar_siguiente_llamada(self):
+        """Lee la próxima llamada del archivo y la programa en su instante."""
+        while True:
+            emergencia = self.archivo.siguiente()
+            if emergencia is None:
+                self.llamadas_agotadas = True
+                return
+            try:
+                instante = self.instante_llamada(emergencia)
+            except ValueError as error:
+                self.invalidas += 1
+                self.registro_eventos.agregar_evento(f"Llamada descartada: {error}")
+                continue
+            self.programador.programar(max(0.0, instante - self.reloj()), self.recibir_llamada, emergencia)
+            return
+
+    def instante_llamada(self, emergencia):
+        marca = emergencia.get('marca')
+        if marca is None:
+            return (self.archivo.posicion - 1) * self.intervalo
+        segundos = segundos_marca(marca)
+        if self.primera_marca is None:
+            self.primera_marca = segundos
+        return segundos - self.primera_marca
+
+    def recibir_llamada(self, emergencia):
+        self.llamadas += 1
+        if self.cola.agregar(emergencia, llegada=self.reloj()) != emergencia.get('id'):
+            self.fusionadas += 1   # Nuevo reporte de un caso ya en cola
+        self.programar_siguiente_llamada()
+        self.despachar()
+
+    # Despacho
+
+    def despachar(self):
+        """Asigna drones a las emergencias en cola mientras haya alguno disponible."""
+        while self.cola:
+            emergencia = self.cola.ver()
+            try:
+                lat, lon = map(float, emergencia['ubicacion'].split(','))
+            except ValueError:
+                self.cola.retirar(emergencia['id'])
+                self.invalidas += 1
+                continue
+            dron_id, _ = self.despachador.seleccionar(lat, lon)
+            if dron_id is None:
+                if self.alcanzable(lat, lon):
+                    return
+                # Ningún dron con batería completa podría atenderla: no esperar por ella
+                self.cola.retirar(emergencia['id'])
+                self.fuera_de_alcance += 1
+                continue
+            self.cola.extraer()
+            self.despachador.reservar(dron_id)
+            unidad = self.unidades[dron_id]
+            if unidad.ocupado_desde is None:
+                unidad.ocupado_desde = self.reloj()
+            self.en_vuelo.add(dron_id)
+            comando = {'tipo': 'recepcion_comando_arranque_vuelo', 'ubicacion': emergencia['ubicacion']}
+            if unidad.estado == 'en_tierra':
+                unidad.emergencia = emergencia
+                unidad.cola_comandos.put(comando)
+            else:
+                unidad.comando_pendiente = (comando, emergencia)   # Sale en cuanto termine de aterrizar
+
+    def alcanzable(self, lat, lon):
+        x, y = self.despachador.a_plano(lat, lon)
+        return any(
+            self.despachador.estimar(EstadoDespacho(None, bx, by, (bx, by), 100, 'en_tierra'), x, y) is not None
+            for bx, by in self.bases
+        )
+
+    def registrar_llegada(self, dron_id):
+        emergencia = self.unidades[dron_id].emergencia
+        if emergencia is not None and 'respondida' not in emergencia:
+            emergencia['respondida'] = self.reloj()
+            self.tiempos_respuesta.append(self.reloj() - emergencia['llegada'])
+
+    # Flujo de la interfaz
+
+    def atender_interfaz(self):
+        while not self.cola_interfaz.empty():
+            update = self.cola_interfaz.get_nowait()
+            self.despachador.procesar_actualizacion(update)
+            if update.get('type') == 'estado_maquina':
+                self.cambio_estado(self.unidades[update['dron_id']], update['data'])
+
+    def cambio_estado(self, unidad, estado):
+        unidad.estado = estado
+        if estado not in ESTADOS_LIBRES:
+            return
+        if estado == 'en_tierra':
+            if unidad.emergencia is not None:
+                self.misiones += 1
+                unidad.emergencia = None
+            # Recambio de batería en la base
+            unidad.dron.bateria = 100
+            self.despachador.actualizar(unidad.dron_id, bateria=100)
+            if unidad.comando_pendiente:
+                (comando, unidad.emergencia), unidad.comando_pendiente = unidad.comando_pendiente, None
+                self.despachador.reservar(unidad.dron_id)
+                unidad.cola_comandos.put(comando)
+                return
+            self.tiempo_ocupado += self.reloj() - unidad.ocupado_desde
+            unidad.ocupado_desde = None
+        self.en_vuelo.discard(unidad.dron_id)
+        self.despachar()
+
+    # Ejecución
+
+    def terminada(self):
+        return self.llamadas_agotadas and not self.en_vuelo
+
+    def ejecutar(self):
+        """Corre la repetición hasta agotar las llamadas y las misiones, y devuelve el informe."""
+        inicio = time.perf_counter()
+        self.programar_siguiente_llamada()
+        self.programador.simular(hasta=self.horizonte, terminado=self.terminada)
+        return self.informe(time.perf_counter() - inicio)
+
+    def informe(self, duracion_real):
+        ahora = self.reloj()
+        ocupado = self.tiempo_ocupado + sum(
+            ahora - unidad.ocupado_desde for unidad in self.unidades.values() if unidad.ocupado_desde is not None
+        )
+        respuestas = sorted(self.tiempos_respuesta)
+        return {
+            'llamadas': self.llamadas,
+            'fusionadas': self.fusionadas,
+            'misiones': self.misiones,
+            'fuera_de_alcance': self.fuera_de_alcance,
+            'invalidas': self.invalidas,
+            'sin_atender': len(self.cola),
+            'tiempo_simulado': ahora,
+            'tiempo_real': duracion_real,
+            'misiones_por_segundo': self.misiones / duracion_real if duracion_real else 0.0,
+            'aceleracion': ahora / duracion_real if duracion_real else 0.0,
+            'respuesta_p50': percentil(respuestas, 50),
+            'respuesta_p90': percentil(respuestas, 90),
+            'respuesta_p99': percentil(respuestas, 99),
+            'utilizacion': ocupado / (ahora * len(self.unidades)) if ahora and self.unidades else 0.0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Repite un archivo de llamadas de emergencia en tiempo acelerado.")
+    parser.add_argument('archivo', help="Archivo de llamadas (formato de emergencias.txt, con marca opcional)")
+    parser.add_argument('--base', action='append', help="Base 'lat,lon' (repetible)")
+    parser.add_argument('--drones-por-base', type=int, default=1)
+    parser.add_argument('--consumo', type=float, default=CONSUMO_REPETICION, help="%% de batería por segundo de vuelo")
+    parser.add_argument('--intervalo', type=float, default=INTERVALO_SIN_MARCA)
+    parser.add_argument('--horizonte', type=float, default=None, help="Segundos simulados máximos")
+    parser.add_argument('--log', action='store_true', help="Escribir el log de eventos (más lento)")
+    args = parser.parse_args()
+
+    configurar_log()
+    if not args.log:
+        logging.getLogger().setLevel(logging.WARNING)
+    bases = [tuple(map(float, base.split(','))) for base in args.base] if args.base else [BASE_POR_DEFECTO]
+    repeticion = Repeticion(args.archivo, bases, args.drones_por_base, args.consumo, args.intervalo, args.horizonte)
+    if args.log:
+        informe = repeticion.ejecutar()
+    else:
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):   # Mensajes de consola del Drone
+            informe = repeticion.ejecutar()
+
+    print(f"Llamadas: {informe['llamadas']} ({informe['fusionadas']} fusionadas con un caso en cola)")
+    print(f"Misiones completadas: {informe['misiones']}, fuera de alcance: {informe['fuera_de_alcance']}, "
+          f"inválidas: {informe['invalidas']}, sin atender: {informe['sin_atender']}")
+    print(f"Tiempo simulado: {informe['tiempo_simulado']:.0f} s en {informe['tiempo_real']:.2f} s reales "
+          f"(x{informe['aceleracion']:.0f}, {informe['misiones_por_segundo']:.1f} misiones/s)")
+    if informe['respuesta_p50'] is not None:
+        print(f"Tiempo de respuesta: p50 {informe['respuesta_p50']:.0f} s, p90 {informe['respuesta_p90']:.0f} s, "
+              f"p99 {informe['respuesta_p99']:.0f} s")
+    print(f"Utilización de la flota: {informe['utilizacion']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
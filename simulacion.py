@@ -1,360 +1,615 @@
 # simulacion.py
 
-from vpython import *
+import math
 import multiprocessing
 import queue
 import time
+from collections import deque
 
-def iniciar_simulacion(queue_commands, queue_updates):
+from energia import VELOCIDAD_CRUCERO as VELOCIDAD_CRUCERO_MS
+from planificacion_rutas import PlanificadorRutas
+from proyeccion import METROS_POR_UNIDAD, ORIGEN_SIMULACION, SIMULACION
+from reloj import reloj_para_escala
+from telemetria import CanalTelemetria
+from transiciones import EventoMaquina
+
+# Coordenadas del hospital (posición inicial del dron y origen del espacio de simulación)
+HOME_LAT, HOME_LON = ORIGEN_SIMULACION
+
+POSICION_BASE = (0.0, 0.0, 5.0)   # Posición inicial del dron en coordenadas de simulación
+DT = 1 / 60                       # Paso fijo de integración en segundos simulados
+# Unidades de simulación por segundo: los 60 km/h del modelo de energía (unas 1.5)
+VELOCIDAD_CRUCERO = VELOCIDAD_CRUCERO_MS / METROS_POR_UNIDAD
+VELOCIDAD_VUELO_LIBRE = VELOCIDAD_CRUCERO   # En control manual también se vuela a crucero
+TOLERANCIA_LLEGADA = 0.5          # Distancia a la que se considera alcanzado el destino
+DURACION_ASISTENCIA = 5.0         # Segundos simulados de asistencia con el DEA
+VELOCIDAD_HELICES = 0.2           # Radianes que giran las hélices de la vista 3D por cuadro
+
+TASA_MAXIMA_POSICION = 10.0       # Publicaciones de posición por segundo real como máximo
+EPSILON_POSICION = 0.05           # Desplazamiento mínimo para publicar una nueva posición
+PERIODO_LATIDO = 1.0              # Segundos reales entre latidos cuando no hay cambios
+
+
+def coord_to_simulation(lat, lon):
+    """Convierte coordenadas geográficas a coordenadas de simulación (proyeccion.SIMULACION)."""
+    x, y = SIMULACION.a_plano(lat, lon)
+    return (x, y, 5.0)  # Mantener Z en 5
+
+
+def simulation_to_coord(x, y):
+    """Convierte coordenadas de simulación a (lat, lon)."""
+    return SIMULACION.a_geo(x, y)
+
+
+class PublicadorPosicion:
     """
-    Inicia la simulación 3D del dron utilizando VPython.
-    Escucha comandos desde la cola para iniciar misiones hacia ubicaciones específicas.
-    Envía actualizaciones de estado a la interfaz de usuario y a la máquina de estados.
+    Etapa de publicación de posiciones hacia el proceso del dron.
+    Limita la tasa de mensajes, conserva solo la muestra más reciente entre
+    publicaciones, descarta desplazamientos menores que epsilon y envía un
+    latido periódico con los contadores cuando el dron no se mueve. Con
+    tiempo_simulado cada mensaje lleva en 'tiempo' el instante simulado de su
+    muestra, con el que el dron calcula su velocidad.
+    La tasa y el latido se miden en `reloj`; con un reloj de reloj.py la tasa sigue
+    siendo por segundo real (un reloj virtual no tiene escala: se mide en su tiempo).
+    """
+
+    def __init__(self, queue_updates, tasa_maxima=TASA_MAXIMA_POSICION,
+                 epsilon=EPSILON_POSICION, periodo_latido=PERIODO_LATIDO, reloj=time.monotonic,
+                 tiempo_simulado=None):
+        self.queue_updates = queue_updates
+        escala = getattr(reloj, 'escala', None) or 1.0
+        self.intervalo_minimo = escala / tasa_maxima if tasa_maxima else 0.0
+        self.epsilon = epsilon
+        self.periodo_latido = periodo_latido * escala
+        self.reloj = reloj
+        self.tiempo_simulado = tiempo_simulado
+
+        self.pendiente = None             # Muestra más reciente aún no publicada
+        self.t_pendiente = None           # Su instante simulado
+        self.ultima_publicada = None
+        self.t_ultima_publicacion = None
+
+        # Contadores
+        self.publicadas = 0
+        self.coalescidas = 0   # Muestras reemplazadas por una más reciente antes de enviarse
+        self.descartadas = 0   # Muestras sin desplazamiento significativo
+        self.latidos = 0
+
+    def contadores(self):
+        return {
+            'publicadas': self.publicadas,
+            'coalescidas': self.coalescidas,
+            'descartadas': self.descartadas,
+            'latidos': self.latidos,
+        }
+
+    def ofrecer(self, posicion):
+        """Entrega una nueva muestra de posición; se publica cuando lo permita la tasa."""
+        if self.pendiente is not None:
+            self.coalescidas += 1
+        self.pendiente = posicion
+        self.t_pendiente = self.tiempo_simulado() if self.tiempo_simulado else None
+        self.publicar_si_corresponde()
+
+    def publicar_si_corresponde(self):
+        """Publica la muestra pendiente o un latido si ha transcurrido el intervalo."""
+        ahora = self.reloj()
+        transcurrido = None
+        if self.t_ultima_publicacion is not None:
+            transcurrido = ahora - self.t_ultima_publicacion
+            if transcurrido < self.intervalo_minimo:
+                return
+
+        if self.pendiente is not None:
+            if self.ultima_publicada is not None and \
+                    math.dist(self.pendiente, self.ultima_publicada) < self.epsilon:
+                self.descartadas += 1
+                self.pendiente = None
+            else:
+                self._publicar(self.pendiente, ahora, self.t_pendiente)
+                return
+
+        if self.ultima_publicada is not None and \
+                (transcurrido is None or transcurrido >= self.periodo_latido):
+            self.latidos += 1
+            tiempo = self.tiempo_simulado() if self.tiempo_simulado else None
+            self._publicar(self.ultima_publicada, ahora, tiempo, latido=True)
+
+    def vaciar(self):
+        """Publica de inmediato la muestra pendiente, p. ej. antes de un evento discreto."""
+        if self.pendiente is not None:
+            self._publicar(self.pendiente, self.reloj(), self.t_pendiente)
+
+    def _publicar(self, posicion, ahora, tiempo=None, latido=False):
+        data = {'posicion': posicion}
+        if tiempo is not None:
+            data['tiempo'] = tiempo
+        if latido:
+            data['latido'] = True
+            data['contadores'] = self.contadores()
+        self.queue_updates.put({'type': 'posicion_actualizada', 'data': data})
+        self.publicadas += 1
+        self.ultima_publicada = posicion
+        self.t_ultima_publicacion = ahora
+        self.pendiente = None
+
+
+class MotorSimulacion:
+    """
+    Física de la misión del dron sin dependencia de VPython.
+    Avanza en pasos fijos de tiempo simulado y usa el mismo protocolo de colas
+    que la simulación original, de modo que Drone y MaquinaEstados no cambian.
+    Los renderizadores se suscriben con suscribir() y reciben las notificaciones
+    'paso', 'mision_iniciada', 'destino_alcanzado', 'regreso_iniciado' y 'reiniciado'.
+    Con un planificador de rutas el dron sigue los puntos de la ruta planificada en
+    lugar de volar en línea recta; objetivo es el punto en curso y destino el final.
+    """
+
+    def __init__(self, queue_updates, dt=DT, publicador=None, telemetria=None, base=POSICION_BASE,
+                 planificador=None):
+        self.queue_updates = queue_updates
+        self.publicador = publicador or PublicadorPosicion(queue_updates)
+        if self.publicador.tiempo_simulado is None:
+            self.publicador.tiempo_simulado = lambda: self.tiempo
+        self.telemetria = telemetria   # Con canal compartido, la cola solo transporta eventos
+        self.dt = dt
+        self.tiempo = 0.0   # Tiempo simulado transcurrido en segundos
+
+        self.base = base    # Posición de despegue y regreso
+        self.posicion = base
+        self.objetivo = None
+        self.destino = None
+        self.planificador = planificador
+        self.ruta = deque()   # Puntos de la ruta que siguen al objetivo en curso
+        self.animacion_en_progreso = False
+        self.detener_dron = False
+        self.regreso = False
+        self.vuelo_libre = False
+        self.teclas_presionadas = set()
+        self.asistencia_restante = 0.0
+
+        self.observadores = []
+
+    def suscribir(self, observador):
+        """Registra un observador invocado como observador(notificacion, motor)."""
+        self.observadores.append(observador)
+
+    def notificar(self, notificacion):
+        for observador in self.observadores:
+            observador(notificacion, self)
+
+    def enviar_evento(self, mensaje, codigo=None, **datos):
+        """Envía un evento discreto; codigo es el EventoMaquina que representa, si lo hay."""
+        # La última posición debe llegar antes que el evento que la sigue
+        self.publicador.vaciar()
+        update = {'type': 'evento', 'data': mensaje, **datos}
+        if codigo is not None:
+            update['codigo'] = codigo
+        self.queue_updates.put(update)
+
+    def enviar_posicion(self):
+        if self.telemetria is None:
+            self.publicador.ofrecer((self.posicion[0], self.posicion[1]))
+
+    def procesar_comando(self, message):
+        """Aplica un comando recibido desde la cola de comandos."""
+        comando = message.get('tipo')
+        if comando == 'recibir_comando_arranque':
+            # Iniciar misión hacia la localización de emergencia
+            ubicacion = message.get('ubicacion')
+            if ubicacion:
+                try:
+                    lat_str, lon_str = ubicacion.split(',')
+                    lat = float(lat_str.strip())
+                    lon = float(lon_str.strip())
+                except ValueError:
+                    self.enviar_evento("Error en la ubicación proporcionada.")
+                    return
+                # Convertir a coordenadas de simulación
+                if not self.volar_a(coord_to_simulation(lat, lon)):
+                    self.enviar_evento("Destino en una zona de exclusión aérea o sin ruta posible.")
+                    return
+                self.animacion_en_progreso = True
+                self.enviar_evento(f"Dron despegando hacia {ubicacion}", EventoMaquina.DESPEGUE_COMPLETADO)
+                print(f"Dron despegando hacia {ubicacion}")
+                self.notificar('mision_iniciada')
+            else:
+                # Ubicación no proporcionada
+                self.enviar_evento("No se proporcionó ubicación para la emergencia.")
+        elif comando == 'cambio_localizacion_emergencia':
+            self.cambiar_destino(message.get('nueva_ubicacion'))
+        elif comando == 'vuelo_libre':
+            self.vuelo_libre = message.get('activar', True)
+            if self.vuelo_libre:
+                self.enviar_evento("Vuelo libre activado.")
+            else:
+                self.enviar_evento("Vuelo libre desactivado.")
+        elif comando == 'detener_dron':
+            self.detener_dron = True
+            self.animacion_en_progreso = False
+            self.asistencia_restante = 0.0
+            self.ruta.clear()
+            self.enviar_evento("Dron detenido por comando de emergencia.")
+        elif comando == 'reiniciar_dron':
+            # Reiniciar dron a posición inicial
+            self.posicion = self.base
+            self.detener_dron = False
+            self.animacion_en_progreso = False
+            self.asistencia_restante = 0.0
+            self.ruta.clear()
+            self.notificar('reiniciado')
+        # Puedes manejar más comandos si es necesario
+
+    def cambiar_destino(self, ubicacion):
+        """Redirige en vuelo la misión en curso hacia una nueva ubicación 'lat, lon'."""
+        # 'cambio_rechazado' avisa al dron de que conserva la ubicación anterior
+        try:
+            lat, lon = map(float, ubicacion.split(','))
+        except (AttributeError, ValueError):
+            self.enviar_evento("Error en la nueva ubicación proporcionada.", cambio_rechazado=True)
+            return
+        if self.regreso or not self.animacion_en_progreso or self.asistencia_restante > 0:
+            self.enviar_evento("Cambio de localización ignorado: el dron no está en ruta a la emergencia.",
+                               cambio_rechazado=True)
+            return
+        if not self.volar_a(coord_to_simulation(lat, lon), replanificar=True):
+            self.enviar_evento("Nueva ubicación en una zona de exclusión aérea o sin ruta posible.",
+                               cambio_rechazado=True)
+            return
+        # 'correccion' marca el tiempo simulado del cambio: las muestras posteriores ya
+        # siguen el nuevo rumbo (el dron mide con ellas la latencia de la corrección)
+        self.enviar_evento(f"Rumbo corregido hacia {ubicacion}", correccion=self.tiempo)
+        self.notificar('mision_iniciada')
+
+    def volar_a(self, destino, replanificar=False):
+        """
+        Fija el destino y, con planificador, la ruta que lleva a él. Devuelve False si
+        el planificador no encuentra ruta (destino en una zona de exclusión). Con
+        replanificar, la ruta se recalcula desde la posición en vuelo.
+        """
+        intermedios = []
+        if self.planificador is not None:
+            if replanificar:
+                puntos = self.planificador.replanificar(self.posicion, destino)
+            else:
+                puntos = self.planificador.ruta(self.posicion, destino)
+            if puntos is None:
+                return False
+            intermedios = [(x, y, destino[2]) for x, y in puntos[1:-1]]
+            if intermedios:
+                self.enviar_evento(f"Obstáculo fijo en la ruta: desvío por {len(intermedios)} puntos.",
+                                   EventoMaquina.DETECCION_OBSTACULO_FIJO)
+        self.ruta.clear()
+        self.ruta.extend(intermedios)
+        self.ruta.append(destino)
+        self.destino = destino
+        self.objetivo = self.ruta.popleft()
+        return True
+
+    def paso(self):
+        """Avanza la simulación un paso de tiempo dt."""
+        self.tiempo += self.dt
+        posicion_anterior = self.posicion
+        try:
+            self._avanzar()
+            if self.telemetria is None:
+                self.publicador.publicar_si_corresponde()
+            else:
+                velocidad = tuple((a - b) / self.dt for a, b in zip(self.posicion, posicion_anterior))
+                self.telemetria.escribir(self.tiempo, self.posicion, velocidad)
+        finally:
+            self.notificar('paso')
+
+    def _avanzar(self):
+        if self.detener_dron:
+            return  # Si el dron está detenido, saltamos la animación
+
+        # Control manual del dron en modo vuelo libre
+        if self.vuelo_libre:
+            move_step = VELOCIDAD_VUELO_LIBRE * self.dt
+            x, y, z = self.posicion
+            if 'w' in self.teclas_presionadas:
+                y += move_step
+            if 's' in self.teclas_presionadas:
+                y -= move_step
+            if 'a' in self.teclas_presionadas:
+                x -= move_step
+            if 'd' in self.teclas_presionadas:
+                x += move_step
+            if 'q' in self.teclas_presionadas:
+                z += move_step
+            if 'e' in self.teclas_presionadas:
+                z -= move_step
+            self.posicion = (x, y, z)
+            self.enviar_posicion()
+            return
+
+        # Asistencia en curso: el tiempo de asistencia transcurre en tiempo simulado
+        if self.asistencia_restante > 0:
+            self.asistencia_restante -= self.dt
+            if self.asistencia_restante <= 0:
+                self.terminar_asistencia()
+            return
+
+        # Animar el dron hacia la posición objetivo
+        if self.animacion_en_progreso and self.objetivo:
+            dx = self.objetivo[0] - self.posicion[0]
+            dy = self.objetivo[1] - self.posicion[1]
+            dz = self.objetivo[2] - self.posicion[2]
+            distancia = math.sqrt(dx * dx + dy * dy + dz * dz)
+            if distancia > TOLERANCIA_LLEGADA:
+                avance = VELOCIDAD_CRUCERO * self.dt / distancia
+                x, y, z = self.posicion
+                self.posicion = (x + dx * avance, y + dy * avance, z + dz * avance)
+                self.enviar_posicion()
+            else:
+                self.llegar()
+        else:
+            # Enviar actualización de posición al dron en reposo
+            self.enviar_posicion()
+
+    def terminar_asistencia(self):
+        self.asistencia_restante = 0.0
+        self.enviar_evento("Asistencia completada, dron regresando a base.", EventoMaquina.ASISTENCIA_COMPLETADA)
+        # Regresar a base; sin ruta posible, en línea recta
+        if not self.volar_a(self.base):
+            self.destino = self.objetivo = self.base
+        self.animacion_en_progreso = True
+        self.regreso = True
+        self.notificar('regreso_iniciado')
+
+    def llegar(self):
+        """El dron alcanzó su objetivo: sigue la ruta, empieza la asistencia o termina el regreso."""
+        if self.ruta:
+            self.objetivo = self.ruta.popleft()
+            return
+        self.animacion_en_progreso = False
+        self.enviar_evento("Dron llegó al destino", EventoMaquina.LLEGADA_DESTINO)
+        self.notificar('destino_alcanzado')
+        if not self.regreso:
+            # Simular asistencia
+            self.enviar_evento("Dron asistiendo con el DEA.", EventoMaquina.DETECCION_SIGNOS_VITALES_PACIENTE)
+            self.asistencia_restante = DURACION_ASISTENCIA
+        else:
+            # Dron ha regresado a la base
+            self.enviar_evento("Dron regresó a la base y está en espera.", EventoMaquina.REGRESO_BASE)
+            self.regreso = False  # Reiniciar para la próxima misión
+
+
+class RenderizadorVPython:
     """
-    # Configuración de la escena
-    scene = canvas(title='Simulación del Dron en 3D', width=1000, height=800)
-    scene.background = vector(0.8, 0.9, 1)  # Cielo azul claro
-    scene.range = 50
-    scene.forward = vector(-1, -1, -1)  # Orientación inicial de la cámara
-
-    # Variables globales
-    vuelo_libre = False
-    keys_pressed = set()
-
-    # Coordenadas del hospital (posición inicial del dron)
-    home_lat = 4.627925
-    home_lon = -74.064692
-
-    # Crear el dron estilizado
-    def crear_dron():
+    Vista 3D opcional del motor de simulación.
+    Se suscribe al motor y refleja su estado en objetos de VPython.
+    """
+
+    POSICIONES_BRAZOS = [
+        (3.5, 0, 0),
+        (-3.5, 0, 0),
+        (0, 3.5, 0),
+        (0, -3.5, 0),
+    ]
+
+    def __init__(self, motor):
+        # VPython solo es necesario cuando se renderiza
+        import vpython
+        self.vp = vpython
+        vector, color = vpython.vector, vpython.color
+
+        # Configuración de la escena
+        self.scene = vpython.canvas(title='Simulación del Dron en 3D', width=1000, height=800)
+        self.scene.background = vector(0.8, 0.9, 1)  # Cielo azul claro
+        self.scene.range = 50
+        self.scene.forward = vector(-1, -1, -1)  # Orientación inicial de la cámara
+
+        self.crear_dron(vector(*motor.posicion))
+
+        self.direction_arrow = None
+        self.destination_marker = None
+        self.emergency_point = None
+
+        # Ajustes de la cámara
+        self.camera_offset = vector(0, -20, 10)
+        self.seguir_camara()
+
+        # Manejo de teclas: las teclas presionadas alimentan el vuelo libre del motor
+        def keydown(evt):
+            motor.teclas_presionadas.add(evt.key)
+
+        def keyup(evt):
+            motor.teclas_presionadas.discard(evt.key)
+
+        self.scene.bind('keydown', keydown)
+        self.scene.bind('keyup', keyup)
+
+        motor.suscribir(self)
+
+    # Crear el dron estilizado como un objeto compuesto (moverlo mueve todas sus partes);
+    # las hélices quedan aparte para poder girarlas cada cuadro
+    def crear_dron(self, posicion):
+        vp, vector, color = self.vp, self.vp.vector, self.vp.color
+        partes = []
         # Cuerpo principal
-        cuerpo = box(
-            pos=vector(0, 0, 5),
+        partes.append(vp.box(
+            pos=posicion,
             size=vector(2.5, 1.2, 0.5),
             color=color.gray(0.2)
-        )
+        ))
 
         # Indicador LED en la parte superior
-        led = box(
-            pos=cuerpo.pos + vector(0, 0.6, 0),
+        partes.append(vp.box(
+            pos=posicion + vector(0, 0.6, 0),
             size=vector(0.5, 0.2, 0.05),
             color=color.blue
-        )
+        ))
 
         # Cámara en la parte frontal
-        camara_cuerpo = box(
-            pos=cuerpo.pos + vector(0, -0.6, -0.3),
+        camara = posicion + vector(0, -0.6, -0.3)
+        partes.append(vp.box(
+            pos=camara,
             size=vector(0.7, 0.5, 0.5),
             color=color.black
-        )
-        lente = sphere(
-            pos=camara_cuerpo.pos + vector(0, 0, 0.3),
+        ))
+        partes.append(vp.sphere(
+            pos=camara + vector(0, 0, 0.3),
             radius=0.1,
             color=color.red
-        )
+        ))
 
         # Brazos del dron
         brazo_longitud = 3.5
         brazo_grosor = 0.2
-        brazos = []
-        posiciones_brazos = [
-            vector(brazo_longitud, 0, 0),
-            vector(-brazo_longitud, 0, 0),
-            vector(0, brazo_longitud, 0),
-            vector(0, -brazo_longitud, 0),
-        ]
-        for pos in posiciones_brazos:
-            brazo = box(
-                pos=cuerpo.pos + pos / 2,
+        for offset in self.POSICIONES_BRAZOS:
+            partes.append(vp.box(
+                pos=posicion + vector(*offset) / 2,
                 size=vector(brazo_longitud, brazo_grosor, 0.1),
                 color=color.gray(0.3)
-            )
-            brazos.append(brazo)
+            ))
 
         # Rotores y hélices
         rotor_radius = 0.6
-        rotors = []
-        helices = []
-        for brazo_pos in posiciones_brazos:
-            rotor = cylinder(
-                pos=cuerpo.pos + brazo_pos,
+        for offset in self.POSICIONES_BRAZOS:
+            rotor = posicion + vector(*offset)
+            partes.append(vp.cylinder(
+                pos=rotor,
                 axis=vector(0, 0, 0.2),
                 radius=rotor_radius,
                 color=color.black
-            )
-            helice = box(
-                pos=rotor.pos + vector(0, 0, 0.1),
+            ))
+        self.helices = [
+            vp.box(
+                pos=posicion + vector(*offset) + vector(0, 0, 0.1),
                 size=vector(1.5, 0.1, 0.02),
                 color=color.gray(0.7),
             )
-            rotors.append(rotor)
-            helices.append(helice)
-
-        return cuerpo, brazos, rotors, helices, led, camara_cuerpo, lente
-
-    # Función para convertir coordenadas geográficas a coordenadas de simulación
-    def coord_to_simulation(lat, lon):
-        # Simple mapping, ajustar escala según sea necesario
-        x = (lon - home_lon) * 10000  # Escala en X
-        y = (lat - home_lat) * 10000   # Escala en Y
-        return vector(x, y, 5)  # Mantener Z en 5
-
-    # Crear el dron
-    cuerpo, brazos, rotors, helices, led, camara_cuerpo, lente = crear_dron()
-
-    drone_target_position = None
-    animation_in_progress = False
-    direction_arrow = None
-    destination_marker = None
-    emergency_point = None
-
-    # Ajustes de la cámara
-    camera_offset = vector(0, -20, 10)
-    scene.camera.pos = cuerpo.pos + camera_offset
-    scene.camera.axis = cuerpo.pos - scene.camera.pos
-
-    # Variable para rotar las hélices
-    helice_angle = 0
-
-    # Variables para el control del dron
-    detener_dron = False
-    regreso = False
-
-    # Manejo de teclas
-    def keydown(evt):
-        key = evt.key
-        keys_pressed.add(key)
-
-    def keyup(evt):
-        key = evt.key
-        keys_pressed.discard(key)
-
-    scene.bind('keydown', keydown)
-    scene.bind('keyup', keyup)
-
-    # Función para actualizar las partes del dron según la posición del cuerpo
-    def actualizar_partes_dron():
-        # Actualizar posiciones de brazos, rotores y hélices
-        posiciones_brazos = [
-            vector(3.5, 0, 0),
-            vector(-3.5, 0, 0),
-            vector(0, 3.5, 0),
-            vector(0, -3.5, 0),
+            for offset in self.POSICIONES_BRAZOS
         ]
-        for brazo, offset in zip(brazos, posiciones_brazos):
-            brazo.pos = cuerpo.pos + offset / 2
 
-        for rotor, helice, offset in zip(rotors, helices, posiciones_brazos):
-            rotor.pos = cuerpo.pos + offset
-            helice.pos = rotor.pos + vector(0, 0, 0.1)
-            # La rotación de las hélices ya se maneja en el bucle principal
+        # origin: la posición del compuesto es la del cuerpo, no el centro de su caja
+        self.dron = vp.compound(partes, origin=posicion)
+
+    def mover_helices(self):
+        """Lleva las hélices sobre sus rotores y las gira para simular movimiento continuo."""
+        vector = self.vp.vector
+        for helice, offset in zip(self.helices, self.POSICIONES_BRAZOS):
+            helice.pos = self.dron.pos + vector(*offset) + vector(0, 0, 0.1)
+            helice.rotate(angle=VELOCIDAD_HELICES, axis=vector(0, 0, 1), origin=helice.pos)
+
+    def seguir_camara(self):
+        # Actualizar la posición de la cámara para seguir al dron
+        self.scene.camera.pos = self.dron.pos + self.camera_offset
+        self.scene.camera.axis = self.dron.pos - self.scene.camera.pos
+
+    def crear_flecha(self, objetivo):
+        if self.direction_arrow:
+            self.direction_arrow.visible = False
+        self.direction_arrow = self.vp.arrow(
+            pos=self.dron.pos,
+            axis=objetivo - self.dron.pos,
+            shaftwidth=0.2,
+            color=self.vp.color.yellow
+        )
 
-        # Actualizar posición del LED
-        led.pos = cuerpo.pos + vector(0, 0.6, 0)
+    def esperar(self, segundos):
+        """Cede el control a VPython para que dibuje el cuadro."""
+        self.vp.rate(1 / segundos)
+
+    def __call__(self, notificacion, motor):
+        vp, vector = self.vp, self.vp.vector
+        if notificacion == 'paso':
+            posicion = vector(*motor.posicion)
+            if posicion != self.dron.pos:
+                # Una sola asignación mueve el compuesto con todas sus partes
+                self.dron.pos = posicion
+                # Actualizar dirección de flecha
+                if self.direction_arrow and motor.animacion_en_progreso:
+                    self.direction_arrow.pos = self.dron.pos
+                    self.direction_arrow.axis = vector(*motor.objetivo) - self.dron.pos
+                self.seguir_camara()
+            self.mover_helices()
+        elif notificacion == 'mision_iniciada':
+            objetivo = vector(*motor.destino)
+            # Crear punto de emergencia
+            if self.emergency_point:
+                self.emergency_point.visible = False  # Ocultar anterior si existe
+            self.emergency_point = vp.cylinder(
+                pos=objetivo,
+                axis=vector(0, 0, 2),
+                radius=1,
+                color=vp.color.red
+            )
+            self.crear_flecha(objetivo)
+        elif notificacion == 'destino_alcanzado':
+            if self.direction_arrow:
+                self.direction_arrow.visible = False
+            if self.destination_marker:
+                self.destination_marker.visible = False
+        elif notificacion == 'regreso_iniciado':
+            objetivo = vector(*motor.destino)
+            self.destination_marker = vp.sphere(
+                pos=objetivo,
+                radius=0.5,
+                color=vp.color.green
+            )
+            self.crear_flecha(objetivo)
+        elif notificacion == 'reiniciado':
+            self.dron.pos = vector(*motor.posicion)
+            self.mover_helices()
 
-        # Actualizar posición de la cámara y lente
-        camara_cuerpo.pos = cuerpo.pos + vector(0, -0.6, -0.3)
-        lente.pos = camara_cuerpo.pos + vector(0, 0, 0.3)
 
-    while True:
-        rate(60)  # 60 fps
+def iniciar_simulacion(queue_commands, queue_updates, headless=False, escala_tiempo=1.0,
+                       tasa_maxima_posicion=TASA_MAXIMA_POSICION, epsilon_posicion=EPSILON_POSICION,
+                       periodo_latido=PERIODO_LATIDO, nombre_telemetria=None, planificar_rutas=True):
+    """
+    Inicia la simulación del dron.
+    Escucha comandos desde la cola para iniciar misiones hacia ubicaciones específicas.
+    Envía actualizaciones de estado a la interfaz de usuario y a la máquina de estados.
+
+    Con headless=True no se crea la escena de VPython. escala_tiempo indica cuántos
+    segundos simulados transcurren por segundo real (100 equivale a 100x); con None
+    la simulación avanza tan rápido como sea posible. El ritmo lo marca un reloj de
+    reloj.py (real, escalado o virtual) elegido según la escala.
 
-        # Rotar las hélices para simular movimiento continuo
-        helice_angle += 0.2
-        for helice in helices:
-            helice.rotate(angle=0.2, axis=vector(0, 0, 1), origin=helice.pos)
+    Las posiciones se publican como máximo tasa_maxima_posicion veces por segundo
+    real, solo si el dron se desplazó más de epsilon_posicion, con un latido cada
+    periodo_latido segundos que incluye los contadores del publicador.
 
+    Si se indica nombre_telemetria, la posición se escribe en ese bloque de memoria
+    compartida y la cola de actualizaciones queda solo para eventos discretos.
+
+    Con planificar_rutas el dron esquiva edificios y zonas de exclusión (ver
+    planificacion_rutas.py) en lugar de volar en línea recta.
+    """
+    publicador = PublicadorPosicion(
+        queue_updates,
+        tasa_maxima=tasa_maxima_posicion,
+        epsilon=epsilon_posicion,
+        periodo_latido=periodo_latido
+    )
+    telemetria = CanalTelemetria.conectar(nombre_telemetria) if nombre_telemetria else None
+    planificador = PlanificadorRutas() if planificar_rutas else None
+    motor = MotorSimulacion(queue_updates, publicador=publicador, telemetria=telemetria, planificador=planificador)
+    renderizador = None if headless else RenderizadorVPython(motor)
+
+    reloj = reloj_para_escala(escala_tiempo)
+    siguiente_paso = reloj()
+
+    while True:
         # Escuchar comandos de la cola
         try:
-            message = queue_commands.get_nowait()
-            comando = message.get('tipo')
-            if comando == 'recibir_comando_arranque':
-                # Iniciar misión hacia la localización de emergencia
-                ubicacion = message.get('ubicacion')
-                if ubicacion:
-                    try:
-                        lat_str, lon_str = ubicacion.split(',')
-                        lat = float(lat_str.strip())
-                        lon = float(lon_str.strip())
-                        # Convertir a coordenadas de simulación
-                        drone_target_position = coord_to_simulation(lat, lon)
-                        # Crear punto de emergencia
-                        if emergency_point:
-                            emergency_point.visible = False  # Ocultar anterior si existe
-                        emergency_point = cylinder(
-                            pos=drone_target_position,
-                            axis=vector(0, 0, 2),
-                            radius=1,
-                            color=color.red
-                        )
-                        animation_in_progress = True
-                        queue_updates.put({
-                            'type': 'evento',
-                            'data': f"Dron despegando hacia {ubicacion}"
-                        })
-                        print(f"Dron despegando hacia {ubicacion}")
-                        # Crear marcador y flecha de dirección
-                        if direction_arrow:
-                            direction_arrow.visible = False
-                        direction_arrow = arrow(
-                            pos=cuerpo.pos,
-                            axis=drone_target_position - cuerpo.pos,
-                            shaftwidth=0.2,
-                            color=color.yellow
-                        )
-                    except ValueError:
-                        queue_updates.put({
-                            'type': 'evento',
-                            'data': "Error en la ubicación proporcionada."
-                        })
-                else:
-                    # Ubicación no proporcionada
-                    queue_updates.put({
-                        'type': 'evento',
-                        'data': "No se proporcionó ubicación para la emergencia."
-                    })
-            elif comando == 'vuelo_libre':
-                activar = message.get('activar', True)
-                vuelo_libre = activar
-                if vuelo_libre:
-                    queue_updates.put({
-                        'type': 'evento',
-                        'data': "Vuelo libre activado."
-                    })
-                else:
-                    queue_updates.put({
-                        'type': 'evento',
-                        'data': "Vuelo libre desactivado."
-                    })
-            elif comando == 'detener_dron':
-                detener_dron = True
-                animation_in_progress = False
-                queue_updates.put({
-                    'type': 'evento',
-                    'data': "Dron detenido por comando de emergencia."
-                })
-            elif comando == 'reiniciar_dron':
-                # Reiniciar dron a posición inicial
-                cuerpo.pos = vector(0, 0, 5)
-                detener_dron = False
-                animation_in_progress = False
-                # Actualizar posiciones de partes del dron
-                actualizar_partes_dron()
-            # Puedes manejar más comandos si es necesario
+            while True:
+                motor.procesar_comando(queue_commands.get_nowait())
         except queue.Empty:
             pass  # No hay comandos, continuar
 
-        if detener_dron:
-            continue  # Si el dron está detenido, saltamos la animación
+        motor.paso()
 
-        # Control manual del dron en modo vuelo libre
-        if vuelo_libre:
-            move_step = 0.5  # Ajustar velocidad de movimiento
-            if 'w' in keys_pressed:
-                cuerpo.pos.y += move_step
-            if 's' in keys_pressed:
-                cuerpo.pos.y -= move_step
-            if 'a' in keys_pressed:
-                cuerpo.pos.x -= move_step
-            if 'd' in keys_pressed:
-                cuerpo.pos.x += move_step
-            if 'q' in keys_pressed:
-                cuerpo.pos.z += move_step
-            if 'e' in keys_pressed:
-                cuerpo.pos.z -= move_step
-
-            # Actualizar posiciones de partes del dron
-            actualizar_partes_dron()
-
-            # Actualizar la posición de la cámara para seguir al dron
-            scene.camera.pos = cuerpo.pos + camera_offset
-            scene.camera.axis = cuerpo.pos - scene.camera.pos
-
-            # Enviar actualización de posición al dron
-            queue_updates.put({
-                'type': 'posicion_actualizada',
-                'data': {
-                    'posicion': (cuerpo.pos.x, cuerpo.pos.y)
-                }
-            })
-            continue  # Saltar el resto del bucle para evitar conflictos
-
-        # Animar el dron hacia la posición objetivo
-        if animation_in_progress and drone_target_position:
-            direction = drone_target_position - cuerpo.pos
-            if direction.mag > 0.5:
-                step = direction.norm() * 0.2  # Velocidad de movimiento ajustable
-                cuerpo.pos += step
-
-                # Actualizar posiciones de partes del dron
-                actualizar_partes_dron()
-
-                # Actualizar dirección de flecha
-                if direction_arrow:
-                    direction_arrow.pos = cuerpo.pos
-                    direction_arrow.axis = drone_target_position - cuerpo.pos
-
-                # Actualizar la posición de la cámara para seguir al dron
-                scene.camera.pos = cuerpo.pos + camera_offset
-                scene.camera.axis = cuerpo.pos - scene.camera.pos
-
-                # Enviar actualización de posición al dron
-                queue_updates.put({
-                    'type': 'posicion_actualizada',
-                    'data': {
-                        'posicion': (cuerpo.pos.x, cuerpo.pos.y)
-                    }
-                })
-            else:
-                animation_in_progress = False
-                queue_updates.put({
-                    'type': 'evento',
-                    'data': "Dron llegó al destino"
-                })
-                if direction_arrow:
-                    direction_arrow.visible = False
-                if destination_marker:
-                    destination_marker.visible = False
-
-                if not regreso:
-                    # Simular asistencia
-                    queue_updates.put({
-                        'type': 'evento',
-                        'data': "Dron asistiendo con el DEA."
-                    })
-                    time.sleep(5)  # Tiempo de asistencia
-                    queue_updates.put({
-                        'type': 'evento',
-                        'data': "Asistencia completada, dron regresando a base."
-                    })
-
-                    # Regresar a base
-                    drone_target_position = vector(0, 0, 5)  # Regresar a la posición inicial
-                    animation_in_progress = True
-                    destination_marker = sphere(
-                        pos=drone_target_position,
-                        radius=0.5,
-                        color=color.green
-                    )
-                    direction_arrow = arrow(
-                        pos=cuerpo.pos,
-                        axis=drone_target_position - cuerpo.pos,
-                        shaftwidth=0.2,
-                        color=color.yellow
-                    )
-                    regreso = True
-                else:
-                    # Dron ha regresado a la base
-                    queue_updates.put({
-                        'type': 'evento',
-                        'data': "Dron regresó a la base y está en espera."
-                    })
-                    regreso = False  # Reiniciar para la próxima misión
+        # Mantener el tiempo simulado al ritmo del reloj
+        if renderizador:
+            renderizador.esperar(reloj.segundos_reales(motor.dt) or motor.dt)
         else:
-            # Enviar actualización de posición al dron en reposo
-            queue_updates.put({
-                'type': 'posicion_actualizada',
-                'data': {
-                    'posicion': (cuerpo.pos.x, cuerpo.pos.y)
-                }
-            })
+            siguiente_paso += motor.dt
+            espera = siguiente_paso - reloj()
+            if espera > 0:
+                reloj.dormir(espera)
+            else:
+                siguiente_paso = reloj()  # Vamos atrasados, no acumular deuda
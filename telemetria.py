@@ -0,0 +1,76 @@
+# telemetria.py
+
+import math
+import struct
+from multiprocessing import shared_memory
+
+# Diseño fijo del bloque compartido: un contador de secuencia (seqlock) seguido
+# de un registro de float64 con la última muestra de posición y actitud.
+CAMPOS = ('tiempo', 'x', 'y', 'z', 'vx', 'vy', 'vz', 'rumbo')
+
+_SECUENCIA = struct.Struct('<Q')
+_REGISTRO = struct.Struct('<' + 'd' * len(CAMPOS))
+TAMANO_BLOQUE = _SECUENCIA.size + _REGISTRO.size
+
+
+class CanalTelemetria:
+    """
+    Canal de telemetría en memoria compartida entre la simulación y el dron.
+    Un único escritor publica la muestra más reciente protegida por un seqlock:
+    la secuencia es impar mientras se escribe y el lector reintenta si la
+    secuencia cambió durante la lectura. No hay serialización ni colas.
+    """
+
+    def __init__(self, memoria, propietario=False):
+        self.memoria = memoria
+        self.propietario = propietario
+        self.buffer = memoria.buf
+        self.secuencia = 0
+
+    @classmethod
+    def crear(cls):
+        """Crea un bloque nuevo; el proceso que lo crea es responsable de liberarlo."""
+        memoria = shared_memory.SharedMemory(create=True, size=TAMANO_BLOQUE)
+        memoria.buf[:TAMANO_BLOQUE] = bytes(TAMANO_BLOQUE)
+        return cls(memoria, propietario=True)
+
+    @classmethod
+    def conectar(cls, nombre):
+        """Se conecta a un bloque existente a partir de su nombre."""
+        return cls(shared_memory.SharedMemory(name=nombre))
+
+    @property
+    def nombre(self):
+        return self.memoria.name
+
+    def escribir(self, tiempo, posicion, velocidad):
+        """Publica una muestra. Solo debe existir un escritor por canal."""
+        x, y, z = posicion
+        vx, vy, vz = velocidad
+        rumbo = math.atan2(vy, vx) if (vx or vy) else 0.0
+        self.secuencia += 1   # Impar: escritura en curso
+        _SECUENCIA.pack_into(self.buffer, 0, self.secuencia)
+        _REGISTRO.pack_into(self.buffer, _SECUENCIA.size, tiempo, x, y, z, vx, vy, vz, rumbo)
+        self.secuencia += 1   # Par: muestra consistente
+        _SECUENCIA.pack_into(self.buffer, 0, self.secuencia)
+
+    def leer(self):
+        """
+        Devuelve (secuencia, muestra) con la muestra como diccionario de CAMPOS,
+        o (0, None) si aún no se ha escrito nada.
+        """
+        while True:
+            inicio = _SECUENCIA.unpack_from(self.buffer, 0)[0]
+            if inicio == 0:
+                return 0, None
+            if inicio & 1:
+                continue  # El escritor está a mitad de una muestra
+            valores = _REGISTRO.unpack_from(self.buffer, _SECUENCIA.size)
+            if _SECUENCIA.unpack_from(self.buffer, 0)[0] == inicio:
+                return inicio, dict(zip(CAMPOS, valores))
+
+    def cerrar(self):
+        self.buffer = None
+        self.memoria.close()
+        if self.propietario:
+            self.memoria.unlink()
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+import archivo_emergencias
+from archivo_emergencias import ArchivoEmergencias, EXTENSION_INDICE, parsear_linea
+
+
+def escribir_llamadas(ruta, n, cabecera=True, desde=0):
+    with open(ruta, 'a', encoding='utf-8') as archivo:
+        if cabecera:
+            archivo.write("marca,usuario,situacion,latitud,longitud\n")
+        for i in range(desde, desde + n):
+            archivo.write(f"00:{i // 60:02d}:{i % 60:02d},U{i},Paro cardíaco,4.{i:05d},-74.06\n")
+            if i % 10 == 0:
+                archivo.write("\n")   # Las líneas vacías no cuentan como llamadas
+
+
+@pytest.fixture
+def ruta(tmp_path):
+    ruta = str(tmp_path / 'llamadas.txt')
+    escribir_llamadas(ruta, 250)
+    return ruta
+
+
+def test_parsear_formatos():
+    assert parsear_linea(b'U1,Accidente,4.6,-74.1\n') == {
+        'usuario': 'U1', 'situacion': 'Accidente', 'ubicacion': '4.6, -74.1'}
+    assert parsear_linea(b'U1,Incendio,"4.6, -74.1"\n')['ubicacion'] == '4.6, -74.1'
+    assert parsear_linea(b'08:00:00,U1,Otra,4.6,-74.1\n')['marca'] == '08:00:00'
+    assert parsear_linea(b'\n') is None
+
+
+def test_lectura_secuencial_sin_indice(ruta):
+    with ArchivoEmergencias(ruta) as archivo:
+        primera = archivo.siguiente()
+        llamadas = [primera] + list(iter(archivo.siguiente, None))
+
+    assert (primera['usuario'], primera['marca']) == ('U0', '00:00:00')
+    assert [llamada['usuario'] for llamada in llamadas] == [f"U{i}" for i in range(250)]
+    assert not os.path.exists(ruta + EXTENSION_INDICE)
+
+
+@pytest.mark.parametrize('usar_mmap', [False, True])
+def test_acceso_por_indice(ruta, usar_mmap, monkeypatch):
+    # Bloques pequeños para que el índice se escriba en varios volcados
+    monkeypatch.setattr(archivo_emergencias, 'BLOQUE_INDICE', 16)
+    with ArchivoEmergencias(ruta, usar_mmap=usar_mmap) as archivo:
+        todas = list(archivo)
+        archivo.siguiente()
+        assert len(archivo) == 250
+        assert [archivo.leer(n) for n in (249, 0, 123)] == [todas[249], todas[0], todas[123]]
+        # leer() no mueve la lectura secuencial; ir_a() sí
+        assert archivo.siguiente() == todas[1]
+        archivo.ir_a(200)
+        assert (archivo.siguiente(), archivo.posicion) == (todas[200], 201)
+        with pytest.raises(IndexError):
+            archivo.leer(250)
+    assert os.path.exists(ruta + EXTENSION_INDICE)
+
+
+def test_indice_se_reutiliza_y_se_reconstruye_si_el_archivo_cambia(ruta, monkeypatch):
+    with ArchivoEmergencias(ruta) as archivo:
+        assert len(archivo) == 250
+
+    construcciones = []
+    construir = ArchivoEmergencias.construir_indice
+    monkeypatch.setattr(ArchivoEmergencias, 'construir_indice',
+                        lambda archivo: construcciones.append(archivo) or construir(archivo))
+    with ArchivoEmergencias(ruta) as archivo:
+        assert archivo.leer(249)['usuario'] == 'U249'
+    assert construcciones == []
+
+    escribir_llamadas(ruta, 5, cabecera=False, desde=250)
+    with ArchivoEmergencias(ruta) as archivo:
+        assert (len(archivo), archivo.leer(254)['usuario']) == (255, 'U254')
+    assert len(construcciones) == 1
+
+
+def test_archivo_sin_cabecera(tmp_path):
+    ruta = str(tmp_path / 'sin_cabecera.txt')
+    escribir_llamadas(ruta, 3, cabecera=False)
+    with ArchivoEmergencias(ruta, usar_mmap=True) as archivo:
+        assert [archivo.leer(n)['usuario'] for n in range(len(archivo))] == ['U0', 'U1', 'U2']
+        assert archivo.siguiente()['usuario'] == 'U0'
@@ -0,0 +1,105 @@
+import threading
+
+from bus import Bus
+
+
+def telemetria(i):
+    return {'type': 'estado_dron', 'data': {'bateria': i}}
+
+
+def evento(i):
+    return {'type': 'evento', 'data': f"evento {i}"}
+
+
+def vaciar(cola):
+    mensajes = []
+    while not cola.empty():
+        mensajes.append(cola.get_nowait())
+        cola.task_done()
+    return mensajes
+
+
+def test_cada_suscriptor_recibe_solo_sus_topicos():
+    bus = Bus()
+    interfaz = bus.suscribir(['estado_dron', 'estado_maquina'])
+    maquina = bus.suscribir(['evento'])
+
+    bus.put(telemetria(1))
+    bus.put(evento(1))
+    bus.put({'type': 'estado_maquina', 'data': 'en_ruta'})
+    bus.put({'type': 'desconocido'})
+
+    assert [m['type'] for m in vaciar(interfaz)] == ['estado_dron', 'estado_maquina']
+    assert vaciar(maquina) == [evento(1)]
+
+
+def test_al_llenarse_se_descarta_la_telemetria_mas_antigua():
+    bus = Bus()
+    lenta = bus.suscribir(['estado_dron', 'evento'], capacidad=4)
+
+    bus.put(telemetria(0))
+    bus.put(evento(0))
+    for i in range(1, 6):
+        bus.put(telemetria(i))
+
+    mensajes = vaciar(lenta)
+    assert mensajes == [evento(0), telemetria(3), telemetria(4), telemetria(5)]
+    assert lenta.descartados == 3 and lenta.excedidos == 0
+    # Los descartes no dejan tareas sin terminar: join() no se bloquea
+    lenta.join()
+
+
+def test_los_eventos_nunca_se_descartan():
+    bus = Bus()
+    lenta = bus.suscribir(['estado_dron', 'evento'], capacidad=2)
+
+    for i in range(5):
+        bus.put(evento(i))
+    bus.put(telemetria(0))   # Es lo más antiguo descartable: se descarta al llegar
+
+    assert vaciar(lenta) == [evento(i) for i in range(5)]
+    assert (lenta.descartados, lenta.excedidos) == (1, 3)
+
+
+def test_un_suscriptor_lento_no_afecta_a_los_demas():
+    bus = Bus()
+    lenta = bus.suscribir(['estado_dron'], capacidad=1)
+    rapida = bus.suscribir(['estado_dron'], capacidad=100)
+
+    for i in range(50):
+        bus.put(telemetria(i))
+
+    assert vaciar(lenta) == [telemetria(49)]
+    assert len(vaciar(rapida)) == 50
+
+
+def test_cancelar_y_avisos():
+    bus = Bus()
+    avisos = []
+    suscripcion = bus.suscribir(['evento'], aviso=lambda: avisos.append(None))
+
+    bus.put(evento(0))
+    bus.cancelar(suscripcion)
+    bus.put(evento(1))
+
+    assert len(avisos) == 1 and vaciar(suscripcion) == [evento(0)]
+
+
+def test_limite_con_publicadores_concurrentes():
+    bus = Bus()
+    suscripcion = bus.suscribir(['estado_dron', 'evento'], capacidad=32)
+
+    def publicar(n):
+        for i in range(2000):
+            bus.put(telemetria(i) if i % 10 else evento(i))
+
+    hilos = [threading.Thread(target=publicar, args=(n,)) for n in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    mensajes = vaciar(suscripcion)
+    # Ningún evento se pierde; con más eventos que capacidad, toda la telemetría se descarta
+    assert sum(m['type'] == 'evento' for m in mensajes) == 4 * 200
+    assert len(mensajes) == 4 * 200 and suscripcion.descartados == 4 * 1800
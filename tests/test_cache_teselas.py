@@ -0,0 +1,119 @@
+import itertools
+import sqlite3
+import urllib.error
+
+import pytest
+
+import cache_teselas
+from cache_teselas import CacheTeselas, Precarga, tesela, teselas_zona
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    # Un instante distinto y creciente en cada guardado o volcado
+    instantes = itertools.count(1)
+    monkeypatch.setattr(cache_teselas.time, 'time', lambda: float(next(instantes)))
+    cache = CacheTeselas(str(tmp_path / 'teselas.db'), capacidad=3)
+    yield cache
+    cache.cerrar()
+
+
+def guardadas(cache):
+    return {(z, x, y) for z, x, y in cache.conexion.execute("SELECT zoom, x, y FROM tiles")}
+
+
+def test_desalojo_conserva_las_usadas_recientemente(cache):
+    for x in range(5):
+        cache.guardar(15, x, 0, b'png')
+    cache.tocar(15, 0, 0)
+    cache.tocar(15, 1, 0)
+    cache.volcar_usos()
+
+    cache.desalojar()
+
+    assert guardadas(cache) == {(15, 0, 0), (15, 1, 0), (15, 4, 0)}
+    assert len(cache) == 3
+
+
+def test_los_usos_se_vuelcan_en_lote(cache, monkeypatch):
+    monkeypatch.setattr(cache_teselas, 'LOTE_USOS', 3)
+    cache.guardar(15, 0, 0, b'png')
+    cache.guardar(15, 1, 0, b'png')
+
+    cache.tocar(15, 0, 0)
+    cache.tocar(15, 0, 0)
+    ultimo_uso = dict(cache.conexion.execute("SELECT x, ultimo_uso FROM tiles"))
+    assert ultimo_uso == {0: 1.0, 1: 2.0} and cache.usos == {(15, 0, 0)}
+
+    cache.tocar(15, 1, 0)
+    cache.tocar(15, 2, 0)   # Tercer acceso distinto: se vuelca
+    assert cache.usos == set()
+    assert {u for (u,) in cache.conexion.execute("SELECT ultimo_uso FROM tiles")} == {3.0}
+
+
+def test_traer_descarga_una_vez_y_desaloja_por_lotes(cache, monkeypatch):
+    monkeypatch.setattr(cache_teselas, 'LOTE_USOS', 4)
+    descargas = []
+    monkeypatch.setattr(cache, 'descargar', lambda *t: descargas.append(t) or b'png')
+
+    for x in range(4):
+        assert cache.traer(15, x, 0)
+    assert cache.traer(15, 3, 0)
+
+    assert len(descargas) == 4 and len(cache) == 3
+    assert guardadas(cache) == {(15, 1, 0), (15, 2, 0), (15, 3, 0)}
+
+
+def test_traer_sin_red(cache, monkeypatch):
+    def sin_red(*_):
+        raise urllib.error.URLError("sin red")
+
+    monkeypatch.setattr(cache, 'descargar', sin_red)
+    assert not cache.traer(15, 0, 0) and len(cache) == 0
+
+
+def test_precarga_se_detiene_sin_red(cache, monkeypatch):
+    cache.capacidad = 100
+    cache.guardar(15, 0, 0, b'png')
+    pedidas = []
+
+    def descargar(zoom, x, y):
+        pedidas.append(x)
+        if x == 3:
+            raise OSError("sin red")
+        return b'png'
+
+    monkeypatch.setattr(cache, 'descargar', descargar)
+    terminadas = []
+    precarga = Precarga(cache, lambda: [(15, x, 0) for x in range(6)], al_terminar=terminadas.append).iniciar()
+    precarga.hilo.join(5.0)
+
+    assert pedidas == [1, 2, 3] and precarga.descargadas == 2 and precarga.sin_red
+    assert terminadas == [precarga] and len(cache) == 3
+
+
+def test_base_de_tkintermapview_sin_columna_de_uso(tmp_path):
+    ruta = str(tmp_path / 'antigua.db')
+    with sqlite3.connect(ruta) as conexion:
+        conexion.execute("CREATE TABLE tiles (zoom INTEGER NOT NULL, x INTEGER NOT NULL, y INTEGER NOT NULL, "
+                         "server VARCHAR(300) NOT NULL, tile_image BLOB NOT NULL, "
+                         "CONSTRAINT pk_tiles PRIMARY KEY (zoom, x, y, server))")
+        conexion.execute("INSERT INTO tiles VALUES (15, 0, 0, ?, x'00')", (cache_teselas.SERVIDOR_TESELAS,))
+    conexion.close()
+
+    cache = CacheTeselas(ruta)
+    try:
+        assert cache.contiene(15, 0, 0) and not cache.contiene(15, 1, 0)
+        cache.tocar(15, 0, 0)
+        cache.volcar_usos()
+    finally:
+        cache.cerrar()
+
+
+def test_teselas_de_una_zona():
+    x, y = tesela(4.65, -74.08, 15)
+    zona = list(teselas_zona(4.65, -74.08, 0.004, [15, 16]))
+
+    assert (15, x, y) in zona and {z for z, _, _ in zona} == {15, 16}
+    assert len(zona) == len(set(zona))
+    assert tesela(90.0, 180.0, 3) == (7, 0)
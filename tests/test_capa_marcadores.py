@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from cache_teselas import posicion_tesela
+from capa_marcadores import CapaMarcadores
+
+
+class Marcador:
+    def __init__(self, lat, lon, text):
+        self.position = (lat, lon)
+        self.texto = text
+        self.borrado = False
+
+    def set_position(self, lat, lon):
+        self.position = (lat, lon)
+
+    def set_text(self, texto):
+        self.texto = texto
+
+    def delete(self):
+        self.borrado = True
+
+
+class Mapa:
+    """Sustituto mínimo de TkinterMapView: zoom, esquinas de la vista y set_marker()."""
+
+    def __init__(self, zoom, centro, ancho=4, alto=3):
+        self.creados = []
+        self.ver(zoom, centro, ancho, alto)
+
+    def ver(self, zoom, centro, ancho=4, alto=3):
+        x, y = posicion_tesela(*centro, zoom)
+        self.zoom = zoom
+        self.upper_left_tile_pos = (x - ancho / 2, y - alto / 2)
+        self.lower_right_tile_pos = (x + ancho / 2, y + alto / 2)
+
+    def set_marker(self, lat, lon, text=None):
+        marcador = Marcador(lat, lon, text)
+        self.creados.append(marcador)
+        return marcador
+
+
+def visibles_por_fuerza_bruta(capa, zoom, superior, inferior):
+    """Misma vista que calcular_visibles, recorriendo todos los puntos sin índice."""
+    indices, capa.indices = capa.indices, {}
+    try:
+        return CapaMarcadores.calcular_visibles(capa, zoom, superior, inferior)
+    finally:
+        capa.indices = indices
+
+
+def test_indice_coincide_con_recorrido_completo():
+    azar = random.Random(3)
+    mapa = Mapa(16, (4.65, -74.08))
+    capa = CapaMarcadores(mapa)
+    for i in range(2000):
+        capa.colocar(('emergencia', i), 4.45 + azar.random() * 0.4, -74.25 + azar.random() * 0.3, f"E{i}")
+    for zoom in (11, 13, 15, 17):
+        mapa.ver(zoom, (4.65, -74.08))
+        vista = capa.vista_actual()
+        capa.actualizar()
+        # El índice de este zoom se mantiene al mover y quitar puntos
+        for i in range(0, 2000, 7):
+            capa.mover(('emergencia', i), 4.45 + azar.random() * 0.4, -74.25 + azar.random() * 0.3)
+        for i in range(0, 2000, 97):
+            capa.quitar(('emergencia', i))
+        limites = vista[1:]
+        con_indice = capa.calcular_visibles(zoom, *limites)
+        esperados = visibles_por_fuerza_bruta(capa, zoom, *limites)
+        assert con_indice.keys() == esperados.keys()
+        for clave, (lat, lon, texto) in esperados.items():
+            # El centro de un grupo puede diferir en el último decimal por el orden de la suma
+            assert con_indice[clave] == (pytest.approx(lat), pytest.approx(lon), texto)
+
+
+def test_mover_dron_solo_toca_su_marcador():
+    mapa = Mapa(12, (4.65, -74.08))
+    capa = CapaMarcadores(mapa)
+    for i in range(50):
+        capa.colocar(('emergencia', i), 4.64 + i * 1e-4, -74.08, f"E{i}")
+    capa.colocar("Dron", 4.60, -74.10, "Dron", agrupable=False)
+    capa.actualizar()
+    assert "Dron" in capa.marcadores
+    llamados = []
+    capa.calcular_visibles = lambda *vista: llamados.append(vista)
+    capa.mover("Dron", 4.61, -74.09)
+    capa.actualizar()
+    assert llamados == []
+    assert capa.marcadores["Dron"].position == (4.61, -74.09)
+    # Fuera de la vista el marcador se retira
+    capa.mover("Dron", 10.0, -60.0)
+    capa.actualizar()
+    assert "Dron" not in capa.marcadores
+    assert sum(marcador.borrado for marcador in mapa.creados) == 1
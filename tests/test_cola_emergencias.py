@@ -0,0 +1,68 @@
+import itertools
+
+from cola_emergencias import ColaEmergencias
+from interfaz_eventos import InterfazEventos
+
+
+def crear_cola():
+    instantes = itertools.count()
+    return ColaEmergencias(reloj=lambda: float(next(instantes)))
+
+
+def interfaz_eventos(cola, reubicadas):
+    # Solo la lógica de reubicación: sin ventana de Tk
+    interfaz = object.__new__(InterfazEventos)
+    interfaz.emergencias = cola
+    interfaz.al_reubicar = lambda emergencia_id, ubicacion: reubicadas.append((emergencia_id, ubicacion))
+    return interfaz
+
+
+def test_cambio_de_localizacion_de_un_caso_en_cola():
+    cola = crear_cola()
+    emergencia_id = cola.agregar({'situacion': 'Accidente', 'ubicacion': '4.60, -74.07'})
+    reubicadas = []
+
+    assert interfaz_eventos(cola, reubicadas).reubicar_en_cola(emergencia_id, '4.61, -74.08')
+
+    assert reubicadas == [(emergencia_id, '4.61, -74.08')]
+    # Un nuevo reporte en la ubicación corregida se fusiona con el caso; en la vieja, no
+    assert cola.agregar({'situacion': 'Accidente', 'ubicacion': '4.61, -74.08'}) == emergencia_id
+    assert cola.agregar({'situacion': 'Accidente', 'ubicacion': '4.60, -74.07'}) != emergencia_id
+    emergencia = cola.extraer()
+    assert (emergencia['id'], emergencia['ubicacion'], emergencia['llegada']) == (emergencia_id, '4.61, -74.08', 0.0)
+
+
+def test_cambio_de_localizacion_de_un_caso_despachado_va_al_dron():
+    cola = crear_cola()
+    emergencia_id = cola.agregar({'situacion': 'Incendio', 'ubicacion': '4.60, -74.07'})
+    cola.extraer()
+    reubicadas = []
+    interfaz = interfaz_eventos(cola, reubicadas)
+
+    assert not interfaz.reubicar_en_cola(emergencia_id, '4.61, -74.08')
+    assert not interfaz.reubicar_en_cola(None, '4.61, -74.08')
+    assert reubicadas == [] and not cola
+
+
+def test_cambio_de_localizacion_conserva_el_orden_por_triaje():
+    cola = crear_cola()
+    leve = cola.agregar({'situacion': 'Otro', 'ubicacion': '4.60, -74.07'})
+    grave = cola.agregar({'situacion': 'Paro Cardíaco', 'ubicacion': '4.62, -74.06'})
+
+    assert cola.actualizar(leve, ubicacion='4.63, -74.05')
+
+    assert [cola.extraer()['id'], cola.extraer()['id']] == [grave, leve]
+
+
+def test_casos_sin_ubicacion_no_se_fusionan():
+    cola = crear_cola()
+    primero = cola.agregar({'situacion': 'Otro', 'ubicacion': None})
+    segundo = cola.agregar({'situacion': 'Paro Cardíaco', 'ubicacion': ''})
+    tercero = cola.agregar({'situacion': 'Accidente'})
+
+    assert len({primero, segundo, tercero}) == 3 and len(cola) == 3
+    assert cola.por_ubicacion == {}
+    # Al ubicar un caso pasa a fusionarse con los reportes de ese lugar
+    assert cola.actualizar(primero, ubicacion='4.60, -74.07')
+    assert cola.agregar({'situacion': 'Otro', 'ubicacion': '4.60, -74.07'}) == primero
+    assert [cola.extraer()['id'] for _ in range(3)] == [segundo, tercero, primero]
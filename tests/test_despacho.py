@@ -0,0 +1,84 @@
+import math
+import random
+
+import pytest
+
+from despacho import ESPERA_POR_ESTADO, Despachador
+
+ORIGEN = (4.65, -74.08)
+
+
+def fuerza_bruta(despachador, lat, lon):
+    """El mejor dron recorriendo todos, sin índice espacial."""
+    x, y = despachador.a_plano(lat, lon)
+    candidatos = [(eta, dron_id) for dron_id, dron in despachador.drones.items()
+                  if (eta := despachador.estimar(dron, x, y)) is not None]
+    return min(candidatos, default=(None, None))
+
+
+def test_sin_drones_no_hay_seleccion():
+    assert Despachador(ORIGEN).seleccionar(4.65, -74.08) == (None, None)
+
+
+def test_seleccion_coincide_con_recorrido_completo():
+    azar = random.Random(7)
+    despachador = Despachador(ORIGEN)
+    for i in range(300):
+        base = (4.55 + azar.random() * 0.2, -74.15 + azar.random() * 0.15)
+        posicion = (base[0] + azar.uniform(-0.02, 0.02), base[1] + azar.uniform(-0.02, 0.02))
+        despachador.registrar_dron(f"DEA-{i:03d}", base, bateria=azar.choice([100, 60, 25, 3]),
+                                   estado=azar.choice(['en_tierra', 'aterrizando', 'en_ruta']), posicion=posicion)
+    for _ in range(100):
+        lat, lon = 4.55 + azar.random() * 0.2, -74.15 + azar.random() * 0.15
+        dron_id, eta = despachador.seleccionar(lat, lon)
+        eta_esperada, _ = fuerza_bruta(despachador, lat, lon)
+        assert eta == pytest.approx(eta_esperada)
+        assert despachador.estimar(despachador.drones[dron_id], *despachador.a_plano(lat, lon)) == eta
+
+
+def test_un_dron_aterrizando_cede_ante_uno_en_tierra_poco_mas_lejos():
+    despachador = Despachador(ORIGEN)
+    despachador.registrar_dron("cerca", ORIGEN, estado='aterrizando', posicion=(4.651, -74.08))
+    despachador.registrar_dron("lejos", ORIGEN, posicion=(4.6512, -74.08))
+    distancia = math.hypot(*despachador.a_plano(4.6512, -74.08)) - math.hypot(*despachador.a_plano(4.651, -74.08))
+    # La espera extra del aterrizaje supera lo que tarda en cubrir la diferencia
+    assert ESPERA_POR_ESTADO['aterrizando'] - ESPERA_POR_ESTADO['en_tierra'] > distancia / despachador.velocidad
+
+    assert despachador.seleccionar(*ORIGEN)[0] == "lejos"
+
+
+def test_bateria_insuficiente_descarta_el_dron():
+    despachador = Despachador(ORIGEN)
+    despachador.registrar_dron("sin_carga", ORIGEN, bateria=2)
+    despachador.registrar_dron("cargado", (4.70, -74.05))
+
+    assert despachador.seleccionar(4.652, -74.081)[0] == "cargado"
+
+
+def test_reserva_hasta_que_la_maquina_informa_otro_estado():
+    despachador = Despachador(ORIGEN)
+    despachador.registrar_dron("A", ORIGEN)
+    despachador.registrar_dron("B", (4.66, -74.08))
+
+    elegido, _ = despachador.seleccionar(*ORIGEN)
+    despachador.reservar(elegido)
+    assert (elegido, despachador.seleccionar(*ORIGEN)[0]) == ("A", "B")
+    despachador.reservar("B")
+    assert despachador.seleccionar(*ORIGEN) == (None, None)
+
+    despachador.procesar_actualizacion({'type': 'estado_maquina', 'data': 'en_tierra', 'dron_id': "A"})
+    assert despachador.seleccionar(*ORIGEN)[0] == "A"
+
+
+def test_la_telemetria_mueve_el_dron_en_el_indice():
+    despachador = Despachador(ORIGEN)
+    despachador.registrar_dron("Dron", ORIGEN)
+    celda_inicial = despachador.drones["Dron"].celda
+
+    despachador.procesar_actualizacion({'type': 'estado_dron', 'data': {'posicion_actual': (4.66, -74.07), 'bateria': 80}},
+                                       dron_id="Dron")
+
+    dron = despachador.drones["Dron"]
+    assert dron.celda != celda_inicial and dron.bateria == 80
+    assert despachador.indice.celdas == {dron.celda: {"Dron"}}
+    assert despachador.seleccionar(4.661, -74.071)[0] == "Dron"
@@ -0,0 +1,83 @@
+import math
+
+import pytest
+
+from energia import (ALTITUD_MISION, TIEMPO_ASISTENCIA, TIEMPO_ATERRIZAJE, TIEMPO_DESPEGUE, VELOCIDAD_CRUCERO,
+                     ConsumoPlano, ModeloEnergia)
+
+DT = 0.05
+
+
+def integrar_mision(modelo, origen, destino, base):
+    """Suma porcentaje_muestra() paso a paso sobre la misión, como lo hace el dron en vuelo."""
+    total = 0.0
+    # Despegue: ascenso a la altitud de misión en estacionario
+    pasos = round(TIEMPO_DESPEGUE / DT)
+    for _ in range(pasos):
+        total += modelo.porcentaje_muestra(0.0, 0.0, ALTITUD_MISION / pasos, DT)
+    for desde, hasta in ((origen, destino), (destino, base)):
+        dx, dy = hasta[0] - desde[0], hasta[1] - desde[1]
+        distancia = math.hypot(dx, dy)
+        suelo = modelo.velocidad_suelo(dx / distancia, dy / distancia)
+        pasos = math.ceil(distancia / suelo / DT)
+        paso = distancia / suelo / pasos
+        for _ in range(pasos):
+            total += modelo.porcentaje_muestra(dx / pasos, dy / pasos, 0.0, paso)
+    for _ in range(round((TIEMPO_ASISTENCIA + TIEMPO_ATERRIZAJE) / DT)):
+        total += modelo.porcentaje_muestra(0.0, 0.0, 0.0, DT)
+    return total
+
+
+@pytest.mark.parametrize('viento', [(0.0, 0.0), (4.0, -3.0), (-9.0, 0.0)])
+def test_formula_cerrada_coincide_con_la_integracion(viento):
+    modelo = ModeloEnergia(viento=viento)
+    origen, destino, base = (0.0, 0.0), (2500.0, 1800.0), (300.0, -400.0)
+
+    assert modelo.porcentaje_mision(origen, destino, base) == pytest.approx(
+        integrar_mision(modelo, origen, destino, base), rel=1e-9)
+
+
+def test_alcance_es_el_limite_de_factible():
+    modelo = ModeloEnergia()
+    for bateria in (100.0, 60.0, 35.0):
+        radio = modelo.alcance(bateria)
+        assert modelo.factible(bateria, (0.0, 0.0), (radio * 0.999, 0.0), (0.0, 0.0))
+        assert not modelo.factible(bateria, (0.0, 0.0), (radio * 1.001, 0.0), (0.0, 0.0))
+    assert modelo.alcance(modelo.reserva) == 0.0
+
+
+def test_viento_en_contra_mas_fuerte_que_el_crucero():
+    modelo = ModeloEnergia(viento=(-1.2 * VELOCIDAD_CRUCERO, 0.0))
+
+    assert modelo.porcentaje_tramo(1000.0, 0.0) == math.inf
+    assert not modelo.factible(100.0, (0.0, 0.0), (1000.0, 0.0), (0.0, 0.0))
+    # A favor del viento el tramo cuesta menos que sin viento
+    assert modelo.porcentaje_tramo(-1000.0, 0.0) < ModeloEnergia().porcentaje_tramo(-1000.0, 0.0)
+
+
+def test_potencia_continua_en_el_crucero():
+    modelo = ModeloEnergia()
+    crucero = modelo.potencia(VELOCIDAD_CRUCERO)
+
+    assert modelo.potencia(0.0) == modelo.potencia_suspension
+    assert modelo.potencia(VELOCIDAD_CRUCERO * (1 + 1e-9)) == pytest.approx(crucero)
+    assert modelo.potencia(2 * VELOCIDAD_CRUCERO) == pytest.approx(8 * crucero)
+
+
+def test_mas_carga_consume_mas():
+    origen, destino = (0.0, 0.0), (3000.0, 0.0)
+    liviano = ModeloEnergia(carga=0.0)
+    cargado = ModeloEnergia()
+
+    assert liviano.porcentaje_mision(origen, destino, origen) < cargado.porcentaje_mision(origen, destino, origen)
+    assert liviano.alcance(100.0) > cargado.alcance(100.0)
+
+
+def test_consumo_plano():
+    plano = ConsumoPlano(0.05)
+    tiempo = 2 * 1000.0 / VELOCIDAD_CRUCERO
+
+    assert plano.porcentaje_mision((0.0, 0.0), (1000.0, 0.0), (0.0, 0.0)) == pytest.approx(0.05 * tiempo)
+    radio = plano.alcance(100.0)
+    assert plano.factible(100.0, (0.0, 0.0), (radio * 0.999, 0.0), (0.0, 0.0))
+    assert not plano.factible(100.0, (0.0, 0.0), (radio * 1.001, 0.0), (0.0, 0.0))
@@ -0,0 +1,102 @@
+import pytest
+
+from clases import CodigoEvento, Evento, Origen
+from indice_registro import IndiceRegistro, importar_log_texto, interpretar_mensaje
+
+
+def evento(tiempo, codigo=CodigoEvento.MENSAJE, texto=None, mision=0, origen=Origen.SISTEMA):
+    return Evento(tiempo, origen, codigo, (), texto, mision)
+
+
+def transicion(tiempo, estado, mision):
+    return evento(tiempo, CodigoEvento.TRANSICION, estado, mision)
+
+
+def test_consultar_por_rango_codigo_mision_y_origen():
+    indice = IndiceRegistro()
+    for e in [evento(1.0), transicion(2.0, 'despegando', 1), evento(3.0, mision=1, origen=Origen.DRON),
+              transicion(4.0, 'navegando', 1), transicion(5.0, 'despegando', 2)]:
+        indice.agregar(e)
+
+    assert [e.tiempo for e in indice.consultar(desde=2.0, hasta=4.0)] == [2.0, 3.0, 4.0]
+    assert [e.texto for e in indice.consultar(codigo=CodigoEvento.TRANSICION, mision=1)] == ['despegando', 'navegando']
+    assert [e.tiempo for e in indice.consultar(mision=1, origen=Origen.DRON)] == [3.0]
+    assert indice.consultar(mision=7) == []
+    assert indice.misiones() == [1, 2]
+
+
+def test_eventos_fuera_de_orden_quedan_ordenados():
+    indice = IndiceRegistro()
+    for tiempo in (1.0, 3.0, 2.0):
+        indice.agregar(evento(tiempo, mision=1))
+
+    assert [e.tiempo for e in indice.consultar(mision=1)] == [1.0, 2.0, 3.0]
+    assert indice.intervalo_mision(1) == (1.0, 3.0)
+    assert indice.intervalo_mision(2) is None
+
+
+def test_duraciones_por_estado():
+    indice = IndiceRegistro()
+    for e in [transicion(10.0, 'despegando', 1), transicion(12.0, 'navegando', 1),
+              transicion(40.0, 'asistiendo', 1), evento(45.0, mision=1)]:
+        indice.agregar(e)
+
+    assert indice.duraciones_por_estado(1) == {'despegando': 2.0, 'navegando': 28.0, 'asistiendo': 5.0}
+    assert indice.duraciones_por_estado(1, hasta=50.0)['asistiendo'] == 10.0
+    assert indice.duracion_en_estado('navegando', 1) == 28.0
+    assert indice.duraciones_por_estado(3) == {}
+
+
+def test_interpretar_mensaje():
+    assert interpretar_mensaje("Batería actual: 87.5%") == (CodigoEvento.BATERIA, (87.5,), None)
+    assert interpretar_mensaje("Transición de estado: navegando") == (CodigoEvento.TRANSICION, (), 'navegando')
+    assert interpretar_mensaje("Otra cosa") == (CodigoEvento.MENSAJE, (), "Otra cosa")
+
+
+def escribir_log(ruta, lineas):
+    ruta.write_text(''.join(f"2024-11-27 {hora},000:INFO:{mensaje}\n" for hora, mensaje in lineas),
+                    encoding='utf-8')
+
+
+def test_importar_log_con_misiones_explicitas(tmp_path):
+    ruta = tmp_path / "registro.log"
+    escribir_log(ruta, [
+        ("10:00:00", "Misión iniciada hacia 4.6, -74.06."),
+        ("10:00:01", "Transición de estado: despegando"),
+        ("10:00:04", "Transición de estado: navegando"),
+        ("10:01:04", "Transición de estado: en_tierra"),
+        ("10:01:05", "Batería actual: 80%"),
+    ])
+
+    indice = importar_log_texto(ruta)
+
+    assert indice.misiones() == [1]
+    assert indice.consultar(codigo=CodigoEvento.INICIO_MISION)[0].texto == "4.6, -74.06"
+    assert indice.duraciones_por_estado(1) == pytest.approx({'despegando': 3.0, 'navegando': 60.0, 'en_tierra': 0.0})
+    # La batería posterior a la vuelta a tierra queda fuera de la misión
+    assert indice.consultar(codigo=CodigoEvento.BATERIA)[0].mision == 0
+
+
+def test_importar_log_antiguo_cierra_misiones_sin_vuelta_al_reposo(tmp_path):
+    ruta = tmp_path / "registro.log"
+    escribir_log(ruta, [
+        ("10:00:00", "Recepción de comando de arranque."),
+        ("10:00:00", "Finished processing state en_espera exit callbacks."),
+        ("10:00:01", "Finished processing state despegando enter callbacks."),
+        ("10:00:30", "Finished processing state asistiendo enter callbacks."),
+        # Otro arranque rechazado no abre misión; la nueva salida del reposo sí
+        ("10:01:00", "Recepción de comando de arranque."),
+        ("10:03:00", "Finished processing state en_espera exit callbacks."),
+        ("10:03:01", "Finished processing state despegando enter callbacks."),
+        ("10:03:20", "Finished processing state asistiendo enter callbacks."),
+        # Tras una pausa larga sin eventos la misión ya estaba cerrada
+        ("12:00:00", "Batería actual: 90%"),
+        ("12:00:05", "Recepción de comando de arranque."),
+    ])
+
+    indice = importar_log_texto(ruta)
+
+    assert indice.misiones() == [1, 2, 3]
+    assert indice.intervalo_mision(1)[1] - indice.intervalo_mision(1)[0] == pytest.approx(60.0)
+    assert indice.duraciones_por_estado(2) == pytest.approx({'despegando': 19.0, 'asistiendo': 0.0})
+    assert indice.consultar(codigo=CodigoEvento.BATERIA)[0].mision == 0
@@ -0,0 +1,101 @@
+import queue
+
+from clases import DURACION_ASISTENCIA, Drone, Maniobra, RegistroEventos
+from programador import Programador
+from reloj import RelojVirtual
+
+
+def crear_dron():
+    reloj = RelojVirtual()
+    dron = Drone(RegistroEventos(reloj=reloj), queue.Queue(), queue.Queue(), queue.Queue(), queue.Queue(),
+                 reloj=reloj, periodo_sondeo=0)
+    return dron, dron.programador_propio
+
+
+def eventos(dron):
+    """Nombres de los eventos enviados a la máquina de estados hasta ahora."""
+    nombres = []
+    while not dron.queue_updates.empty():
+        mensaje = dron.queue_updates.get_nowait()
+        if mensaje.get('type') == 'evento':
+            nombres.append(mensaje['data'])
+    return nombres
+
+
+def test_cancelar_descarta_el_paso_pendiente():
+    programador = Programador(reloj=RelojVirtual())
+    pasos = []
+    maniobra = Maniobra('prueba', programador)
+    maniobra.programar(1.0, pasos.append, 1)
+    programador.simular(hasta=1.0)
+
+    maniobra.programar(1.0, pasos.append, 2)
+    maniobra.cancelar()
+    maniobra.programar(1.0, pasos.append, 3)   # Tras cancelar ya no se programa nada
+    programador.simular()
+
+    assert pasos == [1] and programador.proximo_vencimiento() is None
+
+
+def test_aterrizar_interrumpe_el_despegue():
+    dron, programador = crear_dron()
+    try:
+        dron.despegar()
+        programador.simular(hasta=1.2)
+        assert 0 < dron.altitud < 100
+
+        dron.aterrizar()
+        programador.simular(hasta=10.0)
+
+        assert dron.altitud == 0 and dron.maniobra is None
+        assert eventos(dron) == ['aterrizaje_completado']
+        assert any(e.mensaje() == "Maniobra de despegue interrumpida." for e in dron.registro_eventos.eventos)
+    finally:
+        dron.detener()
+
+
+def test_regresar_base_interrumpe_la_asistencia():
+    dron, programador = crear_dron()
+    try:
+        dron.iniciar_asistencia()
+        programador.simular(hasta=DURACION_ASISTENCIA / 2)
+        dron.regresar_base()
+        programador.simular(hasta=2 * DURACION_ASISTENCIA)
+
+        assert 'asistencia_completada' not in eventos(dron)
+        assert dron.queue_commands_simulacion.get_nowait()['tipo'] == 'regresar_base'
+    finally:
+        dron.detener()
+
+
+def test_regresar_base_no_interrumpe_el_despegue():
+    dron, programador = crear_dron()
+    try:
+        dron.despegar()
+        programador.simular(hasta=1.0)
+        dron.regresar_base()
+        programador.simular(hasta=10.0)
+
+        assert dron.altitud == 100 and eventos(dron) == ['despegue_completado']
+    finally:
+        dron.detener()
+
+
+def test_asistencia_sin_interrupcion_termina():
+    dron, programador = crear_dron()
+    try:
+        dron.iniciar_asistencia()
+        programador.simular(hasta=DURACION_ASISTENCIA)
+
+        assert eventos(dron) == ['asistencia_completada'] and dron.maniobra is None
+    finally:
+        dron.detener()
+
+
+def test_detener_cancela_la_maniobra_en_curso():
+    dron, programador = crear_dron()
+    dron.despegar()
+    dron.detener()
+    programador.simular(hasta=10.0)
+
+    assert dron.altitud == 0 and eventos(dron) == []
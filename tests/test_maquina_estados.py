@@ -0,0 +1,94 @@
+import queue
+
+import pytest
+
+from maquina_estados import MaquinaEstados
+from programador import Programador
+from reloj import RelojVirtual
+from transiciones import Estado, EventoMaquina
+
+# Cadena if/elif anterior a la tabla: evento -> (estados en que actúa o None si en
+# todos, estado destino, comando enviado). Fuera de esos estados el evento se ignoraba
+# en silencio; solo los eventos desconocidos se registraban como no manejados.
+CADENA_ORIGINAL = {
+    'despegue_completado': (['despegando'], 'en_ruta', None),
+    'cambio_localizacion_emergencia': (['en_ruta', 'en_emergencia'], None, 'cambio_localizacion_emergencia'),
+    'llegada_destino': (['en_ruta'], 'en_emergencia', 'iniciar_asistencia'),
+    'deteccion_signos_vitales_paciente': (['en_emergencia'], 'en_dea', None),
+    'recepcion_comando_descarga_electrica': (['en_dea'], None, None),
+    'asistencia_completada': (['en_dea'], 'regresando_base', 'regresar_base'),
+    'aviso_bateria_baja': (None, 'en_mantenimiento', None),
+    'falla_motor_detectada': (None, 'en_mantenimiento', None),
+    'motor_recuperado': (['en_mantenimiento'], 'en_tierra', None),
+    'regreso_base': (['regresando_base'], 'aterrizando', 'aterrizar'),
+    'aterrizaje_completado': (['aterrizando'], 'en_tierra', None),
+}
+
+
+class Registro:
+    def __init__(self):
+        self.mensajes = []
+
+    def agregar_evento(self, mensaje, **_):
+        self.mensajes.append(mensaje)
+
+    def registrar(self, *_, **__):
+        pass
+
+    def finalizar_mision(self):
+        pass
+
+
+def crear_maquina(estado):
+    hacia_dron = queue.Queue()
+    maquina = MaquinaEstados(Registro(), queue.Queue(), hacia_dron,
+                             programador=Programador(reloj=RelojVirtual()), periodo_sondeo=0)
+    maquina.codigo_estado = estado
+    return maquina, hacia_dron
+
+
+def comandos(cola):
+    tipos = []
+    while not cola.empty():
+        mensaje = cola.get_nowait()
+        if 'tipo' in mensaje:
+            tipos.append(mensaje['tipo'])
+    return tipos
+
+
+@pytest.mark.parametrize('estado', list(Estado), ids=lambda estado: estado.nombre)
+@pytest.mark.parametrize('evento', sorted(CADENA_ORIGINAL))
+def test_tabla_reproduce_la_cadena_original(estado, evento):
+    estados, destino, comando = CADENA_ORIGINAL[evento]
+    actua = estados is None or estado.nombre in estados
+    maquina, hacia_dron = crear_maquina(estado)
+
+    maquina.gestionar_evento(evento, {'nueva_ubicacion': '4.61, -74.08'})
+
+    assert maquina.estado_actual == (destino or estado.nombre if actua else estado.nombre)
+    assert comandos(hacia_dron) == ([comando] if actua and comando else [])
+    assert not any(m.startswith("Evento no manejado") for m in maquina.registro_eventos.mensajes)
+
+
+@pytest.mark.parametrize('estado', list(Estado), ids=lambda estado: estado.nombre)
+def test_arranque_de_vuelo(estado):
+    maquina, hacia_dron = crear_maquina(estado)
+
+    maquina.gestionar_evento(EventoMaquina.RECEPCION_COMANDO_ARRANQUE_VUELO)
+
+    if estado == Estado.EN_TIERRA:
+        assert (maquina.estado_actual, comandos(hacia_dron)) == ('despegando', ['despegar'])
+    else:
+        assert (maquina.estado_actual, comandos(hacia_dron)) == (estado.nombre, [])
+        esperado = ("No se puede iniciar vuelo. Dron en estado DEA." if estado == Estado.EN_DEA
+                    else "Comando de arranque ignorado. Dron no está en tierra.")
+        assert esperado in maquina.registro_eventos.mensajes
+
+
+def test_evento_desconocido_se_registra_como_no_manejado():
+    maquina, hacia_dron = crear_maquina(Estado.EN_RUTA)
+
+    maquina.gestionar_evento('evento_inventado')
+
+    assert maquina.registro_eventos.mensajes == ["Evento no manejado en el estado actual: evento_inventado"]
+    assert maquina.estado_actual == 'en_ruta' and comandos(hacia_dron) == []
@@ -0,0 +1,138 @@
+import heapq
+import math
+import queue
+import random
+
+import pytest
+
+from planificacion_rutas import CELDA_CACHE, ZONAS_BOGOTA, PlanificadorRutas
+from simulacion import MotorSimulacion, coord_to_simulation
+
+# Torres del centro (Colpatria, Bacatá, Atrio) y sus alrededores
+CENTRO = (4.613, -74.0697)
+
+
+def punto(lat, lon):
+    return coord_to_simulation(lat, lon)[:2]
+
+
+def largo(puntos):
+    return sum(math.dist(a, b) for a, b in zip(puntos, puntos[1:]))
+
+
+def dijkstra(planificador, origen, destino):
+    """Camino más corto por fuerza bruta sobre todos los vértices, sin grafo precalculado ni caché."""
+    ignorados = planificador.obstaculos_en(origen) + planificador.obstaculos_en(destino)
+    puntos = [origen, destino] + planificador.nodos
+    distancia = {0: 0.0}
+    abiertos = [(0.0, 0)]
+    while abiertos:
+        d, i = heapq.heappop(abiertos)
+        if i == 1:
+            return d
+        if d > distancia[i]:
+            continue
+        for j in range(len(puntos)):
+            if j != i and planificador.libre(puntos[i], puntos[j], ignorados):
+                nueva = d + math.dist(puntos[i], puntos[j])
+                if nueva < distancia.get(j, math.inf):
+                    distancia[j] = nueva
+                    heapq.heappush(abiertos, (nueva, j))
+    return None
+
+
+def comprobar_ruta(planificador, ruta, origen, destino):
+    assert ruta[0] == tuple(origen) and ruta[-1] == tuple(destino)
+    ignorados = planificador.obstaculos_en(origen) + planificador.obstaculos_en(destino)
+    assert all(planificador.libre(a, b, ignorados) for a, b in zip(ruta, ruta[1:]))
+
+
+def test_linea_recta_si_no_hay_obstaculos():
+    planificador = PlanificadorRutas()
+    origen, destino = punto(4.65, -74.05), punto(4.66, -74.04)
+
+    assert planificador.ruta(origen, destino) == [origen, destino]
+    assert planificador.contadores()['fallos'] == 0
+
+
+def test_rodea_las_torres_por_el_camino_mas_corto():
+    azar = random.Random(5)
+    planificador = PlanificadorRutas(capacidad_cache=0)
+    desvios = 0
+    for _ in range(60):
+        origen = punto(CENTRO[0] + azar.uniform(-0.004, 0.004), CENTRO[1] + azar.uniform(-0.004, 0.004))
+        destino = punto(CENTRO[0] + azar.uniform(-0.004, 0.004), CENTRO[1] + azar.uniform(-0.004, 0.004))
+        ruta = planificador.ruta(origen, destino)
+        comprobar_ruta(planificador, ruta, origen, destino)
+        assert largo(ruta) == pytest.approx(dijkstra(planificador, origen, destino))
+        desvios += len(ruta) > 2
+    assert desvios > 0
+
+
+def test_destino_en_zona_de_exclusion():
+    planificador = PlanificadorRutas()
+    assert planificador.ruta(punto(4.65, -74.10), punto(4.7016, -74.1469)) is None
+    assert planificador.replanificar(punto(4.65, -74.10), punto(4.5967, -74.0775)) is None
+
+
+def test_aterrizar_en_la_azotea_de_un_edificio():
+    planificador = PlanificadorRutas()
+    azotea = punto(4.6109, -74.0700)   # Torre Colpatria
+    origen = punto(4.6080, -74.0700)
+
+    ruta = planificador.ruta(origen, azotea)
+    assert ruta == [origen, azotea]
+
+
+def test_edificio_bajo_la_altitud_de_vuelo_no_es_obstaculo():
+    zonas = [dict(zona, altura=50) if zona['tipo'] == 'edificio' else zona for zona in ZONAS_BOGOTA]
+    planificador = PlanificadorRutas(zonas=zonas)
+
+    assert all(obstaculo.tipo == 'exclusion' for obstaculo in planificador.obstaculos)
+
+
+def test_cache_reutiliza_rutas_del_mismo_barrio():
+    planificador = PlanificadorRutas()
+    # Dos orígenes en la misma celda de la caché, al sur de las torres
+    x, y = punto(4.6080, -74.0700)
+    origen = ((math.floor(x / CELDA_CACHE) + 0.25) * CELDA_CACHE, (math.floor(y / CELDA_CACHE) + 0.25) * CELDA_CACHE)
+    cercano = (origen[0] + CELDA_CACHE / 2, origen[1] + CELDA_CACHE / 2)
+    destino = punto(4.6175, -74.0690)
+
+    primera = planificador.ruta(origen, destino)
+    segunda = planificador.ruta(cercano, destino)
+
+    assert len(primera) > 2
+    assert planificador.contadores() == {'aciertos': 1, 'fallos': 1, 'replanificaciones': 0, 'rutas': 1}
+    assert segunda[1:-1] == primera[1:-1]
+    comprobar_ruta(planificador, segunda, cercano, destino)
+
+
+def test_cache_lru_descarta_la_menos_usada():
+    planificador = PlanificadorRutas(capacidad_cache=2)
+    destino = punto(4.6175, -74.0690)
+    origenes = [punto(4.6080, -74.0700 + i * 0.001) for i in range(3)]
+
+    planificador.ruta(origenes[0], destino)
+    planificador.ruta(origenes[1], destino)
+    planificador.ruta(origenes[0], destino)     # Acierto: pasa a ser la más reciente
+    planificador.ruta(origenes[2], destino)     # Desaloja la de origenes[1]
+
+    claves = list(planificador.cache)
+    assert claves == [(planificador._celda(o), planificador._celda(destino)) for o in (origenes[0], origenes[2])]
+    assert planificador.contadores()['aciertos'] == 1
+
+
+def test_cambio_de_destino_en_vuelo_replanifica():
+    planificador = PlanificadorRutas()
+    motor = MotorSimulacion(queue.Queue(), base=coord_to_simulation(4.6080, -74.0700), planificador=planificador)
+    motor.procesar_comando({'tipo': 'recibir_comando_arranque', 'ubicacion': '4.6175, -74.0690'})
+    for _ in range(120):
+        motor.paso()
+
+    motor.procesar_comando({'tipo': 'cambio_localizacion_emergencia', 'nueva_ubicacion': '4.6180, -74.0715'})
+
+    assert planificador.contadores()['replanificaciones'] == 1
+    assert motor.destino[:2] == punto(4.6180, -74.0715)
+    ruta = [motor.posicion[:2], motor.objetivo[:2], *(p[:2] for p in motor.ruta)]
+    comprobar_ruta(planificador, ruta, motor.posicion[:2], motor.destino[:2])
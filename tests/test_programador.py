@@ -0,0 +1,107 @@
+import queue
+import threading
+import time
+
+from maquina_estados import MaquinaEstados
+from programador import ColaNotificada, Despertador, Programador, PuenteCola, Serie, conectar_colas
+from reloj import RelojVirtual
+
+
+class RegistroMinimo:
+    def agregar_evento(self, *_, **__):
+        pass
+
+    def registrar(self, *_, **__):
+        pass
+
+    def finalizar_mision(self):
+        pass
+
+
+def test_despertador_agrupa_los_avisos_pendientes():
+    programador = Programador(reloj=RelojVirtual())
+    ejecuciones = []
+    despertar = Despertador(programador, ejecuciones.append, 'x')
+
+    for _ in range(5):
+        despertar()
+    programador.ejecutar_pendientes()
+
+    assert ejecuciones == ['x']
+
+
+def test_aviso_durante_la_ejecucion_programa_otra():
+    programador = Programador(reloj=RelojVirtual())
+    ejecuciones = []
+
+    def atender():
+        ejecuciones.append(None)
+        if len(ejecuciones) == 1:
+            despertar()   # Llega un mensaje mientras se atiende el anterior
+
+    despertar = Despertador(programador, atender)
+    despertar()
+    programador.ejecutar_pendientes()
+
+    assert len(ejecuciones) == 2
+
+
+def test_cola_notificada_y_conectar_colas():
+    avisos = []
+    notificada = ColaNotificada()
+
+    assert not conectar_colas(avisos.append, notificada, queue.Queue())
+    assert conectar_colas(lambda: avisos.append('aviso'), notificada, None)
+    notificada.put(1)
+    notificada.put(2)
+    assert avisos == ['aviso', 'aviso'] and notificada.qsize() == 2
+
+
+def test_serie_no_se_solapa_y_conserva_el_orden():
+    programador = Programador(trabajadores=4).iniciar()
+    serie = Serie(programador)
+    orden, en_curso, solapes = [], [], []
+    terminado = threading.Event()
+
+    def tarea(i):
+        en_curso.append(i)
+        if len(en_curso) > 1:
+            solapes.append(i)
+        time.sleep(0.001)
+        orden.append(i)
+        en_curso.remove(i)
+        if i == 49:
+            terminado.set()
+
+    try:
+        for i in range(50):
+            serie.programar(0, tarea, i)
+        assert terminado.wait(5.0)
+    finally:
+        programador.detener()
+    assert solapes == [] and orden == list(range(50))
+
+
+def test_puente_cola_traslada_y_se_detiene():
+    origen, destino = queue.Queue(), ColaNotificada()
+    recibido = threading.Event()
+    destino.aviso = recibido.set
+    puente = PuenteCola(origen, destino)
+
+    origen.put({'type': 'evento'})
+    assert recibido.wait(2.0)
+    puente.detener()
+
+    assert destino.get_nowait() == {'type': 'evento'} and not puente.hilo.is_alive()
+
+
+def test_maquina_atiende_su_cola_sin_sondeo():
+    programador = Programador(reloj=RelojVirtual())
+    desde_dron = ColaNotificada()
+    maquina = MaquinaEstados(RegistroMinimo(), desde_dron, queue.Queue(), programador=programador, periodo_sondeo=0)
+
+    assert maquina.tarea is None and programador.proximo_vencimiento() is None
+    desde_dron.put({'type': 'evento', 'data': 'recepcion_comando_arranque_vuelo'})
+    programador.ejecutar_pendientes()
+
+    assert maquina.estado_actual == 'despegando'
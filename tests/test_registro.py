@@ -0,0 +1,58 @@
+import pytest
+
+from clases import CodigoEvento, Evento, Origen, codificar_evento, leer_log_binario
+
+
+def escribir_log(ruta, eventos, recorte=0):
+    datos = b''.join(codificar_evento(evento) for evento in eventos)
+    ruta.write_bytes(datos[:len(datos) - recorte])
+
+
+def eventos_prueba():
+    return [
+        Evento(1.0, Origen.DRON, CodigoEvento.POSICION, (4.6, -74.06), mision=1),
+        Evento(2.0, Origen.SISTEMA, CodigoEvento.MENSAJE, texto="Misión completada", mision=1),
+        Evento(3.0, Origen.DRON, CodigoEvento.BATERIA, (87.5,), mision=2),
+    ]
+
+
+def test_leer_log_binario_completo(tmp_path):
+    ruta = tmp_path / "registro.bin"
+    escribir_log(ruta, eventos_prueba())
+
+    leidos = list(leer_log_binario(ruta))
+
+    assert [(e.codigo, e.valores, e.texto, e.mision) for e in leidos] == [
+        (e.codigo, e.valores, e.texto, e.mision) for e in eventos_prueba()
+    ]
+    assert [e.tiempo for e in leidos] == pytest.approx([1.0, 2.0, 3.0])
+
+
+@pytest.mark.parametrize('recorte', [1, 8, 20])
+def test_leer_log_binario_truncado_ignora_el_ultimo_registro(tmp_path, recorte):
+    ruta = tmp_path / "registro.bin"
+    escribir_log(ruta, eventos_prueba(), recorte=recorte)
+
+    leidos = list(leer_log_binario(ruta))
+
+    assert [e.codigo for e in leidos] == [CodigoEvento.POSICION, CodigoEvento.MENSAJE]
+
+
+def test_configurar_y_detener_log(tmp_path):
+    import logging
+
+    import clases
+
+    archivo, archivo_binario = tmp_path / "registro.log", tmp_path / "registro.bin"
+    escritor = clases.configurar_log(archivo, archivo_binario)
+    try:
+        assert clases.configurar_log(archivo, archivo_binario) is escritor
+        clases.RegistroEventos().registrar(CodigoEvento.BATERIA, 50.0, origen=Origen.DRON)
+    finally:
+        clases.detener_log(escritor)
+        clases.escritor_log = None
+    clases.detener_log(escritor)   # Detenerlo otra vez no hace nada
+
+    assert escritor.entrada not in logging.getLogger().handlers
+    assert "Batería actual: 50%" in archivo.read_text(encoding='utf-8')
+    assert [e.valores for e in leer_log_binario(archivo_binario)] == [(50.0,)]
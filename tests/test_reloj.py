@@ -0,0 +1,117 @@
+import queue
+import threading
+import time
+
+import pytest
+
+from clases import Drone, RegistroEventos
+from programador import Programador
+from reloj import RelojEscalado, RelojReal, RelojVirtual, reloj_para_escala
+
+
+def test_dron_con_reloj_virtual_y_programador_propio():
+    reloj = RelojVirtual()
+    comandos_simulacion = queue.Queue()
+    dron = Drone(RegistroEventos(reloj=reloj), queue.Queue(), queue.Queue(), comandos_simulacion, queue.Queue(),
+                 reloj=reloj, periodo_sondeo=0.1)
+    try:
+        dron.queue_commands.put({'tipo': 'recepcion_comando_arranque_vuelo', 'ubicacion': '4.63, -74.06'})
+        dron.programador_propio.simular(hasta=30.0)
+
+        assert reloj() == 30.0
+        assert comandos_simulacion.get_nowait()['tipo'] == 'recibir_comando_arranque'
+        assert dron.bateria < 100
+    finally:
+        dron.detener()
+
+
+def test_reloj_para_escala():
+    assert isinstance(reloj_para_escala(None), RelojVirtual)
+    assert type(reloj_para_escala(1)) is RelojReal
+    reloj = reloj_para_escala(50)
+    assert isinstance(reloj, RelojEscalado) and reloj.segundos_reales(10.0) == 0.2
+    with pytest.raises(ValueError):
+        RelojEscalado(0)
+
+
+def test_reloj_virtual_solo_avanza():
+    reloj = RelojVirtual(inicio=5.0)
+    reloj.dormir(2.5)
+    reloj.avanzar_hasta(1.0)
+    assert reloj() == 7.5 and reloj.segundos_reales(100.0) == 0.0
+
+
+def test_simular_ejecuta_en_orden_de_vencimiento():
+    reloj = RelojVirtual()
+    programador = Programador(reloj=reloj)
+    ejecutadas = []
+    programador.programar(3.0, lambda: ejecutadas.append(('b', reloj())))
+    programador.programar(1.0, lambda: ejecutadas.append(('a', reloj())))
+    periodica = programador.cada(2.0, lambda: ejecutadas.append(('p', reloj())))
+    cancelada = programador.programar(2.5, lambda: ejecutadas.append(('x', reloj())))
+    cancelada.cancelar()
+
+    programador.simular(hasta=5.0)
+
+    assert ejecutadas == [('a', 1.0), ('p', 2.0), ('b', 3.0), ('p', 4.0)]
+    assert reloj() == 5.0
+    periodica.cancelar()
+    programador.simular()
+    assert len(ejecutadas) == 4 and programador.proximo_vencimiento() is None
+
+
+def test_simular_se_detiene_al_terminar():
+    reloj = RelojVirtual()
+    programador = Programador(reloj=reloj)
+    cuenta = []
+    programador.cada(1.0, cuenta.append, None)
+
+    programador.simular(hasta=100.0, terminado=lambda: len(cuenta) == 3)
+
+    assert (len(cuenta), reloj()) == (3, 3.0)
+
+
+def test_una_tarea_periodica_sigue_tras_un_error():
+    programador = Programador(reloj=RelojVirtual())
+    llamadas = []
+
+    def fallar():
+        llamadas.append(None)
+        raise RuntimeError("fallo")
+
+    programador.cada(1.0, fallar)
+    programador.simular(hasta=3.0)
+    assert len(llamadas) == 3
+
+
+def test_programador_con_reloj_virtual_no_arranca_hilo():
+    with pytest.raises(ValueError):
+        Programador(reloj=RelojVirtual()).iniciar()
+
+
+def test_reloj_escalado_acorta_las_esperas_reales():
+    programador = Programador(trabajadores=0, reloj=RelojEscalado(100)).iniciar()
+    hecho = threading.Event()
+    try:
+        inicio = time.monotonic()
+        programador.programar(10.0, hecho.set)
+        assert hecho.wait(5.0)
+        # 10 s de simulación a 100x son 0,1 s reales
+        assert 0.09 <= time.monotonic() - inicio < 2.0
+    finally:
+        programador.detener()
+
+
+def test_registro_fechado_con_el_reloj_del_programador():
+    reloj = RelojVirtual()
+    programador = Programador(reloj=reloj)
+    registro = RegistroEventos(reloj=reloj)
+    inicio = registro.agregar_evento("Despegue")
+    eventos = []
+    programador.programar(300.0, lambda: eventos.append(registro.agregar_evento("Llegada")))
+
+    programador.simular()
+
+    # 300 s simulados sin esperar en tiempo real, con marcas en el marco de time.monotonic()
+    assert eventos[0].tiempo - inicio.tiempo == pytest.approx(300.0)
+    assert abs(inicio.tiempo - time.monotonic()) < 60.0
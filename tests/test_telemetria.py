@@ -0,0 +1,74 @@
+import multiprocessing
+import threading
+
+from telemetria import CAMPOS, CanalTelemetria
+
+MUESTRAS = 20000
+
+
+def escribir_muestras(canal, muestras=MUESTRAS):
+    # Cada campo de la muestra k es un múltiplo de k: una lectura mezclada se nota
+    for k in range(1, muestras + 1):
+        canal.escribir(float(k), (k, 2.0 * k, 3.0 * k), (4.0 * k, 0.0, 0.0))
+
+
+def escribir_desde_otro_proceso(nombre):
+    canal = CanalTelemetria.conectar(nombre)
+    try:
+        escribir_muestras(canal)
+    finally:
+        canal.cerrar()
+
+
+def leer_mientras(canal, escritor):
+    """Lee hasta que el escritor termina; comprueba cada muestra y la secuencia."""
+    anterior = 0
+    while escritor.is_alive():
+        secuencia, muestra = canal.leer()
+        if muestra is None:
+            continue
+        k = muestra['tiempo']
+        assert (muestra['x'], muestra['y'], muestra['z'], muestra['vx']) == (k, 2 * k, 3 * k, 4 * k)
+        # La secuencia es par, no retrocede y corresponde a la muestra leída
+        assert secuencia == 2 * k and secuencia >= anterior
+        anterior = secuencia
+
+
+def test_sin_muestras_la_lectura_es_vacia():
+    canal = CanalTelemetria.crear()
+    try:
+        assert canal.leer() == (0, None)
+        canal.escribir(1.5, (1.0, 2.0, 3.0), (0.0, 2.0, 0.0))
+        secuencia, muestra = canal.leer()
+        assert secuencia == 2 and set(muestra) == set(CAMPOS)
+        assert muestra['rumbo'] > 1.57
+    finally:
+        canal.cerrar()
+
+
+def test_lecturas_consistentes_con_escritor_en_otro_proceso():
+    canal = CanalTelemetria.crear()
+    escritor = multiprocessing.Process(target=escribir_desde_otro_proceso, args=(canal.nombre,))
+    try:
+        escritor.start()
+        leer_mientras(canal, escritor)
+        escritor.join()
+        assert escritor.exitcode == 0
+        assert canal.leer()[0] == 2 * MUESTRAS
+    finally:
+        escritor.join()
+        canal.cerrar()
+
+
+def test_lecturas_consistentes_con_escritor_en_otro_hilo():
+    canal = CanalTelemetria.crear()
+    lector = CanalTelemetria.conectar(canal.nombre)
+    escritor = threading.Thread(target=escribir_muestras, args=(canal,))
+    try:
+        escritor.start()
+        leer_mientras(lector, escritor)
+        escritor.join()
+        assert lector.leer()[0] == 2 * MUESTRAS
+    finally:
+        lector.cerrar()
+        canal.cerrar()
@@ -0,0 +1,125 @@
+# transiciones.py
+
+from enum import IntEnum
+
+
+class Estado(IntEnum):
+    EN_TIERRA = 0
+    DESPEGANDO = 1
+    EN_RUTA = 2
+    EN_EMERGENCIA = 3
+    ASISTIENDO_PACIENTE = 4
+    REGRESANDO_BASE = 5
+    ATERRIZANDO = 6
+    EN_MANTENIMIENTO = 7
+    EN_DEA = 8
+
+    @property
+    def nombre(self):
+        return self.name.lower()
+
+
+class EventoMaquina(IntEnum):
+    RECEPCION_COMANDO_ARRANQUE_VUELO = 0
+    DESPEGUE_COMPLETADO = 1
+    CAMBIO_LOCALIZACION_EMERGENCIA = 2
+    LLEGADA_DESTINO = 3
+    DETECCION_SIGNOS_VITALES_PACIENTE = 4
+    RECEPCION_COMANDO_DESCARGA_ELECTRICA = 5
+    ASISTENCIA_COMPLETADA = 6
+    AVISO_BATERIA_BAJA = 7
+    FALLA_MOTOR_DETECTADA = 8
+    MOTOR_RECUPERADO = 9
+    REGRESO_BASE = 10
+    ATERRIZAJE_COMPLETADO = 11
+    # Eventos ofrecidos por InterfazEventos
+    DETECCION_LUGAR_OCUPADO_ATERRIZAR = 12
+    ATERRIZAJE_FORZOSO = 13
+    REGRESAR_BASE = 14
+    REANUDAR_NAVEGACION = 15
+    DETENER_OPERACIONES = 16
+    RESETEAR_PARAMETROS = 17
+    DETECCION_OBSTACULO_FIJO = 18
+    DETECCION_OBSTACULO_MOVIL = 19
+    PERDIDA_SENAL_GPS = 20
+    DETECCION_ALTA_TURBULENCIA = 21
+    DETECCION_LUGAR_LIBRE_ATERRIZAJE = 22
+    OCUPACION_LUGAR_ATERRIZAJE = 23
+
+    @property
+    def nombre(self):
+        return self.name.lower()
+
+    @classmethod
+    def desde_nombre(cls, nombre):
+        """Devuelve el código del evento con ese nombre o None si no existe."""
+        return _EVENTOS_POR_NOMBRE.get(nombre)
+
+
+NUM_EVENTOS = len(EventoMaquina)
+_EVENTOS_POR_NOMBRE = {evento.nombre: evento for evento in EventoMaquina}
+ESTADOS_POR_NOMBRE = {estado.nombre: estado for estado in Estado}
+
+# Mensajes de texto fijos que equivalen a un evento, para productores que aún no
+# envían 'codigo'. La búsqueda es exacta (un diccionario), sin comparar subcadenas.
+MENSAJES_EVENTO = {
+    "Dron llegó al destino": EventoMaquina.LLEGADA_DESTINO,
+    "Dron asistiendo con el DEA.": EventoMaquina.DETECCION_SIGNOS_VITALES_PACIENTE,
+    "Descarga eléctrica administrada": EventoMaquina.RECEPCION_COMANDO_DESCARGA_ELECTRICA,
+    "Asistencia completada, dron regresando a base.": EventoMaquina.ASISTENCIA_COMPLETADA,
+    "Dron regresó a la base y está en espera.": EventoMaquina.REGRESO_BASE,
+    "Dron aterrizó": EventoMaquina.ATERRIZAJE_COMPLETADO,
+    "Batería baja": EventoMaquina.AVISO_BATERIA_BAJA,
+    "Falla en motor detectada": EventoMaquina.FALLA_MOTOR_DETECTADA,
+    "Motor recuperado": EventoMaquina.MOTOR_RECUPERADO,
+}
+
+
+class Transicion:
+    """Entrada de la tabla: estado destino (o None), acción y guarda opcionales."""
+    __slots__ = ('destino', 'accion', 'guarda')
+
+    def __init__(self, destino=None, accion=None, guarda=None):
+        self.destino = destino
+        self.accion = accion      # accion(maquina, datos)
+        self.guarda = guarda      # guarda(maquina, datos) -> bool
+
+
+class TablaTransiciones:
+    """
+    Tabla de transiciones indexada por (estado, evento) con códigos enteros.
+    Las reglas se declaran con agregar() y se compilan a una lista plana, de modo que
+    el despacho es un único acceso por índice sin importar el número de eventos.
+    """
+
+    def __init__(self):
+        self.reglas = {}
+        self.tabla = None
+
+    def agregar(self, estados, evento, destino=None, accion=None, guarda=None):
+        """Declara la transición para uno o varios estados (None equivale a todos)."""
+        if estados is None:
+            estados = list(Estado)
+        elif isinstance(estados, Estado):
+            estados = [estados]
+        for estado in estados:
+            self.reglas[(estado, evento)] = Transicion(destino, accion, guarda)
+        self.tabla = None  # Recompilar en el próximo despacho
+
+    def ignorar(self, eventos):
+        """Declara los eventos como esperados y sin efecto en los estados que no tienen regla."""
+        for evento in eventos:
+            for estado in Estado:
+                self.reglas.setdefault((estado, evento), Transicion())
+        self.tabla = None
+
+    def compilar(self):
+        tabla = [None] * (len(Estado) * NUM_EVENTOS)
+        for (estado, evento), transicion in self.reglas.items():
+            tabla[estado * NUM_EVENTOS + evento] = transicion
+        self.tabla = tabla
+
+    def buscar(self, estado, evento):
+        if self.tabla is None:
+            self.compilar()
+        return self.tabla[estado * NUM_EVENTOS + evento]
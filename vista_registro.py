@@ -0,0 +1,188 @@
+# vista_registro.py
+
+import re
+import tkinter as tk
+from bisect import bisect_left
+from collections import defaultdict, deque
+
+# Líneas retenidas por la vista; las más antiguas se descartan
+MAX_LINEAS = 5000
+ORIGENES = ('LLAMADA', 'DRON', 'INTERFAZ', 'SISTEMA')
+TODOS = 'TODOS'
+PALABRA = re.compile(r'\w+')
+
+
+def palabras(texto):
+    return set(PALABRA.findall(texto.lower()))
+
+
+class LineasRegistro:
+    """
+    Búfer circular de líneas del registro con índices por origen y por palabra.
+    Cada línea recibe un número de secuencia creciente; los índices guardan esos
+    números en orden, así al descartar la línea más antigua basta con quitar el
+    primero de cada índice en que aparece.
+    """
+
+    def __init__(self, capacidad=MAX_LINEAS):
+        self.capacidad = capacidad
+        self.lineas = deque()                   # (texto, origen, palabras)
+        self.primera = 0                        # Secuencia de lineas[0]
+        self.por_origen = defaultdict(deque)    # origen -> secuencias
+        self.por_palabra = defaultdict(deque)   # palabra -> secuencias
+
+    def __len__(self):
+        return len(self.lineas)
+
+    @property
+    def siguiente(self):
+        """Secuencia que recibirá la próxima línea."""
+        return self.primera + len(self.lineas)
+
+    def agregar(self, texto, origen):
+        secuencia = self.siguiente
+        terminos = palabras(texto)
+        self.lineas.append((texto, origen, terminos))
+        self.por_origen[origen].append(secuencia)
+        for palabra in terminos:
+            self.por_palabra[palabra].append(secuencia)
+        if len(self.lineas) > self.capacidad:
+            self._descartar()
+        return secuencia
+
+    def _descartar(self):
+        _, origen, terminos = self.lineas.popleft()
+        self._quitar(self.por_origen, origen)
+        for palabra in terminos:
+            self._quitar(self.por_palabra, palabra)
+        self.primera += 1
+
+    def _quitar(self, indice, clave):
+        secuencias = indice[clave]
+        secuencias.popleft()
+        if not secuencias:
+            del indice[clave]
+
+    def texto(self, secuencia):
+        return self.lineas[secuencia - self.primera][0]
+
+    def coincide(self, secuencia, origen=None, terminos=()):
+        _, origen_linea, palabras_linea = self.lineas[secuencia - self.primera]
+        return (origen is None or origen_linea == origen) and all(t in palabras_linea for t in terminos)
+
+    def filtrar(self, origen=None, texto=''):
+        """
+        Secuencias (en orden) de las líneas del origen indicado que contienen todas las
+        palabras de `texto`. Se resuelve intersecando los índices, sin recorrer las líneas.
+        """
+        terminos = palabras(texto)
+        if origen is None and not terminos:
+            return list(range(self.primera, self.siguiente))
+        candidatas = [self.por_origen.get(origen, ())] if origen is not None else []
+        candidatas += [self.por_palabra.get(t, ()) for t in terminos]
+        candidatas.sort(key=len)
+        resultado = set(candidatas[0])
+        for secuencias in candidatas[1:]:
+            if not resultado:
+                break
+            resultado.intersection_update(secuencias)
+        return sorted(resultado)
+
+
+class VistaRegistro(tk.Frame):
+    """
+    Registro de eventos virtualizado: el widget de texto solo contiene las filas
+    visibles, tomadas de un LineasRegistro limitado a MAX_LINEAS. Mientras la vista
+    está al final sigue las líneas nuevas; al desplazarse hacia arriba se detiene.
+    """
+
+    def __init__(self, parent, capacidad=MAX_LINEAS, **opciones_texto):
+        super().__init__(parent)
+        self.lineas = LineasRegistro(capacidad)
+        self.filas = []           # Secuencias que cumplen el filtro actual
+        self.inicio = 0           # Índice en filas de la primera fila visible
+        self.alto = opciones_texto.get('height', 30)
+        self.seguir = True
+        self.filtro_origen = None
+        self.filtro_terminos = set()
+
+        # Filtros
+        barra = tk.Frame(self)
+        barra.pack(fill=tk.X)
+        self.origen = tk.StringVar(value=TODOS)
+        tk.OptionMenu(barra, self.origen, TODOS, *ORIGENES, command=lambda _: self.aplicar_filtro()).pack(side=tk.LEFT)
+        self.busqueda = tk.StringVar()
+        entrada = tk.Entry(barra, textvariable=self.busqueda)
+        entrada.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        entrada.bind('<Return>', lambda _: self.aplicar_filtro())
+
+        self.barra_desplazamiento = tk.Scrollbar(self, command=self.desplazar)
+        self.barra_desplazamiento.pack(side=tk.RIGHT, fill=tk.Y)
+        self.texto = tk.Text(self, wrap=tk.NONE, state=tk.DISABLED, **opciones_texto)
+        self.texto.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.texto.bind('<Configure>', self.redimensionar)
+        for secuencia in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.texto.bind(secuencia, self.rueda)
+
+    def agregar_lineas(self, lineas):
+        """Agrega un lote de (texto, origen) y redibuja una sola vez."""
+        for texto, origen in lineas:
+            secuencia = self.lineas.agregar(texto, origen)
+            if self.lineas.coincide(secuencia, self.filtro_origen, self.filtro_terminos):
+                self.filas.append(secuencia)
+        # Quitar del filtro las líneas que el búfer ya descartó
+        descartadas = bisect_left(self.filas, self.lineas.primera)
+        if descartadas:
+            del self.filas[:descartadas]
+            self.inicio = max(0, self.inicio - descartadas)
+        if self.seguir:
+            self.inicio = max(0, len(self.filas) - self.alto)
+        self.dibujar()
+
+    def agregar(self, texto, origen='SISTEMA'):
+        self.agregar_lineas([(texto, origen)])
+
+    def aplicar_filtro(self):
+        origen = self.origen.get()
+        self.filtro_origen = None if origen == TODOS else origen
+        self.filtro_terminos = palabras(self.busqueda.get())
+        self.filas = self.lineas.filtrar(self.filtro_origen, self.busqueda.get())
+        self.seguir = True
+        self.inicio = max(0, len(self.filas) - self.alto)
+        self.dibujar()
+
+    def dibujar(self):
+        visibles = self.filas[self.inicio:self.inicio + self.alto]
+        self.texto.configure(state=tk.NORMAL)
+        self.texto.delete('1.0', tk.END)
+        self.texto.insert('1.0', '\n'.join(self.lineas.texto(s) for s in visibles))
+        self.texto.configure(state=tk.DISABLED)
+        total = len(self.filas) or 1
+        self.barra_desplazamiento.set(self.inicio / total, min(1.0, (self.inicio + self.alto) / total))
+
+    def mover_a(self, inicio):
+        maximo = max(0, len(self.filas) - self.alto)
+        self.inicio = min(max(0, inicio), maximo)
+        self.seguir = self.inicio >= maximo
+        self.dibujar()
+
+    def desplazar(self, accion, cantidad, unidad=None):
+        """Comando de la barra de desplazamiento (protocolo yview de Tk)."""
+        if accion == 'moveto':
+            self.mover_a(round(float(cantidad) * len(self.filas)))
+        elif accion == 'scroll':
+            paso = self.alto if unidad == 'pages' else 1
+            self.mover_a(self.inicio + int(cantidad) * paso)
+
+    def rueda(self, evento):
+        if evento.num == 4 or getattr(evento, 'delta', 0) > 0:
+            self.mover_a(self.inicio - 3)
+        else:
+            self.mover_a(self.inicio + 3)
+        return 'break'
+
+    def redimensionar(self, evento):
+        alto = max(1, evento.height // max(1, self.texto.tk.call('font', 'metrics', self.texto.cget('font'), '-linespace')))
+        if alto != self.alto:
+            self.alto = alto
+            self.mover_a(len(self.filas) if self.seguir else self.inicio)